@@ -0,0 +1,458 @@
+'''
+Benchmarks for the engine hot paths.
+
+Measures, for each example game and synthetic large worlds:
+
+* take_action throughput per command type (move, look, get/drop, ex, use)
+* run_batch throughput against a take_action loop running the same script
+* load_adventure (build) time
+* Room.describe cost (cached and uncached)
+* memory per world
+
+Results are written as JSON so runs can be compared across commits.
+
+Usage:
+------
+python benchmarks/run_benchmarks.py --output before.json
+python benchmarks/run_benchmarks.py --output after.json --compare before.json
+
+With --compare the exit code is 1 if any benchmark regressed by more than
+--threshold (default 10%).
+'''
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from text_adventure.actions import BasicInventoryItemAction  # noqa: E402
+from text_adventure.commands import NullCommand  # noqa: E402
+from text_adventure.constants import (  # noqa: E402
+    EAST, NORTH, SOUTH, WEST)
+from text_adventure.example_games import (  # noqa: E402
+    data_day_adventure,
+    hospital_game,
+    mini_knightmare)
+from text_adventure.world import InventoryItem, Room, TextWorld  # noqa: E402
+
+################# CONSTANTS ###################################################
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+# minimum seconds per timing measurement
+MIN_TIME = 0.2
+# commands in the script run by the run_batch benchmarks
+BATCH_SIZE = 100
+
+# name -> function that builds a new world
+EXAMPLE_GAMES = {
+    'mini_knightmare': mini_knightmare.load_adventure,
+    'data_day_adventure': data_day_adventure.load_adventure,
+    'hospital_game': hospital_game.load_adventure,
+}
+
+# (width, height, items per room) of the synthetic worlds
+SYNTHETIC_SIZES = [(10, 10, 5), (50, 50, 5)]
+
+
+def synthetic_world(width, height, items_per_room):
+    '''
+    A grid of width x height rooms linked n/s/e/w.  Each room holds
+    portable items that can be examined and used.
+
+    Returns:
+    -------
+    TextWorld
+    '''
+    grid = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            room = Room(f'room {x} {y}')
+            room.description = f'You are in room {x}, {y}. ' \
+                + 'The walls are plain and the floor is dusty. ' * 3
+            for i in range(items_per_room):
+                item = InventoryItem(f'widget {x} {y} {i}')
+                item.long_description = f'Widget number {i} of room {x}, {y}.'
+                item.add_alias(f'widget{i}')
+                item.add_action(BasicInventoryItemAction(
+                    NullCommand(f'You use widget {i}.')))
+                room.add_inventory(item)
+            row.append(room)
+        grid.append(row)
+
+    for y in range(height):
+        for x in range(width):
+            room = grid[y][x]
+            if y > 0:
+                room.add_exit(grid[y - 1][x], NORTH)
+            if y < height - 1:
+                room.add_exit(grid[y + 1][x], SOUTH)
+            if x > 0:
+                room.add_exit(grid[y][x - 1], WEST)
+            if x < width - 1:
+                room.add_exit(grid[y][x + 1], EAST)
+
+    rooms = [room for row in grid for room in row]
+    return TextWorld(name=f'synthetic {width}x{height}', rooms=rooms)
+
+
+def all_worlds():
+    '''
+    Return {name: build function} for every benchmarked world.
+    '''
+    worlds = dict(EXAMPLE_GAMES)
+    for width, height, n_items in SYNTHETIC_SIZES:
+        worlds[f'synthetic_{width}x{height}'] = \
+            lambda w=width, h=height, n=n_items: synthetic_world(w, h, n)
+    return worlds
+
+
+def time_per_call(func, repeat):
+    '''
+    Best time per call (seconds) of func over `repeat` measurements.
+    '''
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * MIN_TIME / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def world_memory(build):
+    '''
+    Bytes allocated by building a world (and kept alive by it).
+    '''
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        world = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del world
+    return after - before
+
+
+def find_move(world):
+    '''
+    A room and exit direction accepted by take_action.
+    '''
+    for room in [world.current_room] + world.rooms:
+        for direction in room.exits:
+            if direction in world.legal_exits:
+                return room, direction
+    return None
+
+
+def find_portable_item(world):
+    '''
+    A room and alias of an item that can be picked up and dropped.
+    '''
+    for room in [world.current_room] + world.rooms:
+        for item in room.inventory:
+            if not item.fixed and _unique_alias(room, item):
+                return room, _unique_alias(room, item)
+    return None
+
+
+def find_visible_item(world):
+    '''
+    A room and alias of an item that can be examined.
+    '''
+    for room in [world.current_room] + world.rooms:
+        for item in room.inventory:
+            if _unique_alias(room, item):
+                return room, _unique_alias(room, item)
+    return None
+
+
+def find_safe_use(world):
+    '''
+    A room and use command whose actions only display messages (so can be
+    repeated without changing the game).  If no such action exists then a
+    use command without a matching action is returned: it still exercises
+    parsing, item lookup and action dispatch.
+    '''
+    fallback = None
+    for room in [world.current_room] + world.rooms:
+        for item in room.inventory:
+            alias = _unique_alias(room, item)
+            if not alias:
+                continue
+            for action in item.actions:
+                if _only_messages(action) \
+                        and action.command_text in world.use_aliases:
+                    return room, f'{action.command_text} {alias}'
+            if fallback is None and not item.get_actions('use'):
+                fallback = (room, f'use {alias}')
+    return fallback
+
+
+def _only_messages(action):
+    return type(action) is BasicInventoryItemAction \
+        and all(type(cmd) is NullCommand for cmd in action.commands)
+
+
+def _unique_alias(holder, item):
+    for alias in item.aliases:
+        if alias == alias.lower() and ' ' not in alias:
+            try:
+                if holder.find_inventory(alias) is item:
+                    return alias
+            except KeyError:
+                continue
+    return None
+
+
+def benchmark_world(name, build, repeat):
+    '''
+    Run every benchmark for one world.
+
+    Returns:
+    -------
+    list of dict
+        One result per benchmark.
+    '''
+    results = []
+
+    def record(benchmark, seconds, command=None):
+        result = {'world': name, 'benchmark': benchmark,
+                  'ns_per_op': seconds * 1e9,
+                  'ops_per_sec': 1.0 / seconds if seconds > 0 else None}
+        if command is not None:
+            result['command'] = command
+        results.append(result)
+
+    record('build', time_per_call(build, repeat))
+
+    memory = world_memory(build)
+    results.append({'world': name, 'benchmark': 'memory',
+                    'bytes': memory})
+
+    world = build()
+
+    def take_action_in(room, command):
+        def run():
+            world.current_room = room
+            world.take_action(command)
+        return run
+
+    move = find_move(world)
+    if move is not None:
+        room, direction = move
+        record('take_action.move',
+               time_per_call(take_action_in(room, direction), repeat),
+               direction)
+
+    record('take_action.look',
+           time_per_call(take_action_in(world.current_room, 'look'), repeat),
+           'look')
+
+    portable = find_portable_item(world)
+    if portable is not None:
+        room, alias = portable
+        get, drop = _get_drop_verbs(world)
+
+        def get_drop():
+            world.current_room = room
+            world.take_action(f'{get} {alias}')
+            world.take_action(f'{drop} {alias}')
+        # two commands per call
+        record('take_action.get_drop', time_per_call(get_drop, repeat) / 2,
+               f'{get}/{drop} {alias}')
+
+    visible = find_visible_item(world)
+    if visible is not None:
+        room, alias = visible
+        examine = _verb(world, '_create_examine_command')
+        record('take_action.ex',
+               time_per_call(take_action_in(room, f'{examine} {alias}'),
+                             repeat),
+               f'{examine} {alias}')
+
+    use = find_safe_use(world)
+    if use is not None:
+        room, command = use
+        record('take_action.use',
+               time_per_call(take_action_in(room, command), repeat), command)
+
+    # the same script run by a take_action loop and by run_batch.
+    room = world.current_room
+    script = ['look']
+    if visible is not None and visible[0] is room:
+        script.append(f'{examine} {visible[1]}')
+    script = (script * BATCH_SIZE)[:BATCH_SIZE]
+
+    def take_action_loop():
+        world.current_room = room
+        for command in script:
+            world.take_action(command)
+
+    def batch():
+        world.current_room = room
+        world.run_batch(script)
+
+    record('take_action.loop',
+           time_per_call(take_action_loop, repeat) / BATCH_SIZE,
+           ', '.join(script[:2]))
+    record('run_batch', time_per_call(batch, repeat) / BATCH_SIZE,
+           ', '.join(script[:2]))
+
+    room.describe()
+    record('describe.cached', time_per_call(room.describe, repeat))
+
+    def describe_uncached():
+        room._description_changed()
+        room.describe()
+    record('describe.uncached', time_per_call(describe_uncached, repeat))
+
+    return results
+
+
+def _verb(world, creator_name):
+    '''
+    The player verb mapped to one of the TextWorld command creators.
+    '''
+    for verb, creator in world.legal_verbs.items():
+        if getattr(creator, '__name__', None) == creator_name:
+            return verb
+    raise KeyError(creator_name)
+
+
+def _get_drop_verbs(world):
+    return (_verb(world, '_create_transfer_to_player_command'),
+            _verb(world, '_create_transfer_to_room_command'))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(worlds=None, repeat=DEFAULT_REPEAT):
+    '''
+    Run the benchmark suite.
+
+    Params:
+    ------
+    worlds: list of str, optional (default=None)
+        Names of the worlds to benchmark.  None = all.
+
+    repeat: int, optional (default=DEFAULT_REPEAT)
+        Timing repeats.  The best repeat is reported.
+
+    Returns:
+    -------
+    dict
+        Machine readable results.
+    '''
+    available = all_worlds()
+    if worlds is None:
+        worlds = list(available)
+
+    results = []
+    for name in worlds:
+        print(f'benchmarking {name}...', file=sys.stderr)
+        results.extend(benchmark_world(name, available[name], repeat))
+
+    return {'format_version': RESULTS_FORMAT_VERSION,
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results}
+
+
+def compare(old, new, threshold=DEFAULT_THRESHOLD):
+    '''
+    Compare two sets of results.
+
+    Returns:
+    -------
+    tuple (lines, regressions)
+        lines: list of str describing each benchmark in both runs.
+        regressions: number of benchmarks more than threshold slower (or
+        larger for memory).
+    '''
+    def key(result):
+        return (result['world'], result['benchmark'])
+
+    def value(result):
+        return result.get('ns_per_op', result.get('bytes'))
+
+    old_results = {key(r): value(r) for r in old['results']}
+    lines = []
+    regressions = 0
+    for result in new['results']:
+        before = old_results.get(key(result))
+        after = value(result)
+        if not before:
+            continue
+        ratio = after / before
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = '  improved'
+        lines.append(f'{result["world"]:24} {result["benchmark"]:22} '
+                     + f'{before:14.1f} {after:14.1f} {ratio:6.2f}x{flag}')
+    return lines, regressions
+
+
+def format_results(results):
+    lines = []
+    for result in results['results']:
+        if 'bytes' in result:
+            value = f'{result["bytes"] / 1024:12.1f} KiB'
+        else:
+            value = f'{result["ns_per_op"]:12.1f} ns/op'
+        lines.append(f'{result["world"]:24} {result["benchmark"]:22} '
+                     + f'{value}  {result.get("command", "")}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the text adventure engine hot paths.')
+    parser.add_argument('--output', '-o', help='write results to JSON file')
+    parser.add_argument('--compare', help='JSON results of a previous run')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slow down reported as a regression')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--world', action='append', dest='worlds',
+                        choices=list(all_worlds()),
+                        help='benchmark only this world (repeatable)')
+    args = parser.parse_args(argv)
+
+    results = run(args.worlds, args.repeat)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        lines, regressions = compare(old, results, args.threshold)
+        print(f'\ncompared with {old.get("commit")}:')
+        print('\n'.join(lines))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
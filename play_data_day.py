@@ -1,7 +1,7 @@
 
 from text_adventure.example_games import data_day_adventure
+from text_adventure.render import CLEAR_SCREEN, TerminalRenderer
 from rich import print
-import os
 
 TITLE = """
 ╔══════════════════════════════════════════════════════════════════════════╗
@@ -13,7 +13,7 @@ TITLE = """
 """
 
 def show_game_opening(adventure):
-    os.system('cls' if os.name == 'nt' else 'clear')
+    adventure.renderer.render_event(CLEAR_SCREEN)
     print(TITLE)
     print('*' * 78)
     print(adventure.opening)
@@ -30,4 +30,5 @@ def play_text_adventure(adventure):
 
 if __name__ == '__main__':
     adventure = data_day_adventure.load_adventure()
+    adventure.renderer = TerminalRenderer()
     play_text_adventure(adventure)
@@ -1,4 +1,5 @@
 from text_adventure.example_games import mini_knightmare
+from text_adventure.render import CLEAR_SCREEN, TerminalRenderer
 from rich import print
 import os
 import sys
@@ -21,7 +22,7 @@ def show_game_opening(adventure):
     Display the opening to the game + the first room description.
     '''
     # clear terminal or cmd prompt.
-    os.system('cls' if os.name == 'nt' else 'clear')
+    adventure.renderer.render_event(CLEAR_SCREEN)
     print_title()
     terminal_width = os.get_terminal_size()[0]
     print('*' * terminal_width)
@@ -44,5 +45,6 @@ def play_text_adventure(adventure):
 
 if __name__ == '__main__':
     adventure = mini_knightmare.load_adventure()
+    adventure.renderer = TerminalRenderer()
     play_text_adventure(adventure)
 
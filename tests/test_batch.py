@@ -0,0 +1,53 @@
+'''
+Tests of TextWorld.run_batch (world.py).
+'''
+
+import pytest
+
+from walkthroughs import WALKTHROUGHS, build
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_batch_matches_take_action(game):
+    '''
+    A batch responds like a take_action loop that stops when the game
+    ends (the walkthroughs win the game before their last command).
+    '''
+    world = build(game)
+    expected = []
+    for command in WALKTHROUGHS[game]:
+        expected.append(world.take_action(command))
+        if not world.active:
+            break
+    batched = build(game)
+    result = batched.run_batch(WALKTHROUGHS[game])
+    n_steps = len(expected)
+    assert result.responses == expected
+    assert result.n_actions == list(range(1, n_steps + 1))
+    assert result.active == [True] * (n_steps - 1) + [world.active]
+    assert result.rooms[-1] is batched.current_room
+    assert batched.current_room.name == world.current_room.name
+
+
+def test_batch_stops_when_game_ends():
+    world = build('mini_knightmare')
+    result = world.run_batch(['look', 'quit', 'look'])
+    assert len(result.responses) == 2
+    assert result.active == [True, False]
+    assert world.n_actions == 2
+    assert world.run_batch(['look']).responses == []
+
+
+def test_batch_continues_numbering():
+    world = build('mini_knightmare')
+    world.take_action('look')
+    assert world.run_batch(['inv', 'look']).n_actions == [2, 3]
+
+
+def test_batch_for_another_player():
+    world = build('mini_knightmare')
+    bob = world.add_player('bob')
+    world.run_batch(['get helmet'], 'bob')
+    assert bob.inventory_count == 1
+    assert world.inventory_count == 0
+    assert world.player.name == 'player'
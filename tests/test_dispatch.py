@@ -0,0 +1,80 @@
+'''
+Tests of the command dispatch tables compiled by TextWorld (world.py).
+'''
+
+from text_adventure.actions import BasicInventoryItemAction
+from text_adventure.commands import NullCommand
+from text_adventure.world import InventoryItem, Room, TextWorld
+
+
+def _world(**kwargs):
+    hall = Room('hall')
+    hall.description = 'A hall.'
+    garden = Room('garden')
+    garden.description = 'A garden.'
+    hall.add_exit(garden, 'n')
+    garden.add_exit(hall, 's')
+    lamp = _lamp()
+    hall.add_inventory(lamp)
+    return TextWorld('test', [hall, garden], **kwargs)
+
+
+def _lamp():
+    lamp = InventoryItem('a lamp')
+    lamp.add_alias('lamp')
+    lamp.add_action(BasicInventoryItemAction(NullCommand('The lamp glows.'),
+                                             command_text='use'))
+    lamp.add_action(BasicInventoryItemAction(NullCommand('A genie!'),
+                                             command_text='rub'))
+    return lamp
+
+
+def test_exits_dispatch_to_moves():
+    world = _world()
+    assert world.take_action('n') == 'A garden.'
+    assert world.current_room.name == 'garden'
+    assert world.take_action('e') == 'You cannot go that way.'
+    assert world.take_action('s') == 'A hall.\nYou can also see:\n\na lamp\n'
+
+
+def test_verbs_and_use_aliases():
+    world = _world()
+    assert world.take_action('get lamp') != "I don't know how to get lamp"
+    assert world.inventory_count == 1
+    assert world.take_action('use lamp') == 'The lamp glows.'
+    assert world.take_action('USE LAMP') == 'The lamp glows.'
+
+
+def test_unknown_and_empty_commands():
+    world = _world()
+    assert world.take_action('dance') == "I don't know how to dance"
+    assert world.take_action('rub lamp') == "I don't know how to rub lamp"
+    assert world.take_action('   ') == 'Please enter a command.'
+
+
+def test_add_use_command_alias():
+    world = _world()
+    world.add_use_command_alias('rub')
+    assert world.take_action('rub lamp') == 'A genie!'
+
+
+def test_recompile_after_changing_vocabulary():
+    world = _world()
+    world.legal_exits = ['s']
+    world.compile_dispatch()
+    assert world.take_action('n') == "I don't know how to n"
+    world.use_aliases.append('rub')
+    world.compile_dispatch()
+    assert world.take_action('rub lamp') == 'A genie!'
+
+
+def test_use_aliases_take_priority():
+    world = _world(use_aliases=['look'])
+    assert world.take_action('look lamp') == 'You cannot do that.'
+    assert world.take_action('look') == 'look what?'
+
+
+def test_only_use_without_aliases():
+    world = _world(use_aliases=None)
+    assert world.take_action('use lamp') == 'The lamp glows.'
+    assert world.take_action('talk lamp') == "I don't know how to talk lamp"
@@ -0,0 +1,79 @@
+'''
+Tests of the synthetic world generator (generator.py).
+'''
+
+import pytest
+
+from text_adventure.generator import (MAX_EXIT_DENSITY, format_scale,
+                                      generate_world, iter_rooms,
+                                      measure_latency, measure_scale)
+
+from walkthroughs import snapshot
+
+
+def reachable(world):
+    seen = {id(world.start_room)}
+    to_visit = [world.start_room]
+    while to_visit:
+        for room in to_visit.pop().exits.values():
+            if id(room) not in seen:
+                seen.add(id(room))
+                to_visit.append(room)
+    return len(seen)
+
+
+def test_same_seed_same_world():
+    assert snapshot(generate_world(200, seed=3)) \
+        == snapshot(generate_world(200, seed=3))
+    assert snapshot(generate_world(200, seed=3)) \
+        != snapshot(generate_world(200, seed=4))
+
+
+@pytest.mark.parametrize('exit_density', [0, 2.5, MAX_EXIT_DENSITY])
+def test_sizes(exit_density):
+    world = generate_world(300, exit_density, items_per_room=4,
+                           aliases_per_item=3)
+    rooms = world.rooms
+    assert len(rooms) == 300
+    assert reachable(world) == 300
+    assert all(room.inventory_count == 4 for room in rooms)
+    assert all(len(item.aliases) == 3
+               for room in rooms for item in room.inventory)
+    assert all(len(room.exits) <= MAX_EXIT_DENSITY for room in rooms)
+    n_exits = sum(len(room.exits) for room in rooms)
+    assert n_exits / len(rooms) >= min(exit_density, 1.9)
+
+
+def test_exits_link_both_ways():
+    for room in generate_world(200).rooms:
+        for other in room.exits.values():
+            assert room in other.exits.values()
+
+
+def test_action_chain():
+    world = generate_world(1, items_per_room=3, action_depth=3)
+    first, second, third = world.current_room.inventory
+    noun = first.aliases[0]
+    assert world.take_action(f'use {noun}').startswith(f'You use the {noun}')
+    assert world.take_action(f'use {second.aliases[0]}') \
+        .endswith('Step 1 of the chain.')
+    assert world.take_action(f'use {third.aliases[0]}') \
+        .endswith('Step 2 of the chain.')
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        next(iter_rooms(10, exit_density=MAX_EXIT_DENSITY + 1))
+    with pytest.raises(ValueError):
+        next(iter_rooms(10, aliases_per_item=0))
+
+
+def test_measure_scale():
+    results = measure_scale([50, 100], n_commands=100, memory=False)
+    assert [result.n_rooms for result in results] == [50, 100]
+    assert results[1].n_items == 100 * 3
+    assert results[0].memory_bytes is None
+    assert 'move' in results[0].latency
+    assert '100' in format_scale(results)
+    latency = measure_latency(generate_world(20), n_commands=50)
+    assert all(mean <= worst for mean, worst in latency.values())
@@ -0,0 +1,75 @@
+'''
+Tests of per stage timing instrumentation (instrument.py).
+'''
+
+from text_adventure.instrument import (ACTIONS, InstrumentedRenderer, PARSE,
+                                       RENDER, RESOLVE, TOTAL)
+from text_adventure.render import CLEAR_SCREEN, HeadlessRenderer, Renderer
+from text_adventure.template import WorldTemplate
+
+from walkthroughs import WALKTHROUGHS, build
+
+
+class RecordingRenderer(Renderer):
+    def __init__(self):
+        self.events = []
+
+    def render_event(self, event):
+        self.events.append(event)
+
+
+def test_stages_and_commands_recorded():
+    world = build('data_day_adventure')
+    stats = world.enable_instrumentation()
+    world.run_batch(['look', 'n', 'e', 'talk obrien', 'xyzzy'])
+    assert stats.stages[TOTAL].count == 5
+    assert stats.stages[PARSE].count == 5
+    assert stats.stages[RESOLVE].count == 1
+    assert stats.stages[ACTIONS].count == 1
+    assert stats.stages[RENDER].count == 3
+    assert stats.command_counts['MoveRoom'] == 2
+    assert stats.command_counts['UseInventoryItem'] == 1
+    assert stats.summary()['stages'][TOTAL]['count'] == 5
+
+
+def test_instrumentation_does_not_change_responses():
+    commands = WALKTHROUGHS['data_day_adventure']
+    world = build('data_day_adventure')
+    world.enable_instrumentation()
+    assert world.run_batch(commands).responses \
+        == build('data_day_adventure').run_batch(commands).responses
+
+
+def test_disable_stops_recording():
+    world = build('data_day_adventure')
+    stats = world.enable_instrumentation()
+    world.take_action('n')
+    assert world.disable_instrumentation() is stats
+    world.take_action('s')
+    assert stats.stages[TOTAL].count == 1
+    assert isinstance(world.renderer, HeadlessRenderer)
+    assert world.disable_instrumentation() is None
+
+
+def test_renderer_assigned_later_is_timed():
+    world = build('data_day_adventure')
+    stats = world.enable_instrumentation()
+    renderer = RecordingRenderer()
+    world.renderer = renderer
+    assert isinstance(world.renderer, InstrumentedRenderer)
+    world.take_action('n')
+    assert renderer.events == [CLEAR_SCREEN]
+    assert stats.stages[RENDER].count == 1
+    world.disable_instrumentation()
+    assert world.renderer is renderer
+
+
+def test_shared_instrumentation_and_clones():
+    world = build('data_day_adventure')
+    stats = world.enable_instrumentation()
+    other = build('mini_knightmare')
+    other.enable_instrumentation(stats)
+    clone = WorldTemplate(world).clone()
+    for game in (world, other, clone):
+        game.take_action('look')
+    assert stats.stages[TOTAL].count == 3
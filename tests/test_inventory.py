@@ -0,0 +1,132 @@
+'''
+Tests of holding, finding and removing InventoryItems (world.py).
+'''
+
+import pytest
+
+from text_adventure.world import (AmbiguousAliasError, InventoryHolder,
+                                  InventoryItem)
+
+
+def _item(name, *aliases):
+    item = InventoryItem(name)
+    for alias in aliases:
+        item.add_alias(alias)
+    return item
+
+
+def test_find_by_alias():
+    holder = InventoryHolder()
+    key = _item('a brass key', 'key', 'brass key')
+    lamp = _item('a lamp', 'lamp')
+    holder.add_inventory(key)
+    holder.add_inventory(lamp)
+    assert holder.find_inventory('key') is key
+    assert holder.find_inventory('brass key') is key
+    assert holder.find_inventory('lamp') is lamp
+    assert holder.find_inventory('sword') is None
+
+
+def test_alias_added_while_held():
+    holder = InventoryHolder()
+    key = _item('a brass key', 'key')
+    holder.add_inventory(key)
+    key.add_alias('brass')
+    assert holder.find_inventory('brass') is key
+
+
+def test_get_removes_item_and_aliases():
+    holder = InventoryHolder()
+    key = _item('a brass key', 'key', 'brass')
+    holder.add_inventory(key)
+    assert holder.get_inventory('key') is key
+    assert holder.inventory_count == 0
+    assert holder.find_inventory('brass') is None
+    with pytest.raises(KeyError):
+        holder.get_inventory('key')
+
+
+def test_ambiguous_alias():
+    holder = InventoryHolder()
+    red = _item('a red key', 'key', 'red key')
+    blue = _item('a blue key', 'key', 'blue key')
+    holder.add_inventory(red)
+    holder.add_inventory(blue)
+    with pytest.raises(AmbiguousAliasError) as error:
+        holder.find_inventory('key')
+    assert error.value.alias == 'key'
+    assert error.value.items == [red, blue]
+    # still a KeyError for callers that only handle missing items.
+    with pytest.raises(KeyError):
+        holder.get_inventory('key')
+    assert holder.find_inventory('red key') is red
+
+    holder.remove_inventory(red)
+    assert holder.find_inventory('key') is blue
+
+
+def test_inventory_order_and_position():
+    holder = InventoryHolder()
+    items = [_item(name, name) for name in ('a', 'b', 'c')]
+    for item in items:
+        holder.add_inventory(item)
+    d = _item('d', 'd')
+    holder.add_inventory(d, position=1)
+    assert holder.inventory == (items[0], d, items[1], items[2])
+    assert holder.inventory_position(items[2]) == 3
+    holder.remove_inventory(d)
+    with pytest.raises(ValueError):
+        holder.inventory_position(d)
+
+
+def test_item_held_at_most_once():
+    holder = InventoryHolder()
+    key = _item('a brass key', 'key')
+    holder.add_inventory(key)
+    holder.add_inventory(key)
+    assert holder.inventory == (key,)
+    assert holder.find_inventory('key') is key
+
+
+def test_inventory_is_read_only():
+    holder = InventoryHolder()
+    holder.add_inventory(_item('a lamp', 'lamp'))
+    with pytest.raises(AttributeError):
+        holder.inventory.append(_item('a key', 'key'))
+    assert holder.inventory_count == 1
+
+
+def test_item_in_two_holders():
+    room = InventoryHolder()
+    player = InventoryHolder()
+    key = _item('a brass key', 'key')
+    room.add_inventory(key)
+    player.add_inventory(key)
+    room.remove_inventory(key)
+    assert player.find_inventory('key') is key
+    assert room.find_inventory('key') is None
+
+
+def test_in_inventory():
+    holder = InventoryHolder()
+    key = _item('a brass key', 'key')
+    lamp = _item('a lamp', 'lamp')
+    holder.add_inventory(key)
+    assert holder.in_inventory(key)
+    assert not holder.in_inventory(lamp)
+    assert holder.in_inventory([key])
+    assert not holder.in_inventory([key, lamp])
+    holder.add_inventory(lamp)
+    assert holder.in_inventory([lamp, key])
+    assert holder.in_inventory((key, lamp))
+    assert not holder.in_inventory([])
+
+
+def test_in_inventory_by_identity():
+    '''
+    Items with the same name and description are different items.
+    '''
+    holder = InventoryHolder()
+    held = _item('a coin', 'coin')
+    holder.add_inventory(held)
+    assert not holder.in_inventory(_item('a coin', 'coin'))
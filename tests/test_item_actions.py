@@ -0,0 +1,57 @@
+'''
+Tests of InventoryItem actions and their index by command verb (world.py).
+'''
+
+from text_adventure.actions import BasicInventoryItemAction
+from text_adventure.commands import NullCommand
+from text_adventure.world import InventoryItem, Room, TextWorld
+
+
+def _action(msg, verb='use'):
+    return BasicInventoryItemAction(NullCommand(msg), command_text=verb)
+
+
+def test_actions_indexed_by_verb_in_order():
+    item = InventoryItem('a lamp')
+    first = _action('one')
+    rub = _action('rub', 'rub')
+    second = _action('two')
+    for action in (first, rub, second):
+        item.add_action(action)
+    assert item.actions == (first, rub, second)
+    assert item.get_actions('use') == (first, second)
+    assert item.get_actions('rub') == (rub,)
+    assert item.get_actions('eat') == ()
+
+
+def test_clear_and_replace_actions():
+    item = InventoryItem('a lamp')
+    item.add_action(_action('one'))
+    item.clear_actions()
+    assert item.actions == ()
+    assert item.get_actions('use') == ()
+
+    rub = _action('rub', 'rub')
+    item.actions = [rub]
+    assert item.get_actions('rub') == (rub,)
+    assert item.get_actions('use') == ()
+
+
+def test_items_without_actions_share_nothing_mutable():
+    lamp, key = InventoryItem('a lamp'), InventoryItem('a key')
+    lamp.add_action(_action('one'))
+    assert key.actions == ()
+    assert key.get_actions('use') == ()
+
+
+def test_every_action_for_the_verb_runs():
+    room = Room('hall')
+    lamp = InventoryItem('a lamp')
+    lamp.add_alias('lamp')
+    lamp.add_action(_action('Click. '))
+    lamp.add_action(_action('rubbed', 'rub'))
+    lamp.add_action(_action('It glows.'))
+    room.add_inventory(lamp)
+    world = TextWorld('test', [room])
+    assert world.take_action('use lamp') == 'Click. It glows.'
+    assert world.take_action('eat lamp') == 'You cannot do that.'
@@ -0,0 +1,59 @@
+'''
+Tests of games played in a shared world (overlay.py) against independent
+worlds.
+'''
+
+import pytest
+
+from text_adventure.overlay import SharedWorld
+from text_adventure.server import Session
+
+from walkthroughs import WALKTHROUGHS, build, snapshot
+
+################# CONSTANTS ###################################################
+N_GAMES = 4
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_interleaved_games_match_independent_worlds(game):
+    '''
+    Games at different points of the walkthrough, played a turn each in
+    turn, respond and change like independent worlds.
+    '''
+    commands = WALKTHROUGHS[game]
+    shared = SharedWorld(build(game))
+    games = [shared.new_game() for _ in range(N_GAMES)]
+    worlds = [build(game) for _ in range(N_GAMES)]
+    # game i starts i turns behind game 0.
+    for turn in range(len(commands) + N_GAMES):
+        for i, (overlay_game, world) in enumerate(zip(games, worlds)):
+            if 0 <= turn - i < len(commands):
+                command = commands[turn - i]
+                assert overlay_game.take_action(command) \
+                    == world.take_action(command)
+        for overlay_game, world in zip(games, worlds):
+            assert snapshot(overlay_game) == snapshot(world)
+
+
+def test_new_game_starts_in_initial_state():
+    commands = WALKTHROUGHS['mini_knightmare']
+    shared = SharedWorld(build('mini_knightmare'))
+    shared.new_game().run_batch(commands)
+    assert snapshot(shared.new_game()) == snapshot(build('mini_knightmare'))
+
+
+def test_describing_a_room_does_not_change_other_games():
+    '''
+    The welcome shown by the first description of a room is shown to
+    every game.
+    '''
+    world = build('mini_knightmare')
+    world.current_room.first_enter_msg = 'Welcome! '
+    shared = SharedWorld(world)
+    first, second = shared.new_game(), shared.new_game()
+    assert first.describe_current_room().startswith('Welcome! ')
+    assert Session(2, second, None).opening().count('Welcome! ') == 1
+    assert not first.describe_current_room().startswith('Welcome! ')
+    assert not second.describe_current_room().startswith('Welcome! ')
+    assert shared.new_game().describe_current_room().startswith('Welcome! ')
+    assert snapshot(first) == snapshot(second)
@@ -0,0 +1,91 @@
+'''
+Tests of games with several players (Player in world.py).
+'''
+
+import pytest
+
+from text_adventure.commands import SHARED_UNDO_MSG
+from text_adventure.state import StateCodec
+from text_adventure.world import DEFAULT_PLAYER_NAME
+
+from walkthroughs import build
+
+
+def test_players_act_independently():
+    world = build('mini_knightmare')
+    bob = world.add_player('bob')
+    first = world.player
+    world.take_action('get helmet', bob)
+    assert world.player is first
+    assert world.inventory_count == 0
+    assert [item.name for item in bob.inventory] \
+        == ['The Helmet of Justice']
+    assert 'Helmet' in world.take_action('inv', 'bob')
+    assert world.run_batch(['inv'], 'bob').responses \
+        == [world.take_action('inv', bob)]
+    assert world.player is first
+
+
+def test_add_player():
+    world = build('data_day_adventure')
+    corridor = world.start_room.exits['n']
+    eve = world.add_player('eve', corridor)
+    assert world.players['eve'] is eve
+    assert eve.current_room is corridor
+    assert world.add_player('bob').current_room is world.start_room
+    with pytest.raises(ValueError):
+        world.add_player('bob')
+
+
+def test_remove_player_leaves_items():
+    world = build('mini_knightmare')
+    world.add_player('bob')
+    world.take_action('get helmet', 'bob')
+    room = world.players['bob'].current_room
+    world._act_as('bob')
+    world.remove_player('bob')
+    assert 'bob' not in world.players
+    assert world.player is world.players[DEFAULT_PLAYER_NAME]
+    assert room.find_inventory('helmet') is not None
+    with pytest.raises(KeyError):
+        world.remove_player('bob')
+    with pytest.raises(ValueError):
+        world.remove_player(DEFAULT_PLAYER_NAME)
+
+
+def test_acting_player_restored_after_error():
+    world = build('mini_knightmare')
+    world.add_player('bob')
+    first = world.player
+    with pytest.raises(KeyError):
+        world.take_action('look', 'nobody')
+    assert world.player is first
+
+
+def test_undo_refused_with_several_players():
+    world = build('mini_knightmare')
+    world.enable_undo()
+    world.take_action('get helmet')
+    world.add_player('bob')
+    assert world.take_action('undo') == SHARED_UNDO_MSG
+    assert world.take_action('redo') == SHARED_UNDO_MSG
+    assert world.inventory_count == 1
+    world.remove_player('bob')
+    assert not world.journal.can_undo
+
+
+def test_codec_rejects_changed_players():
+    world = build('mini_knightmare')
+    world.add_player('bob')
+    codec = StateCodec(world)
+    world.take_action('get helmet', 'bob')
+    state = codec.capture()
+    world.take_action('drop helmet', 'bob')
+    codec.restore(state)
+    assert world.players['bob'].inventory_count == 1
+
+    world.add_player('eve')
+    with pytest.raises(ValueError):
+        codec.capture()
+    with pytest.raises(ValueError):
+        codec.restore(state)
@@ -0,0 +1,53 @@
+'''
+Tests of render events and renderers (render.py).
+'''
+
+import io
+import os
+
+from text_adventure.render import (ANSI_CLEAR, CLEAR_SCREEN,
+                                   HeadlessRenderer, Renderer,
+                                   TerminalRenderer)
+
+from walkthroughs import build
+
+
+class RecordingRenderer(Renderer):
+    '''
+    Records the render events it is sent.
+    '''
+    def __init__(self):
+        self.events = []
+
+    def render_event(self, event):
+        self.events.append(event)
+
+
+def test_headless_by_default():
+    assert isinstance(build('mini_knightmare').renderer, HeadlessRenderer)
+
+
+def test_moving_clears_the_screen():
+    world = build('data_day_adventure')
+    world.renderer = RecordingRenderer()
+    world.take_action('inv')
+    assert world.renderer.events == []
+    world.take_action('n')
+    assert world.renderer.events == [CLEAR_SCREEN]
+
+
+def test_terminal_writes_escape_sequence(monkeypatch):
+    def no_shell(command):
+        raise AssertionError(f'os.system({command!r}) called')
+
+    monkeypatch.setattr(os, 'name', 'posix')
+    monkeypatch.setattr(os, 'system', no_shell)
+    stream = io.StringIO()
+    TerminalRenderer(stream).render_event(CLEAR_SCREEN)
+    assert stream.getvalue() == ANSI_CLEAR
+
+
+def test_terminal_ignores_other_events():
+    stream = io.StringIO()
+    TerminalRenderer(stream).render_event('unknown')
+    assert stream.getvalue() == ''
@@ -0,0 +1,113 @@
+'''
+Tests of Room descriptions and their segments (world.py).
+'''
+
+import pytest
+
+from text_adventure.world import InventoryItem, Room
+
+from walkthroughs import build
+
+
+def _item(name, background=False):
+    item = InventoryItem(name, background=background)
+    item.add_alias(name)
+    return item
+
+
+def test_first_enter_message_once():
+    room = Room('hall', first_enter_msg='Welcome! ')
+    room.description = 'A hall.'
+    assert room.describe() == 'Welcome! A hall.'
+    assert room.visited
+    assert room.describe() == 'A hall.'
+
+
+def test_cached_description_is_reused():
+    room = Room('hall')
+    room.description = 'A hall.'
+    room.describe()
+    assert room.describe() is room.describe()
+
+
+def test_cache_follows_inventory():
+    room = Room('hall')
+    room.description = 'A hall.'
+    lamp = _item('lamp')
+    assert room.describe() == 'A hall.'
+    room.add_inventory(lamp)
+    assert room.describe() == 'A hall.\nYou can also see:\n\nlamp\n'
+    room.remove_inventory(lamp)
+    assert room.describe() == 'A hall.'
+    room.add_inventory(lamp)
+    room.clear_inventory()
+    assert room.describe() == 'A hall.'
+
+
+def test_background_items_not_listed():
+    room = Room('hall')
+    room.description = 'A hall.'
+    room.add_inventory(_item('wall', background=True))
+    assert room.describe() == 'A hall.'
+    room.add_inventory(_item('lamp'))
+    assert room.describe() == 'A hall.\nYou can also see:\n\nlamp\n'
+
+
+def test_cache_follows_description():
+    room = Room('hall')
+    room.description = 'A hall.'
+    room.describe()
+    room.description = 'A dark hall.'
+    assert room.describe() == 'A dark hall.'
+
+
+def test_description_after_taking_an_item():
+    world = build('data_day_adventure')
+    world.run_batch(['n', 'e'])
+    before = world.take_action('look')
+    assert before.endswith('You can also see:\n\ntricorder\n')
+    world.take_action('get tricorder')
+    assert 'You can also see' not in world.take_action('look')
+    world.take_action('drop tricorder')
+    assert world.take_action('look') == before
+
+
+def test_segments_join_in_order():
+    room = Room('hall')
+    room.description = 'A hall.'
+    door = room.append_description(' A door is open.')
+    room.append_description(' A lamp burns.')
+    assert room.description == 'A hall. A door is open. A lamp burns.'
+    room.replace_description_segment(door, ' A door is shut.')
+    assert room.description == 'A hall. A door is shut. A lamp burns.'
+    room.remove_description_segment(door)
+    assert room.description == 'A hall. A lamp burns.'
+    assert room.describe() == 'A hall. A lamp burns.'
+
+
+def test_unknown_segment():
+    room = Room('hall')
+    segment = room.append_description('A hall.')
+    room.remove_description_segment(segment)
+    with pytest.raises(KeyError):
+        room.replace_description_segment(segment, 'gone')
+    with pytest.raises(KeyError):
+        room.remove_description_segment(segment)
+
+
+def test_setting_description_replaces_segments():
+    room = Room('hall')
+    segment = room.append_description('A hall.')
+    room.append_description(' A lamp burns.')
+    room.description = 'A cellar.'
+    assert room.description == 'A cellar.'
+    with pytest.raises(KeyError):
+        room.replace_description_segment(segment, 'A hall.')
+
+
+def test_segment_cache_invalidated():
+    room = Room('hall')
+    room.description = 'A hall.'
+    assert room.describe() == 'A hall.'
+    room.append_description(' A lamp burns.')
+    assert room.describe() == 'A hall. A lamp burns.'
@@ -0,0 +1,121 @@
+'''
+Tests of the routing index and the 'go' command (routing.py).
+'''
+
+import random
+from collections import deque
+
+from text_adventure.commands import ALREADY_THERE_MSG, NO_ROUTE_MSG
+from text_adventure.generator import generate_world
+
+from walkthroughs import build, play, snapshot
+
+
+def bfs_distance(source, target):
+    '''
+    Reference shortest distance by a forward breadth first search.
+    '''
+    dist = {id(source): 0}
+    queue = deque([source])
+    while queue:
+        room = queue.popleft()
+        if room is target:
+            return dist[id(room)]
+        for next_room in room.exits.values():
+            if id(next_room) not in dist:
+                dist[id(next_room)] = dist[id(room)] + 1
+                queue.append(next_room)
+    return None
+
+
+def follow(source, directions):
+    room = source
+    for direction in directions:
+        room = room.exits[direction]
+    return room
+
+
+def check_routes(routing, rooms, rng, n_pairs=100):
+    for _ in range(n_pairs):
+        source, target = rng.choice(rooms), rng.choice(rooms)
+        expected = bfs_distance(source, target)
+        assert routing.distance(source, target) == expected
+        path = routing.path(source, target)
+        if expected is None:
+            assert path is None
+        else:
+            assert len(path) == expected
+            assert follow(source, path) is target
+
+
+def test_routes_are_shortest():
+    world = generate_world(400, exit_density=2.5, seed=1)
+    routing = world.enable_routing(cache_size=8)
+    check_routes(routing, world.rooms, random.Random(0))
+
+
+def test_routes_follow_exit_changes():
+    world = generate_world(300, exit_density=2.5, seed=2)
+    routing = world.enable_routing(cache_size=8)
+    rooms = world.rooms
+    rng = random.Random(1)
+    check_routes(routing, rooms, rng, 30)
+    for _ in range(40):
+        room = rng.choice(rooms)
+        if room.exits and rng.random() < 0.5:
+            room.remove_exit(rng.choice(list(room.exits)))
+        else:
+            free = [d for d in ('n', 's', 'e', 'w', 'u', 'd')
+                    if d not in room.exits]
+            if free:
+                room.add_exit(rng.choice(rooms), rng.choice(free))
+        check_routes(routing, rooms, rng, 10)
+
+
+def test_find_rooms_ignores_case():
+    world = build('data_day_adventure')
+    routing = world.enable_routing()
+    assert routing.find_rooms("  DATA'S   quarters ") == [world.rooms[0]]
+    assert routing.find_rooms('nowhere') == []
+
+
+def test_go_to_visited_room():
+    world = play('data_day_adventure', 3)
+    world.enable_routing()
+    quarters = world.rooms[0].name
+    moved = world.take_action(f'go to {quarters}')
+    assert world.current_room is world.rooms[0]
+    assert moved == world.rooms[0].describe()
+    assert world.take_action(f'go {quarters}') == ALREADY_THERE_MSG
+
+
+def test_go_is_the_same_as_moving():
+    '''
+    Going to a room changes the game exactly like typing the moves.
+    '''
+    world = play('data_day_adventure', 3)
+    routing = world.enable_routing()
+    moves = routing.path(world.current_room, world.rooms[0])
+    world.take_action(f'go to {world.rooms[0].name}')
+    typed = play('data_day_adventure', 3)
+    for direction in moves:
+        typed.take_action(direction)
+    assert snapshot(world) == snapshot(typed)
+
+
+def test_go_needs_a_visited_room():
+    world = build('data_day_adventure')
+    world.enable_routing()
+    unvisited = world.rooms[-1].name
+    assert world.take_action(f'go to {unvisited}') \
+        == NO_ROUTE_MSG.format(unvisited.lower())
+    assert world.take_action('go') == 'Where would you like to go?'
+
+
+def test_disable_routing_removes_go():
+    world = build('data_day_adventure')
+    world.enable_routing()
+    world.disable_routing()
+    assert world.routing is None
+    assert world.take_action('go to bridge') \
+        == "I don't know how to go to bridge"
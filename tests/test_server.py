@@ -0,0 +1,181 @@
+'''
+Tests of the asyncio game server (server.py).
+'''
+
+import asyncio
+import sys
+
+import pytest
+
+from text_adventure import server
+from text_adventure.server import (GameServer, PROMPT, SESSION_ERROR_MSG,
+                                   SHUTDOWN_MSG, load_game_module)
+
+from walkthroughs import build
+
+################# CONSTANTS ###################################################
+# seconds to wait for the server in a test.
+TIMEOUT = 5.0
+
+
+def _run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, TIMEOUT))
+
+
+async def _start(load_adventure, **kwargs):
+    game_server = GameServer(load_adventure, port=0, **kwargs)
+    await game_server.start()
+    return game_server, game_server.sockets[0].getsockname()[1]
+
+
+async def _read_until(reader, text):
+    data = await reader.readuntil(text.encode('utf-8'))
+    return data.decode('utf-8')
+
+
+def test_play_a_session():
+    async def play():
+        game_server, port = await _start(
+            lambda: build('mini_knightmare'))
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        opening = await _read_until(reader, PROMPT)
+        writer.write(b'get helmet\n')
+        reply = await _read_until(reader, PROMPT)
+        assert game_server.session_count == 1
+        writer.write(b'quit\n')
+        await reader.read()
+        writer.close()
+        await game_server.shutdown()
+        return opening, reply
+
+    opening, reply = _run(play())
+    world = build('mini_knightmare')
+    assert world.current_room.describe() in opening
+    assert world.take_action('get helmet') in reply
+
+
+def test_sessions_are_independent():
+    async def play():
+        game_server, port = await _start(
+            lambda: build('mini_knightmare'))
+        first = await asyncio.open_connection('127.0.0.1', port)
+        second = await asyncio.open_connection('127.0.0.1', port)
+        for reader, _ in (first, second):
+            await _read_until(reader, PROMPT)
+        first[1].write(b'get helmet\n')
+        await _read_until(first[0], PROMPT)
+        replies = []
+        for reader, writer in (first, second):
+            writer.write(b'inv\n')
+            replies.append(await _read_until(reader, PROMPT))
+        await game_server.shutdown()
+        return replies
+
+    held, empty = _run(play())
+    assert 'Helmet' in held
+    assert 'Helmet' not in empty
+
+
+def test_error_ends_only_that_session():
+    calls = []
+
+    def load_adventure():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError('broken game')
+        return build('mini_knightmare')
+
+    async def play():
+        game_server, port = await _start(load_adventure)
+        reader, _ = await asyncio.open_connection('127.0.0.1', port)
+        failed = await reader.read()
+        reader, _ = await asyncio.open_connection('127.0.0.1', port)
+        opening = await _read_until(reader, PROMPT)
+        await game_server.shutdown()
+        return failed.decode('utf-8'), opening
+
+    failed, opening = _run(play())
+    assert SESSION_ERROR_MSG in failed
+    assert opening.endswith(PROMPT)
+
+
+def test_shutdown_notifies_players():
+    async def play():
+        game_server, port = await _start(
+            lambda: build('mini_knightmare'))
+        connections = [await asyncio.open_connection('127.0.0.1', port)
+                       for _ in range(3)]
+        for reader, _ in connections:
+            await _read_until(reader, PROMPT)
+        await game_server.shutdown()
+        messages = [(await reader.read()).decode('utf-8')
+                    for reader, _ in connections]
+        return messages, game_server.session_count
+
+    messages, session_count = _run(play())
+    assert all(SHUTDOWN_MSG in message for message in messages)
+    assert session_count == 0
+
+
+def test_server_full():
+    async def play():
+        game_server, port = await _start(
+            lambda: build('mini_knightmare'), max_sessions=1)
+        reader, _ = await asyncio.open_connection('127.0.0.1', port)
+        await _read_until(reader, PROMPT)
+        full, _ = await asyncio.open_connection('127.0.0.1', port)
+        message = await full.read()
+        await game_server.shutdown()
+        return message.decode('utf-8')
+
+    assert _run(play()).startswith(server.SERVER_FULL_MSG)
+
+
+class SlowWriter:
+    '''
+    A stream writer that fails if it is drained by two tasks at once (as
+    asyncio streams do on Python 3.8).
+    '''
+    def __init__(self):
+        self.data = b''
+        self.draining = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        assert not self.draining, 'drained by two tasks at once'
+        self.draining = True
+        await asyncio.sleep(0.01)
+        self.draining = False
+
+
+def test_sends_to_a_session_are_serialised():
+    async def send():
+        session = server.Session(1, build('mini_knightmare'), SlowWriter())
+        await asyncio.gather(session.send('reply'),
+                             GameServer(None)._notify(session, SHUTDOWN_MSG))
+        return session.writer.data.decode('utf-8')
+
+    assert _run(send()) == f'reply\n{SHUTDOWN_MSG}\n'
+
+
+def test_load_example_game_by_name():
+    module = load_game_module('mini_knightmare')
+    assert module.__name__ == 'text_adventure.example_games.mini_knightmare'
+
+
+def test_load_game_module_reports_errors_inside_the_module(tmp_path,
+                                                           monkeypatch):
+    (tmp_path / 'broken_game.py').write_text(
+        'import a_module_that_is_not_installed\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    with pytest.raises(ImportError) as error:
+        load_game_module('broken_game')
+    assert error.value.name == 'a_module_that_is_not_installed'
+    sys.modules.pop('broken_game', None)
+
+
+def test_load_missing_game_module():
+    with pytest.raises(ImportError):
+        load_game_module('no_such_game')
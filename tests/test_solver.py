@@ -0,0 +1,78 @@
+'''
+Tests of the state space solver (solver.py).
+'''
+
+from text_adventure.example_games import data_day_adventure, mini_knightmare
+from text_adventure.solver import admissible_commands, game_completed, solve
+
+from walkthroughs import build
+
+
+def replay(game, commands):
+    world = build(game)
+    response = None
+    for command in commands:
+        response = world.take_action(command)
+    return world, response
+
+
+def test_solution_wins_game():
+    result = solve(mini_knightmare.load_adventure)
+    assert result.solved and result.complete
+    world, response = replay('mini_knightmare', result.solution)
+    assert not world.active
+    assert game_completed(world, response)
+
+
+def test_dead_ends_cannot_win():
+    result = solve(mini_knightmare.load_adventure)
+    dead_ends = result.dead_ends
+    assert dead_ends
+    # shortest first
+    assert [len(path) for path in dead_ends] \
+        == sorted(len(path) for path in dead_ends)
+    world, response = replay('mini_knightmare', dead_ends[0])
+    assert not game_completed(world, response)
+
+
+def test_death_is_not_completion():
+    for path in solve(mini_knightmare.load_adventure).dead_ends:
+        world, response = replay('mini_knightmare', path)
+        if not world.active:
+            assert not game_completed(world, response)
+            break
+    else:
+        raise AssertionError('no dead end ends the game')
+    assert '_solver_death_messages' not in vars(world)
+
+
+def test_limits_stop_search():
+    result = solve(data_day_adventure.load_adventure, drop=False,
+                   max_depth=3)
+    assert not result.complete
+    assert result.depth == 3
+    assert not result.solved
+
+
+def test_custom_goal():
+    def in_corridor(world, response):
+        return world.current_room.name != "Data's Quarters"
+
+    result = solve(data_day_adventure.load_adventure, goal=in_corridor,
+                   drop=False, max_depth=1)
+    assert result.solution == ('n',)
+
+
+def test_admissible_commands():
+    world = build('data_day_adventure')
+    commands = admissible_commands(world)
+    assert 'n' in commands
+    assert 'look' not in commands and 'quit' not in commands
+    assert len(commands) == len(set(commands))
+
+
+def test_workers_match_single_process():
+    single = solve(data_day_adventure.load_adventure, drop=False)
+    pooled = solve(data_day_adventure.load_adventure, drop=False, workers=2)
+    assert pooled.solution == single.solution
+    assert pooled.n_states == single.n_states
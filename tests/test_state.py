@@ -0,0 +1,95 @@
+'''
+Tests of capturing, saving and loading game state (state.py).
+'''
+
+import io
+
+import pytest
+
+from text_adventure.state import StateCodec, load_state, save_state
+from text_adventure.template import WorldTemplate
+
+from walkthroughs import WALKTHROUGHS, build, play, snapshot
+
+
+def _save(world):
+    file = io.BytesIO()
+    save_state(world, file)
+    file.seek(0)
+    return file
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_capture_restore(game):
+    '''
+    Restoring a state captured at the start of play undoes the walkthrough
+    and restoring the final state redoes it.
+    '''
+    world = build(game)
+    codec = StateCodec(world)
+    start = codec.capture()
+    for command in WALKTHROUGHS[game]:
+        world.take_action(command)
+    end = codec.capture()
+    played = snapshot(world)
+
+    codec.restore(start)
+    assert snapshot(world) == snapshot(build(game))
+    codec.restore(end, start)
+    assert snapshot(world) == played
+    assert codec.capture() == end
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_codec_created_mid_game(game):
+    '''
+    A codec created during play lays out states like one created before
+    play, so states captured by either restore in the other's world.
+    '''
+    before = StateCodec(build(game))
+    world = play(game, len(WALKTHROUGHS[game]) // 2)
+    during = before.bind(world)
+    assert during.fingerprint == before.fingerprint
+
+    before.restore(during.capture())
+    assert snapshot(before.world) == snapshot(world)
+
+
+def test_bind_another_game():
+    codec = StateCodec(build('mini_knightmare'))
+    with pytest.raises(ValueError):
+        codec.bind(build('data_day_adventure'))
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_save_load_round_trip(game):
+    '''
+    A save made at any point of a walkthrough loads into a fresh world (and
+    a clone) that plays the rest of the walkthrough the same way.
+    '''
+    commands = WALKTHROUGHS[game]
+    template = WorldTemplate(build(game))
+    for split in sorted({0, 1, len(commands) // 3, 2 * len(commands) // 3,
+                         len(commands) - 1}):
+        for loaded in (build(game), template.clone()):
+            world = play(game, split)
+            load_state(loaded, _save(world))
+            assert snapshot(loaded) == snapshot(world)
+            for command in commands[split:]:
+                assert loaded.take_action(command) \
+                    == world.take_action(command)
+                assert snapshot(loaded) == snapshot(world)
+
+
+def test_load_into_another_game():
+    file = _save(build('mini_knightmare'))
+    with pytest.raises(ValueError):
+        load_state(build('data_day_adventure'), file)
+
+
+def test_load_into_changed_game():
+    file = _save(build('mini_knightmare'))
+    world = build('mini_knightmare')
+    world.rooms[0].name = 'Renamed'
+    with pytest.raises(ValueError):
+        load_state(world, file)
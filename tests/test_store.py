@@ -0,0 +1,29 @@
+'''
+Tests of worlds stored on disk and loaded room by room (store.py).
+'''
+
+import pytest
+
+from text_adventure.store import create_store, open_world
+from text_adventure.worldfile import dump_world
+
+from walkthroughs import WALKTHROUGHS, build
+
+
+@pytest.mark.parametrize('max_resident', [1, 2])
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_stored_world_plays_like_built_world(game, max_resident, tmp_path):
+    '''
+    A stored world that keeps few rooms in memory responds to the
+    walkthrough like the game built by load_adventure().
+    '''
+    path = str(tmp_path / f'{game}.db')
+    create_store(dump_world(build(game)), path)
+    stored = open_world(path, max_resident)
+    world = build(game)
+    for command in WALKTHROUGHS[game]:
+        assert stored.take_action(command) == world.take_action(command)
+        assert stored.current_room.name == world.current_room.name
+        assert [item.name for item in stored.inventory] \
+            == [item.name for item in world.inventory]
+    assert stored.active == world.active
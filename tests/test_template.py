@@ -0,0 +1,80 @@
+'''
+Tests of cloning built worlds (template.py).
+'''
+
+import pytest
+
+from text_adventure.template import WorldTemplate
+from text_adventure.world import InventoryHolder, InventoryItem
+
+from walkthroughs import WALKTHROUGHS, build, snapshot
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_clone_plays_like_built_world(game):
+    template = WorldTemplate(build(game))
+    clone = template.clone()
+    world = build(game)
+    assert snapshot(clone) == snapshot(world)
+    for command in WALKTHROUGHS[game]:
+        assert clone.take_action(command) == world.take_action(command)
+    assert snapshot(clone) == snapshot(world)
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_clones_are_independent(game):
+    source = build(game)
+    template = WorldTemplate(source)
+    played = template.clone()
+    untouched = template.clone()
+    played.run_batch(WALKTHROUGHS[game])
+    assert snapshot(untouched) == snapshot(build(game))
+    assert snapshot(source) == snapshot(build(game))
+    assert untouched.n_actions == 0
+
+
+def test_clone_shares_no_game_state():
+    '''
+    No Room, item or player of a clone belongs to the template's world or
+    another clone.
+    '''
+    source = build('mini_knightmare')
+    template = WorldTemplate(source)
+    first, second = template.clone(), template.clone()
+
+    def state_objects(world):
+        objects = {id(world), id(world.player)}
+        for holder in list(world.rooms) + [world.player]:
+            objects.add(id(holder))
+            objects.update(id(item) for item in holder.inventory)
+        return objects
+
+    assert not state_objects(first) & state_objects(source)
+    assert not state_objects(first) & state_objects(second)
+
+
+def test_clone_rewires_references():
+    source = build('mini_knightmare')
+    clone = WorldTemplate(source).clone()
+    for room in clone.rooms:
+        assert isinstance(room, InventoryHolder)
+        for exit_room in room.exits.values():
+            assert any(exit_room is other for other in clone.rooms)
+    assert clone.current_room is clone.rooms[source.rooms.index(
+        source.current_room)]
+    for item in clone.current_room.inventory:
+        assert isinstance(item, InventoryItem)
+
+
+def test_template_is_a_snapshot():
+    source = build('mini_knightmare')
+    template = WorldTemplate(source)
+    source.take_action('get helmet')
+    assert snapshot(template.clone()) == snapshot(build('mini_knightmare'))
+
+
+def test_from_loader():
+    template = WorldTemplate.from_loader(
+        lambda: build('data_day_adventure'))
+    clone = template.clone()
+    assert snapshot(clone) == snapshot(build('data_day_adventure'))
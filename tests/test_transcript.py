@@ -0,0 +1,96 @@
+'''
+Tests of transcript recording and replay (transcript.py).
+'''
+
+import copy
+import os
+
+import pytest
+
+from text_adventure import transcript as transcript_module
+from text_adventure.transcript import (GAME_ENDED, find_transcripts,
+                                       load_transcript, record_transcript,
+                                       replay_transcript, run_transcripts,
+                                       save_transcript)
+
+from walkthroughs import WALKTHROUGHS, build
+
+
+@pytest.mark.parametrize('use_template', [False, True])
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_replay_matches_recording(game, use_template):
+    transcript = record_transcript(game, WALKTHROUGHS[game],
+                                   use_template=use_template)
+    assert transcript['active'] is False
+    assert replay_transcript(transcript) is None
+    assert replay_transcript(transcript, use_template=True) is None
+
+
+def test_template_is_opt_in(monkeypatch):
+    monkeypatch.setattr(transcript_module, '_templates', {})
+    transcript = record_transcript('mini_knightmare', ['look'])
+    replay_transcript(transcript)
+    assert transcript_module._templates == {}
+    replay_transcript(transcript, use_template=True)
+    assert list(transcript_module._templates) == ['mini_knightmare']
+
+
+def test_recording_matches_take_action():
+    world = build('mini_knightmare')
+    transcript = record_transcript('mini_knightmare', ['look', 'n', 'inv'])
+    assert [step['response'] for step in transcript['steps']] \
+        == [world.take_action(command) for command in ['look', 'n', 'inv']]
+
+
+def test_changed_response_diverges():
+    transcript = record_transcript('mini_knightmare', ['look', 'inv'])
+    transcript['steps'][1]['response'] = 'You are carrying a sandwich.'
+    divergence = replay_transcript(transcript)
+    assert (divergence.step, divergence.command) == (1, 'inv')
+    assert '+' in divergence.diff() and 'sandwich' in divergence.diff()
+
+
+def test_game_ending_diverges():
+    transcript = record_transcript('mini_knightmare', ['look', 'quit'])
+    assert transcript['active'] is False
+
+    extra_step = copy.deepcopy(transcript)
+    extra_step['steps'].append({'command': 'look', 'response': 'x'})
+    divergence = replay_transcript(extra_step)
+    assert divergence.step == 2 and divergence.actual is GAME_ENDED
+
+    ended_early = copy.deepcopy(transcript)
+    ended_early['active'] = True
+    divergence = replay_transcript(ended_early)
+    assert divergence.step == 1 and divergence.actual is GAME_ENDED
+
+
+def test_run_transcripts(tmp_path):
+    for game in WALKTHROUGHS:
+        save_transcript(record_transcript(game, WALKTHROUGHS[game][:5]),
+                        os.path.join(tmp_path, f'{game}.json'))
+    broken = record_transcript('mini_knightmare', ['look'])
+    broken['steps'][0]['response'] = 'Nothing here.'
+    os.mkdir(os.path.join(tmp_path, 'more'))
+    save_transcript(broken, os.path.join(tmp_path, 'more', 'broken.json'))
+    with open(os.path.join(tmp_path, 'bad.json'), 'w') as f:
+        f.write('[]')
+
+    assert len(find_transcripts(tmp_path)) == 4
+    for use_template in (False, True):
+        report = run_transcripts(tmp_path, workers=1,
+                                 use_template=use_template)
+        assert not report.passed
+        failed = sorted(os.path.basename(result.path)
+                        for result in report.failures)
+        assert failed == ['bad.json', 'broken.json']
+        assert 'DIVERGED' in report.summary()
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = os.path.join(tmp_path, 'old.json')
+    transcript = record_transcript('mini_knightmare', ['look'])
+    transcript['format_version'] = 0
+    save_transcript(transcript, path)
+    with pytest.raises(ValueError):
+        load_transcript(path)
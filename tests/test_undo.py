@@ -0,0 +1,121 @@
+'''
+Tests of undo and redo (journal.py) against rebuilt worlds.
+'''
+
+import pytest
+
+from text_adventure.actions import BasicInventoryItemAction
+from text_adventure.commands import Command
+from text_adventure.state import StateCodec
+
+from walkthroughs import WALKTHROUGHS, build, play, snapshot
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_undo_redo_every_turn(game):
+    '''
+    Undoing a turn and redoing it leaves the game as it was.
+    '''
+    world = build(game)
+    world.enable_undo()
+    for n_turns, command in enumerate(WALKTHROUGHS[game], 1):
+        world.take_action(command)
+        played = snapshot(world)
+        undone = world.undo()
+        if undone is not None:
+            assert world.redo() == undone
+        assert snapshot(world) == played == snapshot(play(game, n_turns))
+
+
+@pytest.mark.parametrize('game', WALKTHROUGHS)
+def test_undo_to_start_and_redo_to_end(game):
+    '''
+    Each undo returns the game to the state of a rebuilt world that played
+    fewer turns.  Undoing every turn returns it to a new world and redoing
+    every turn to the end of the walkthrough.
+    '''
+    commands = WALKTHROUGHS[game]
+    prefixes = [snapshot(play(game, n_turns))
+                for n_turns in range(len(commands) + 1)]
+    world = build(game)
+    world.enable_undo(limit=None)
+    for command in commands:
+        world.take_action(command)
+
+    n_turns = len(commands)
+    while world.undo() is not None:
+        state = snapshot(world)
+        # the latest turn with this state.
+        n_turns = max(i for i in range(n_turns) if prefixes[i] == state)
+    assert snapshot(world) == snapshot(build(game))
+
+    while world.redo() is not None:
+        pass
+    assert snapshot(world) == prefixes[-1]
+
+
+def test_restore_clears_history():
+    '''
+    Undo after a restore would replay records of the replaced state.
+    '''
+    world = build('data_day_adventure')
+    world.enable_undo()
+    codec = StateCodec(world)
+    start = codec.capture()
+    for command in WALKTHROUGHS['data_day_adventure'][:6]:
+        world.take_action(command)
+    assert world.journal.can_undo
+    codec.restore(start)
+    assert not world.journal.can_undo
+    assert world.undo() is None
+    assert snapshot(world) == snapshot(build('data_day_adventure'))
+
+
+def test_journal_belongs_to_world():
+    first = build('mini_knightmare')
+    second = build('mini_knightmare')
+    first.enable_undo()
+    second.enable_undo()
+    first.take_action('get helmet')
+    assert first.journal.can_undo and not second.journal.can_undo
+    assert not first.journal.recording
+    assert second.undo() is None
+    assert first.undo() == 'get helmet'
+
+
+class Counter:
+    value = 0
+
+
+class IncrementCounter(Command):
+    '''
+    A command without a reference to its world.
+    '''
+    def __init__(self, counter):
+        self.counter = counter
+
+    def execute(self):
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal):
+        old = self.counter.value
+        self.counter.value += 1
+        if journal is not None:
+            journal.record_attribute(self.counter, 'value', old,
+                                     self.counter.value)
+        return 'Counted.'
+
+
+def test_action_passes_journal_to_commands():
+    world = build('mini_knightmare')
+    world.enable_undo()
+    counter = Counter()
+    helmet = world.current_room.find_inventory('helmet')
+    helmet.add_action(BasicInventoryItemAction(IncrementCounter(counter),
+                                               command_text='wear'))
+    assert world.take_action('wear helmet').endswith('Counted.')
+    assert counter.value == 1
+    assert world.undo() == 'wear helmet'
+    assert counter.value == 0
+    assert world.redo() == 'wear helmet'
+    assert counter.value == 1
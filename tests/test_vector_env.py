@@ -0,0 +1,73 @@
+'''
+Tests of stepping many worlds at once (vector_env.py).
+'''
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from text_adventure.vector_env import VectorTextEnv  # noqa: E402
+
+from walkthroughs import WALKTHROUGHS, build  # noqa: E402
+
+
+def _env(n_envs, **kwargs):
+    return VectorTextEnv(lambda: build('mini_knightmare'), n_envs, **kwargs)
+
+
+def test_step_before_reset():
+    with pytest.raises(RuntimeError):
+        _env(2).step(['look', 'look'])
+
+
+def test_step_needs_one_command_per_env():
+    envs = _env(2)
+    envs.reset()
+    with pytest.raises(ValueError):
+        envs.step(['look'])
+
+
+def test_steps_like_independent_worlds():
+    envs = _env(2)
+    obs = envs.reset()
+    world = build('mini_knightmare')
+    assert obs[0] == world.current_room.describe()
+    for command in WALKTHROUGHS['mini_knightmare'][:10]:
+        obs, rewards, dones, infos = envs.step([command, 'inv'])
+        assert obs[0] == world.take_action(command)
+        assert not dones.any()
+    assert envs.worlds[0].n_actions == 10
+    assert envs.worlds[1].inventory_count == 0
+
+
+def test_reward_for_new_rooms():
+    envs = VectorTextEnv(lambda: build('data_day_adventure'), 1)
+    envs.reset()
+    rewards = [envs.step([command])[1][0]
+               for command in ('look', 'n', 's', 'n')]
+    assert rewards == [0.0, 1.0, 0.0, 0.0]
+
+
+def test_done_envs_are_reset():
+    envs = _env(2)
+    envs.reset()
+    obs, rewards, dones, infos = envs.step(['quit', 'look'])
+    assert list(dones) == [True, False]
+    assert 'final_observation' in infos[0]
+    assert not infos[0]['truncated']
+    assert envs.worlds[0].active
+    assert obs[0] == build('mini_knightmare').current_room.describe()
+
+
+def test_truncated_after_max_steps():
+    envs = _env(1, max_steps=2)
+    envs.reset()
+    assert not envs.step(['look'])[2][0]
+    obs, rewards, dones, infos = envs.step(['look'])
+    assert dones[0] and infos[0]['truncated']
+
+
+def test_custom_reward():
+    envs = _env(1, reward_fn=lambda world, command, response: 0.5)
+    envs.reset()
+    assert envs.step(['look'])[1][0] == 0.5
@@ -0,0 +1,87 @@
+'''
+Walkthroughs of the example games and helpers shared by the tests.
+
+Functions:
+---------
+
+build: build a new world of an example game.
+
+play: build a world and play the start of its walkthrough.
+
+snapshot: the observable state of a world.
+'''
+
+import importlib
+
+################# CONSTANTS ###################################################
+# example game module -> commands that play it to the end.
+WALKTHROUGHS = {
+    'mini_knightmare': [
+        'look', 'get helmet', 'inv', 'ex helmet', 'wear helmet',
+        'talk treguard', 'answer treguard lamp', 'talk tre', 'enter portal',
+        'touch p', 'touch o', 'touch p', 'touch e', 'touch n', 'look', 'n',
+        'talk olgarth', 'answer olgarth stone', 'answer olgarth arthur',
+        'look', 'w', 'spellcasting bridge', 'talk lilith', 'n', 'e',
+        'light lamp', 'n', 'enter portal', 'look'],
+    'data_day_adventure': [
+        'look', 'n', 'e', 'talk obrien', 'get tricorder', 'scan tricorder',
+        'inv', 'w', 'n', 'e', 'activate replicator',
+        'answer replicator gift', 'w', 'u', 'give picard', 'look', 'e',
+        'dance instructor', 'w', 'd', 'e', 'give keiko', 'inv'],
+}
+
+
+def build(game):
+    '''
+    Build a new world of an example game.
+
+    Params:
+    ------
+    game: str
+        Name of a module in text_adventure.example_games.
+
+    Returns:
+    -------
+    TextWorld
+    '''
+    module = importlib.import_module(f'text_adventure.example_games.{game}')
+    return module.load_adventure()
+
+
+def play(game, n_turns):
+    '''
+    Build a new world of an example game and play the first n_turns of its
+    walkthrough.
+
+    Returns:
+    -------
+    TextWorld
+    '''
+    world = build(game)
+    for command in WALKTHROUGHS[game][:n_turns]:
+        world.take_action(command)
+    return world
+
+
+def snapshot(world):
+    '''
+    The observable state of a world: where the players are, what they and
+    the rooms hold, room descriptions and exits and the actions of held
+    items.  Independent of StateCodec so the codec can be checked with it.
+
+    Returns:
+    -------
+    tuple
+    '''
+    def items(holder):
+        return [(item.name, [f'{type(action).__name__} {action.command_text}'
+                             for action in item.actions])
+                for item in holder.inventory]
+
+    players = [(name, player.current_room.name, items(player))
+               for name, player in world.players.items()]
+    rooms = [(room.name, room.description, room.visited, items(room),
+              sorted((direction, exit_room.name)
+                     for direction, exit_room in room.exits.items()))
+             for room in world.rooms]
+    return (world.active, world.game_over_message, players, rooms)
@@ -14,6 +14,7 @@ super class.
 '''
 
 from abc import ABC, abstractmethod
+from sys import intern
 
 ################# CONSTANTS ###################################################
 COMMAND_ERROR = "You cannot do that."
@@ -25,6 +26,8 @@ class InventoryItemAction(ABC):
     '''
     Base class for all inventory item actions
     '''
+    __slots__ = ()
+
     @abstractmethod
     def add_command(command):
         pass
@@ -42,6 +45,8 @@ class BasicInventoryItemAction(InventoryItemAction):
     may alter the game state and will return a msg.  The msg is concat and
     returned to the player.
     '''
+    __slots__ = ('commands', 'command_text', 'invalid_msg')
+
     def __init__(self, command, command_text='use', invalid_msg=COMMAND_ERROR):
         '''
         Construct a BasicInventoryItemAction
@@ -62,7 +67,7 @@ class BasicInventoryItemAction(InventoryItemAction):
         else:
             self.commands = [command]
 
-        self.command_text = command_text
+        self.command_text = intern(command_text)
         self.invalid_msg = invalid_msg
 
     def add_command(self, command):
@@ -85,8 +90,9 @@ class BasicInventoryItemAction(InventoryItemAction):
         msg = ''
 
         if self.command_text == command_text:
+            journal = kwargs.get('journal')
             for cmd in self.commands:
-                msg += cmd.execute()
+                msg += cmd.execute_with_journal(journal)
         else:
             msg = self.invalid_msg
 
@@ -102,6 +108,9 @@ class RestrictedInventoryItemAction(InventoryItemAction):
     Note: if a player is the holder then there is no requirement
     to be in a specific room.
     '''
+    __slots__ = ('commands', 'command_text', 'requirements', 'holder',
+                 'fail_message')
+
     def __init__(self, holder, command, requirements, not_holding_msg,
                  command_txt='use'):
         '''
@@ -134,7 +143,7 @@ class RestrictedInventoryItemAction(InventoryItemAction):
         else:
             self.commands = [command]
 
-        self.command_text = command_txt
+        self.command_text = intern(command_txt)
         self.requirements = requirements
         self.holder = holder
         self.fail_message = not_holding_msg
@@ -157,8 +166,9 @@ class RestrictedInventoryItemAction(InventoryItemAction):
 
         if self._requirements_satisifed():
             msg = ''
+            journal = kwargs.get('journal')
             for cmd in self.commands:
-                msg += cmd.execute()
+                msg += cmd.execute_with_journal(journal)
 
         else:
             msg = self.fail_message
@@ -174,6 +184,8 @@ class ChoiceInventoryItemAction(InventoryItemAction):
     Provides a player with a choice between actions based
     on their answer...
     '''
+    __slots__ = ('choices', 'command_text', 'invalid_choice')
+
     def __init__(self, choices, command_text='use',
                  invalid_choice="You can't do that."):
         '''
@@ -188,7 +200,7 @@ class ChoiceInventoryItemAction(InventoryItemAction):
         command_text: str, optional (default='use')
         '''
         self.choices = choices
-        self.command_text = command_text
+        self.command_text = intern(command_text)
         self.invalid_choice = invalid_choice
 
     def add_command(self, command):
@@ -222,12 +234,15 @@ class ConditionalInventoryItemAction(InventoryItemAction):
     If answer is correct then attempt action a
     Else attempt action y.
     '''
+    __slots__ = ('correct_answer', 'action_correct', 'action_incorrect',
+                 'command_text')
+
     def __init__(self, correct_answer, action_correct, action_incorrect,
                  command_text='use'):
         self.correct_answer = correct_answer
         self.action_correct = action_correct
         self.action_incorrect = action_incorrect
-        self.command_text = command_text
+        self.command_text = intern(command_text)
 
     def add_command(self, command):
         '''
@@ -260,11 +275,13 @@ class RoomSpecificInventoryItemAction(InventoryItemAction):
     '''
     Action with item will only work in specific room
     '''
+    __slots__ = ('game', 'context', 'action', 'command_text')
+
     def __init__(self, game, context, action, command_text='use'):
         self.game = game
         self.context = context
         self.action = action
-        self.command_text = command_text
+        self.command_text = intern(command_text)
 
     def add_command():
         pass
@@ -272,7 +289,7 @@ class RoomSpecificInventoryItemAction(InventoryItemAction):
     def try_to_execute(self, command_text, **kwargs):
         msg = ''
         if self.game.current_room == self.context:
-            msg = self.action.try_to_execute(command_text)
+            msg = self.action.try_to_execute(command_text, **kwargs)
 
         return msg
 
@@ -2,18 +2,33 @@
 Basic commands
 
 Move
+Go to a room
 Pick up/drop inventory
 Examine inventory
 Quit game
 View inventory
+Undo/redo a turn
 
+When undo is enabled commands that change the game record how to reverse
+each change in the Journal of the turn (see journal.py).  Commands that hold
+their TextWorld use `game.journal`.  The others are passed the journal by
+the action executing them through `execute_with_journal`.
 '''
 
 from abc import ABC, abstractmethod
-import os
+from time import perf_counter_ns
+
+from .instrument import ACTIONS, RESOLVE
+from .render import CLEAR_SCREEN
 
 DEFAULT_MOVE_ERROR = 'You cannot go that way.'
 DEFAULT_FAIL_MSG = 'You cannnot do that.'
+AMBIGUOUS_ITEM_MSG = "I'm not sure what you mean."
+NOTHING_TO_UNDO_MSG = 'There is nothing to undo.'
+NOTHING_TO_REDO_MSG = 'There is nothing to redo.'
+SHARED_UNDO_MSG = 'Undo is not available with more than one player.'
+NO_ROUTE_MSG = "You don't know the way to {}."
+ALREADY_THERE_MSG = 'You are already there.'
 
 
 class Command(ABC):
@@ -21,16 +36,33 @@ class Command(ABC):
     Abstract base class for all commands.  This has a simple interface
     that all commands must implement to work with the parsing game loop.
     '''
+    __slots__ = ()
+
     @abstractmethod
     def execute(self) -> str:
         pass
 
+    def execute_with_journal(self, journal) -> str:
+        '''
+        Execute the command as part of an action.  Commands that change the
+        game but do not hold a reference to their TextWorld override this
+        to record their changes.
+
+        Params:
+        ------
+        journal: Journal or None
+            The Journal recording the turn.  None if undo is disabled.
+        '''
+        return self.execute()
+
 
 class MoveRoom(Command):
     '''
     Move between two linked Room objects.
     direction must be valid.
     '''
+    __slots__ = ('game', 'direction', 'invalid_msg')
+
     def __init__(self, game, direction, invalid_msg=DEFAULT_MOVE_ERROR):
         '''
         Params:
@@ -54,10 +86,11 @@ class MoveRoom(Command):
         '''
         msg = ''
         try:
-            self.game.current_room = \
-                    self.game.current_room.exit(self.direction)
+            old_room = self.game.current_room
+            self.game.current_room = old_room.exit(self.direction)
+            _record_enter_room(self.game, old_room)
             # clear terminal or cmd prompt.
-            os.system('cls' if os.name == 'nt' else 'clear')
+            self.game.renderer.render_event(CLEAR_SCREEN)
             msg = self.game.current_room.describe()
         except ValueError:
             msg = self.invalid_msg
@@ -69,6 +102,8 @@ class SetCurrentRoom(Command):
     '''
     Set the current room that a player is in.
     '''
+    __slots__ = ('game', 'new_room')
+
     def __init__(self, game, new_room):
         '''
         Params:
@@ -89,15 +124,66 @@ class SetCurrentRoom(Command):
         '''
         msg = ''
 
+        old_room = self.game.current_room
         self.game.current_room = self.new_room
+        _record_enter_room(self.game, old_room)
         # clear terminal or cmd prompt.
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.game.renderer.render_event(CLEAR_SCREEN)
         msg = self.game.current_room.describe()
 
         return msg
 
 
+class GoToRoom(Command):
+    '''
+    Move to a room the player has visited along the shortest route.  Needs
+    routing (see TextWorld.enable_routing).
+    '''
+    __slots__ = ('game', 'room_name')
+
+    def __init__(self, game, room_name):
+        '''
+        Params:
+        -------
+        game: TextWorld
+            Current game
+
+        room_name: str
+            Name of the target room (case is ignored).
+        '''
+        self.game = game
+        self.room_name = room_name
+
+    def execute(self) -> str:
+        '''
+        Move one room at a time so that each move is the same as the player
+        typing it.  If several visited rooms share the name the nearest is
+        chosen.
+        '''
+        routing = self.game.routing
+        source = self.game.current_room
+        best = None
+        for room in routing.find_rooms(self.room_name):
+            if room is source:
+                return ALREADY_THERE_MSG
+            if room.visited:
+                route = routing.path(source, room)
+                if route is not None \
+                        and (best is None or len(route) < len(best)):
+                    best = route
+
+        if best is None:
+            return NO_ROUTE_MSG.format(self.room_name)
+
+        msg = ''
+        for direction in best:
+            msg = MoveRoom(self.game, direction).execute()
+        return msg
+
+
 class ExamineInventoryItem(Command):
+    __slots__ = ('game', 'room', 'description')
+
     def __init__(self, game, room, item_name):
         '''
         Parameters:
@@ -117,12 +203,21 @@ class ExamineInventoryItem(Command):
         self.description = item_name
 
     def execute(self) -> str:
-        item, _ = self.game.find_inventory(self.description)
+        instrumentation = self.game.instrumentation
+        if instrumentation is not None:
+            start = perf_counter_ns()
 
-        if item is not None:
-            return item.long_description
+        try:
+            item = self.game.find_inventory(self.description)
+
+            if item is None:
+                item = self.room.find_inventory(self.description)
+        except KeyError:
+            # alias shared by more than one item
+            return AMBIGUOUS_ITEM_MSG
 
-        item, _ = self.room.find_inventory(self.description)
+        if instrumentation is not None:
+            instrumentation.record(RESOLVE, perf_counter_ns() - start)
 
         if item is not None:
             return item.long_description
@@ -136,24 +231,51 @@ class TransferInventory(Command):
 
     Will only succeed if InventoryItem is not fixed to its holder.
     '''
-    def __init__(self, holder, reciever, alias):
+    __slots__ = ('holder', 'reciever', 'alias', 'game')
+
+    def __init__(self, holder, reciever, alias, game=None):
+        '''
+        Params:
+        ------
+        holder: InventoryHolder
+            Holds the item.
+
+        reciever: InventoryHolder
+            Receives the item.
+
+        alias: str
+            Alias of the item.
+
+        game: TextWorld, optional (default=None)
+            Current game.  Its journal records the transfer when the command
+            is executed directly rather than by an action.
+        '''
         self.holder = holder
         self.reciever = reciever
         self.alias = alias
+        self.game = game
 
     def execute(self):
+        journal = None if self.game is None else _turn_journal(self.game)
+        return self.execute_with_journal(journal)
+
+    def execute_with_journal(self, journal):
         msg = ''
-        selected_item, _ = self.holder.find_inventory(self.alias)
         try:
+            selected_item = self.holder.find_inventory(self.alias)
             if selected_item.fixed is False:
-                self.reciever.add_inventory(self.holder.get_inventory(self.alias))
+                if journal is not None:
+                    _record_remove(journal, self.holder, selected_item)
+                    _record_add(journal, self.reciever, selected_item)
+                self.holder.remove_inventory(selected_item)
+                self.reciever.add_inventory(selected_item)
                 msg = 'Okay.'
             else:
                 msg = "You can't do that."
         except AttributeError:
             msg = "You can't do that."
         except KeyError:
-            msg = "I'm not sure what you mean."
+            msg = AMBIGUOUS_ITEM_MSG
         return msg
 
 
@@ -161,6 +283,8 @@ class ViewPlayerInventory(Command):
     '''
     List the inventory items being carried.
     '''
+    __slots__ = ('player',)
+
     def __init__(self, player):
         self.player = player
 
@@ -179,12 +303,30 @@ class LookAtRoom(Command):
     '''
     Description of current room will be displayed.
     '''
-    def __init__(self, room):
+    __slots__ = ('room', 'game')
+
+    def __init__(self, room, game=None):
+        '''
+        Params:
+        -------
+        room: Room
+            The room to describe
+
+        game: TextWorld, optional (default=None)
+            Current game.  If provided the screen is cleared using the
+            game's renderer before the room is described and the first
+            visit is recorded in the game's journal when undo is enabled.
+        '''
         self.room = room
+        self.game = game
 
     def execute(self):
         # clear terminal or cmd prompt.
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if self.game is not None:
+            self.game.renderer.render_event(CLEAR_SCREEN)
+            journal = _turn_journal(self.game)
+            if journal is not None and not self.room.visited:
+                journal.record_attribute(self.room, 'visited', False, True)
         return self.room.describe()
 
 
@@ -192,6 +334,8 @@ class QuitGame(Command):
     '''
     Player will quit the game
     '''
+    __slots__ = ('game', 'quit_msg', 'game_over_msg')
+
     def __init__(self, game, quit_msg=None, game_over_msg=None):
         self.game = game
         if quit_msg is None:
@@ -202,6 +346,14 @@ class QuitGame(Command):
         self.game_over_msg = game_over_msg
 
     def execute(self):
+        journal = _turn_journal(self.game)
+        if journal is not None:
+            journal.record_attribute(self.game, 'active', self.game.active,
+                                     False)
+            if self.game_over_msg is not None:
+                journal.record_attribute(self.game, 'game_over_message',
+                                         self.game.game_over_message,
+                                         self.game_over_msg)
         self.game.active = False
         if self.game_over_msg is not None:
             self.game.game_over_message = self.game_over_msg
@@ -209,6 +361,9 @@ class QuitGame(Command):
 
 
 class UseInventoryItem(Command):
+    __slots__ = ('game', 'item_alias', 'command_text', 'parsed_command',
+                 'fail_message')
+
     def __init__(self, game, item_alias, command_text,
                  parsed_command, fail_message=DEFAULT_FAIL_MSG):
         self.game = game
@@ -223,30 +378,42 @@ class UseInventoryItem(Command):
         try to execute action using given command.
         '''
         msg = ''
+        instrumentation = self.game.instrumentation
+        if instrumentation is not None:
+            start = perf_counter_ns()
 
-        # try players inventory first.
-        selected_item, _ = self.game.find_inventory(self.item_alias)
+        try:
+            # try players inventory first.
+            selected_item = self.game.find_inventory(self.item_alias)
+
+            if selected_item is None:
+                # try current room
+                selected_item = \
+                    self.game.current_room.find_inventory(self.item_alias)
+        except KeyError:
+            # alias shared by more than one item
+            return AMBIGUOUS_ITEM_MSG
 
-        if selected_item is None:
-            # try current room
-            selected_item, _ = \
-                self.game.current_room.find_inventory(self.item_alias)
+        if instrumentation is not None:
+            resolved = perf_counter_ns()
+            instrumentation.record(RESOLVE, resolved - start)
 
         try:
             # dict of arguments an action may use...
             kwargs = {'item_alias': self.item_alias,
                       'current_room': self.game.current_room,
-                      'parsed_command': self.parsed_command}
-            for action in selected_item.actions:
-                # only try to execute action is command matches...
-                # maybe actions should be stored in dict???
-                if action.command_text == self.command_text:
-                    msg += action.try_to_execute(self.command_text,
-                                                 **kwargs)
+                      'parsed_command': self.parsed_command,
+                      'journal': _turn_journal(self.game)}
+            # actions are indexed by command text.
+            for action in selected_item.get_actions(self.command_text):
+                msg += action.try_to_execute(self.command_text, **kwargs)
         except AttributeError:
             # default if item not in players or room inventory
             msg = self.fail_message
 
+        if instrumentation is not None:
+            instrumentation.record(ACTIONS, perf_counter_ns() - resolved)
+
         if msg == '':
             msg = 'You cannot do that.'
 
@@ -257,6 +424,8 @@ class RemoveInventoryItem(Command):
     '''
     Remove an InventoryItem from a InventoryHolder.
     '''
+    __slots__ = ('holder', 'to_remove')
+
     def __init__(self, holder, to_remove):
         '''
         Constructor
@@ -271,7 +440,13 @@ class RemoveInventoryItem(Command):
         self.to_remove = to_remove
 
     def execute(self):
-        _ = self.holder.get_inventory(self.to_remove.name)
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal):
+        if self.holder.in_inventory(self.to_remove):
+            if journal is not None:
+                _record_remove(journal, self.holder, self.to_remove)
+            self.holder.remove_inventory(self.to_remove)
         return ""
 
 
@@ -279,6 +454,8 @@ class RemoveInventoryItemFromPlayerOrRoom(Command):
     '''
     Remove an InventoryItem from the player or the current room.
     '''
+    __slots__ = ('game', 'to_remove')
+
     def __init__(self, game, to_remove):
         '''
         Constructor
@@ -296,11 +473,16 @@ class RemoveInventoryItemFromPlayerOrRoom(Command):
 
         msg = ''
         if self.game.in_inventory(self.to_remove):
-             _ = self.game.get_inventory(self.to_remove.name)
+            holder = self.game
         elif self.game.current_room.in_inventory(self.to_remove):
-            _ = self.game.current_room.get_inventory(self.to_remove.name)
+            holder = self.game.current_room
         else:
-            msg = "You can't do that."
+            return "You can't do that."
+
+        journal = _turn_journal(self.game)
+        if journal is not None:
+            _record_remove(journal, holder, self.to_remove)
+        holder.remove_inventory(self.to_remove)
         return msg
 
 
@@ -308,6 +490,8 @@ class NullCommand(Command):
     '''
     No command is executed, but a static message is returned.
     '''
+    __slots__ = ('message',)
+
     def __init__(self, message):
         self.message = message
 
@@ -319,6 +503,8 @@ class AppendToCurrentRoomDescription(Command):
     '''
     Append some text to the long descriptio of the current room
     '''
+    __slots__ = ('game', 'to_append', 'action_text')
+
     def __init__(self, game, to_append, action_text=''):
         '''
         Constructor
@@ -341,18 +527,27 @@ class AppendToCurrentRoomDescription(Command):
         '''
         Append the additonal text.
         '''
-        self.game.current_room.description += self.to_append
+        _append_description(self.game.current_room, self.to_append,
+                            _turn_journal(self.game))
         return self.action_text
 
 
 class AddActionToInventoryItem(Command):
+    __slots__ = ('action', 'item', 'execute_msg')
+
     def __init__(self, action, item, execute_msg=""):
         self.action = action
         self.item = item
         self.execute_msg = execute_msg
 
     def execute(self) -> str:
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
         self.item.add_action(self.action)
+        if journal is not None:
+            journal.record(self.item._pop_action, (),
+                           self.item.add_action, (self.action,))
         return self.execute_msg
 
 
@@ -360,13 +555,22 @@ class ClearInventoryItemActions(Command):
     '''
     Reset the inventory item to have no actions...
     '''
+    __slots__ = ('item', 'execute_msg')
+
     def __init__(self, item, execute_msg=''):
         self.item = item
         self.execute_msg = execute_msg
 
     def execute(self) -> str:
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
         # reset the inventory item actions.
-        self.item.actions = []
+        if journal is not None:
+            journal.record(self.item._set_actions,
+                           (self.item._actions, self.item._actions_by_verb),
+                           self.item.clear_actions, ())
+        self.item.clear_actions()
         return self.execute_msg
 
 
@@ -374,6 +578,8 @@ class AppendToRoomDescription(Command):
     '''
     Append some text to a SPECIFIC Room object description.
     '''
+    __slots__ = ('room', 'to_append', 'action_text')
+
     def __init__(self, room, to_append, action_text=''):
         '''
         Constructor
@@ -393,10 +599,13 @@ class AppendToRoomDescription(Command):
         self.action_text = action_text
 
     def execute(self) -> str:
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
         '''
         Append the additonal text.
         '''
-        self.room.description += self.to_append
+        _append_description(self.room, self.to_append, journal)
         return self.action_text
 
 
@@ -404,6 +613,8 @@ class AddLinkToLocation(Command):
     '''
     Add a new exit to the room collection of a context.
     '''
+    __slots__ = ('context', 'to_add', 'direction')
+
     def __init__(self, context, to_add, direction):
         ''''
         Construtor
@@ -424,7 +635,14 @@ class AddLinkToLocation(Command):
         self.direction = direction
 
     def execute(self) -> str:
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
+        if journal is not None:
+            old_exits = dict(self.context.exits)
         self.context.add_exit(self.to_add, self.direction)
+        if journal is not None:
+            _record_exits(journal, self.context, old_exits)
         return ''
 
 
@@ -432,6 +650,8 @@ class AddInventoryItemtoHolder(Command):
     '''
     Add one or more inventory items to a room or player inventory
     '''
+    __slots__ = ('items', 'target')
+
     def __init__(self, items, target):
         '''
         Params:
@@ -449,7 +669,12 @@ class AddInventoryItemtoHolder(Command):
         self.target = target
 
     def execute(self) -> str:
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
         for item in self.items:
+            if journal is not None:
+                _record_add(journal, self.target, item)
             self.target.add_inventory(item)
 
         return ''
@@ -459,13 +684,24 @@ class ChangeLocationDescription(Command):
     '''
     Completely change the description of a location
     '''
+    __slots__ = ('room', 'new_description', 'action_text')
+
     def __init__(self, room, new_description, action_text=''):
         self.room = room
         self.new_description = new_description
         self.action_text = action_text
 
     def execute(self) -> str:
-        self.room.description = self.new_description
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
+        room = self.room
+        if journal is not None:
+            old = (room._segments, room._next_segment_id)
+        room.description = self.new_description
+        if journal is not None:
+            journal.record(room._set_segments, old, room._set_segments,
+                           (room._segments, room._next_segment_id))
         return self.action_text
 
 
@@ -473,12 +709,17 @@ class PlayerDeath(Command):
     '''
     End of game because player dies!
     '''
+    __slots__ = ('death_msg', 'end_game_command')
+
     def __init__(self, death_msg, end_game_command):
         self.death_msg = death_msg
         self.end_game_command = end_game_command
 
     def execute(self) -> str:
-        self.end_game_command.execute()
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
+        self.end_game_command.execute_with_journal(journal)
         return self.death_msg
 
 
@@ -486,9 +727,138 @@ class RemoveLinkToRoom(Command):
     '''
     Remove a link/exit from a room
     '''
+    __slots__ = ('context', 'direction_to_remove')
+
     def __init__(self, context, direction_to_remove):
         self.context = context
         self.direction_to_remove = direction_to_remove
 
     def execute(self) -> str:
+        return self.execute_with_journal(None)
+
+    def execute_with_journal(self, journal) -> str:
+        if journal is not None:
+            old_exits = dict(self.context.exits)
         self.context.remove_exit(self.direction_to_remove)
+        if journal is not None:
+            _record_exits(journal, self.context, old_exits)
+
+
+class UndoTurn(Command):
+    '''
+    Undo the last turn that changed the game.  See TextWorld.enable_undo.
+    Not available when the game has more than one player.
+    '''
+    __slots__ = ('game',)
+
+    def __init__(self, game):
+        self.game = game
+
+    def execute(self) -> str:
+        if len(self.game.players) > 1:
+            return SHARED_UNDO_MSG
+        command = self.game.undo()
+        if command is None:
+            return NOTHING_TO_UNDO_MSG
+        return f'Undone: {command}'
+
+
+class RedoTurn(Command):
+    '''
+    Redo the last undone turn.
+    '''
+    __slots__ = ('game',)
+
+    def __init__(self, game):
+        self.game = game
+
+    def execute(self) -> str:
+        if len(self.game.players) > 1:
+            return SHARED_UNDO_MSG
+        command = self.game.redo()
+        if command is None:
+            return NOTHING_TO_REDO_MSG
+        return f'Redone: {command}'
+
+
+############### undo journal records ##########################################
+# used by the commands above when undo is enabled (see journal.py)
+
+def _turn_journal(game):
+    '''
+    The Journal of game recording the turn being executed.  None if undo is
+    disabled or the game is not taking a turn.
+    '''
+    journal = game.journal
+    if journal is not None and journal.recording:
+        return journal
+    return None
+
+
+def _record_enter_room(game, old_room):
+    '''
+    Record moving the acting player from old_room to the (not yet
+    described) current room.
+    '''
+    journal = _turn_journal(game)
+    if journal is not None:
+        new_room = game.current_room
+        journal.record_attribute(game.player, 'current_room', old_room,
+                                 new_room)
+        if not new_room.visited:
+            journal.record_attribute(new_room, 'visited', False, True)
+
+
+def _record_remove(journal, holder, item):
+    '''
+    Record removing item from holder.  Undo returns the item to the same
+    position in the inventory.
+    '''
+    holder = _inventory_owner(holder)
+    position = holder.inventory_position(item)
+    journal.record(holder.add_inventory, (item, position),
+                   holder.remove_inventory, (item,))
+
+
+def _record_add(journal, holder, item):
+    '''
+    Record adding item to holder.  Adding an item already held changes
+    nothing.
+    '''
+    holder = _inventory_owner(holder)
+    if not holder.in_inventory(item):
+        journal.record(holder.remove_inventory, (item,),
+                       holder.add_inventory, (item,))
+
+
+def _inventory_owner(holder):
+    '''
+    The holder whose inventory changes.  A TextWorld stands for the player
+    taking the turn: undo must return items to that player.
+    '''
+    return getattr(holder, 'player', holder)
+
+
+def _append_description(room, text, journal):
+    '''
+    Append text to a room's description and record the segment added in
+    journal (None = not recording).
+    '''
+    segment_id = room.append_description(text)
+    if journal is not None:
+        journal.record(room._remove_last_segment, (segment_id,),
+                       room.append_description, (text,))
+
+
+def _record_exits(journal, room, old_exits):
+    '''
+    Record a change to a room's exits.  The exits are small so a copy is
+    recorded to keep their order.
+    '''
+    journal.record(_set_exits, (room, old_exits),
+                   _set_exits, (room, dict(room.exits)))
+
+
+def _set_exits(room, exits):
+    # copied so that later changes to the room cannot modify the record.
+    room.exits = dict(exits)
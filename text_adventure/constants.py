@@ -40,6 +40,13 @@ QUIT_COMMAND = 'quit'
 DEFAULT_VERBS =  [LOOK_COMMAND, INVENTORY_COMMAND, GET_COMMAND,
                   DROP_COMMAND, EXAMINE_COMMAND, QUIT_COMMAND]
 
+# added by TextWorld.enable_undo()
+UNDO_COMMAND = 'undo'
+REDO_COMMAND = 'redo'
+
+# added by TextWorld.enable_routing()
+GO_COMMAND = 'go'
+
 
 
 ########################### USE ALIASES #######################################
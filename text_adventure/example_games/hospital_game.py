@@ -6,7 +6,7 @@ Set in a hospital
 
 from text_adventure.commands import (
     AppendToCurrentRoomDescription,
-    NullAction, 
+    NullCommand,
     RemoveInventoryItem,
     RemoveInventoryItemFromPlayerOrRoom
 )
@@ -86,7 +86,7 @@ def load_adventure():
 
     
     # customise the command word set
-    hospital_cmd_mapping = DEFAULT_VERBS
+    hospital_cmd_mapping = list(DEFAULT_VERBS)
     # = ['look', 'inv', 'get', 'drop', 'ex', 'quit']
     # modification = we type 'exit' instead of 'quit' to terminate game.
     hospital_cmd_mapping[-1] = 'exit'
@@ -96,7 +96,7 @@ def load_adventure():
     # create the game room
     adventure = TextWorld(name='text hospital world', rooms=rooms_collection, 
                           start_index=0, 
-                          command_word_mapping=hospital_cmd_mapping,
+                          command_verb_mapping=hospital_cmd_mapping,
                           use_aliases='classic')
 
     # add additional alisas for the word 'use'
@@ -113,7 +113,7 @@ def load_adventure():
     #    1. Remove the grapes from the players inventory
     #    2. Output a fun message to the player.
     remove_grapes = RemoveInventoryItem(adventure, grapes)
-    eat_message = NullAction(":yum: You ate them ALL.")
+    eat_message = NullCommand(":yum: You ate them ALL.")
     grape_cmds = [remove_grapes, eat_message]
 
     # The player only needs to be holding the grapes, but this require
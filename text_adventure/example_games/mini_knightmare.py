@@ -676,7 +676,8 @@ def create_puzzle2_actions(puzzle2, puzzle3, olgarth, olgarth2a, olgarth2b,
     olgarth2b.add_action(talk_olgarth2)
 
     # correct answer action = remove, output text, link p3, add desc to room.
-    correct_action = BasicInventoryItemAction([remove_o2, response_txt,
+    remove_o2b = RemoveInventoryItem(puzzle2, olgarth2b)
+    correct_action = BasicInventoryItemAction([remove_o2b, response_txt,
                                                link_puz3, extra_desc],
                                               'answer')
 
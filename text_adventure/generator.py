@@ -0,0 +1,469 @@
+'''
+Synthetic world generator
+
+Builds large seeded TextWorlds for scale testing from the standard Room,
+InventoryItem, action and command classes.  The same arguments and seed
+always build the same world.
+
+Worlds are built in a single streaming pass: `iter_rooms()` creates one
+room at a time (with its items and actions) and links it to rooms created
+before it, so no description of the whole world is held while it is built
+and a world of 10^6 rooms only needs the memory of the world itself.  The
+first exit of every room links it to an earlier room so every room can be
+reached from the first.  Cyclic garbage collection is paused during the
+build: it would otherwise repeatedly scan the growing world.
+
+Each item has a 'use' action that displays a message.  With action_depth
+> 1 using the first item of a room adds an action to the next item, using
+that adds an action to the next and so on (a chain of action_depth
+actions).
+
+Usage:
+------
+python -m text_adventure.generator 1000 10000 100000 --items 5 --depth 3
+
+reports the build time, memory and command latency of each world size.
+
+Classes:
+--------
+
+ScaleResult: build time, memory and command latency of one world size.
+
+Functions:
+---------
+
+iter_rooms: build the rooms of a synthetic world one at a time.
+
+generate_world: build a synthetic TextWorld.
+
+measure_latency: mean and worst take_action latency of a random walk.
+
+measure_scale: build worlds of increasing size and measure each one.
+
+format_scale: table of the results of measure_scale.
+'''
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from .actions import BasicInventoryItemAction
+from .commands import AddActionToInventoryItem, NullCommand
+from .constants import DOWN, EAST, NORTH, SOUTH, UP, WEST
+from .world import InventoryItem, Room, TextWorld
+
+################# CONSTANTS ###################################################
+DEFAULT_EXIT_DENSITY = 3.0
+DEFAULT_ITEMS_PER_ROOM = 3
+DEFAULT_ALIASES_PER_ITEM = 2
+DEFAULT_ACTION_DEPTH = 2
+DEFAULT_LATENCY_COMMANDS = 2000
+
+# (direction, opposite direction) of the exits linking two rooms.
+DIRECTION_PAIRS = [(NORTH, SOUTH), (SOUTH, NORTH), (EAST, WEST), (WEST, EAST),
+                   (UP, DOWN), (DOWN, UP)]
+MAX_EXIT_DENSITY = len(DIRECTION_PAIRS)
+
+# earlier rooms tried before searching for a room with a free exit.
+LINK_ATTEMPTS = 8
+
+ADJECTIVES = ['dusty', 'narrow', 'damp', 'bright', 'gloomy', 'vast', 'cold',
+              'quiet', 'crooked', 'ancient', 'draughty', 'cramped']
+PLACES = ['corridor', 'cellar', 'hall', 'chamber', 'gallery', 'vault',
+          'library', 'kitchen', 'attic', 'chapel', 'workshop', 'cave']
+ITEM_ADJECTIVES = ['rusty', 'shiny', 'broken', 'heavy', 'tiny', 'wooden',
+                   'golden', 'cracked', 'dented', 'old']
+NOUNS = ['lamp', 'key', 'book', 'sword', 'coin', 'rope', 'box', 'scroll',
+         'cup', 'ring', 'map', 'bell', 'stone', 'bottle', 'shield', 'candle',
+         'mirror', 'feather', 'skull', 'helmet', 'flute', 'compass', 'wand',
+         'apple']
+
+# kinds of command played by measure_latency and how often each is chosen.
+LATENCY_MIX = [('move', 8), ('look', 3), ('ex', 3), ('use', 3), ('get', 2),
+               ('drop', 2)]
+
+
+class ScaleResult:
+    '''
+    Build time, memory and command latency of one generated world.
+    '''
+    def __init__(self, n_rooms, n_items, n_actions, build_seconds,
+                 memory_bytes, latency):
+        '''
+        Params:
+        ------
+        n_rooms, n_items, n_actions: int
+            Size of the world.
+
+        build_seconds: float
+
+        memory_bytes: int or None
+            Memory allocated by the world.  None if not measured.
+
+        latency: dict
+            {command kind: (mean ns, max ns)} see measure_latency.
+        '''
+        self.n_rooms = n_rooms
+        self.n_items = n_items
+        self.n_actions = n_actions
+        self.build_seconds = build_seconds
+        self.memory_bytes = memory_bytes
+        self.latency = latency
+
+    def __repr__(self):
+        return f'ScaleResult(n_rooms={self.n_rooms}, ' \
+            + f'build_seconds={self.build_seconds:.3f})'
+
+
+@contextmanager
+def _gc_paused():
+    '''
+    Pause cyclic garbage collection (restored on exit).
+    '''
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def iter_rooms(n_rooms, exit_density=DEFAULT_EXIT_DENSITY,
+               items_per_room=DEFAULT_ITEMS_PER_ROOM,
+               aliases_per_item=DEFAULT_ALIASES_PER_ITEM,
+               action_depth=DEFAULT_ACTION_DEPTH, seed=0):
+    '''
+    Build the rooms of a synthetic world one at a time.  Each room is
+    yielded once its items and actions are built and it is linked to
+    earlier rooms.  Rooms built later may add exits to it.
+
+    Params:
+    ------
+    n_rooms: int
+        Number of rooms.
+
+    exit_density: float, optional (default=DEFAULT_EXIT_DENSITY)
+        Mean number of exits per room (up to MAX_EXIT_DENSITY).  Rooms
+        always have the exits (about 2 per room) needed to reach every room.
+
+    items_per_room: int, optional (default=DEFAULT_ITEMS_PER_ROOM)
+
+    aliases_per_item: int, optional (default=DEFAULT_ALIASES_PER_ITEM)
+        At least 1.  The first alias is the item's noun.  Nouns are unique
+        within a room while items_per_room <= len(NOUNS).
+
+    action_depth: int, optional (default=DEFAULT_ACTION_DEPTH)
+        Length of the chain of actions started by using the first item of
+        a room.  0 = items have no actions.
+
+    seed: int, optional (default=0)
+
+    Returns:
+    -------
+    Iterator[Room]
+    '''
+    if not 0 <= exit_density <= MAX_EXIT_DENSITY:
+        raise ValueError('exit_density must be between 0 and '
+                         + f'{MAX_EXIT_DENSITY}')
+    if aliases_per_item < 1:
+        raise ValueError('aliases_per_item must be at least 1')
+
+    rng = random.Random(seed)
+    # expected extra links (2 exits each) per room beyond the first link.
+    extra_links = max(0.0, (exit_density - 2) / 2)
+    rooms = []
+    for index in range(n_rooms):
+        room = _new_room(rng, index)
+        _add_items(rng, room, index, items_per_room, aliases_per_item,
+                   action_depth)
+        if rooms:
+            _link_to_earlier(rng, room, rooms)
+            n_extra = int(extra_links) \
+                + (rng.random() < extra_links - int(extra_links))
+            for _ in range(n_extra):
+                _link(rng, room, rooms[rng.randrange(len(rooms))])
+        rooms.append(room)
+        yield room
+
+
+def generate_world(n_rooms, exit_density=DEFAULT_EXIT_DENSITY,
+                   items_per_room=DEFAULT_ITEMS_PER_ROOM,
+                   aliases_per_item=DEFAULT_ALIASES_PER_ITEM,
+                   action_depth=DEFAULT_ACTION_DEPTH, seed=0):
+    '''
+    Build a synthetic TextWorld.  See iter_rooms for the parameters.  The
+    player starts in the first room.
+
+    Returns:
+    -------
+    TextWorld
+    '''
+    with _gc_paused():
+        rooms = list(iter_rooms(n_rooms, exit_density, items_per_room,
+                                aliases_per_item, action_depth, seed))
+        return TextWorld(name=f'synthetic {n_rooms} rooms (seed {seed})',
+                         rooms=rooms)
+
+
+def _new_room(rng, index):
+    adjective = rng.choice(ADJECTIVES)
+    place = rng.choice(PLACES)
+    room = Room(f'{place} {index}')
+    room.description = f'You are in a {adjective} {place} ({index}). ' \
+        + f'The {place} is {rng.choice(ADJECTIVES)} and ' \
+        + f'{rng.choice(ADJECTIVES)}.'
+    return room
+
+
+def _add_items(rng, room, index, items_per_room, aliases_per_item,
+               action_depth):
+    if items_per_room <= len(NOUNS):
+        nouns = rng.sample(NOUNS, items_per_room)
+    else:
+        nouns = [rng.choice(NOUNS) for _ in range(items_per_room)]
+
+    items = []
+    for noun in nouns:
+        adjective = rng.choice(ITEM_ADJECTIVES)
+        item = InventoryItem(f'a {adjective} {noun}')
+        item.long_description = f'A {adjective} {noun} from room {index}.'
+        item.add_alias(noun)
+        for i in range(1, aliases_per_item):
+            item.add_alias(f'{noun}{i}')
+        if action_depth > 0:
+            item.add_action(BasicInventoryItemAction(
+                NullCommand(f'You use the {noun}.')))
+        room.add_inventory(item)
+        items.append(item)
+
+    if items and action_depth > 1:
+        _add_action_chain(items, action_depth)
+
+
+def _add_action_chain(items, action_depth):
+    '''
+    Using items[0] adds an action to items[1], using that adds an action to
+    items[2] ... (wrapping around) for action_depth actions.
+    '''
+    # built from the last action of the chain back to the first.
+    next_action = None
+    for step in range(action_depth - 1, 0, -1):
+        action = BasicInventoryItemAction(
+            NullCommand(f'Step {step} of the chain.'))
+        if next_action is not None:
+            action.add_command(AddActionToInventoryItem(
+                next_action, items[(step + 1) % len(items)]))
+        next_action = action
+    items[0].actions[0].add_command(
+        AddActionToInventoryItem(next_action, items[1 % len(items)]))
+
+
+def _link(rng, room, other):
+    '''
+    Link two rooms in opposite directions that are free in both.
+
+    Returns:
+    -------
+    bool
+        False if the rooms could not be linked.
+    '''
+    if other is room:
+        return False
+    pairs = [(direction, opposite) for direction, opposite in DIRECTION_PAIRS
+             if direction not in room.exits and opposite not in other.exits]
+    if not pairs:
+        return False
+    direction, opposite = rng.choice(pairs)
+    room.add_exit(other, direction)
+    other.add_exit(room, opposite)
+    return True
+
+
+def _link_to_earlier(rng, room, rooms):
+    '''
+    Link a new room to an earlier room so it can be reached from the first.
+    '''
+    for _ in range(LINK_ATTEMPTS):
+        if _link(rng, room, rooms[rng.randrange(len(rooms))]):
+            return
+    # the random picks were full: use the most recent room with a free exit.
+    for other in reversed(rooms):
+        if _link(rng, room, other):
+            return
+    raise RuntimeError(f'{room.name} could not be linked to an earlier room')
+
+
+def measure_latency(world, n_commands=DEFAULT_LATENCY_COMMANDS, seed=0):
+    '''
+    Play a seeded random walk of commands (moves, look, examine, use, get
+    and drop) and time each take_action.
+
+    Returns:
+    -------
+    dict
+        {command kind: (mean ns, max ns)}
+    '''
+    rng = random.Random(seed)
+    kinds = [kind for kind, weight in LATENCY_MIX for _ in range(weight)]
+    times = {kind: [] for kind, _ in LATENCY_MIX}
+    take_action = world.take_action
+    timer = time.perf_counter_ns
+
+    for _ in range(n_commands):
+        kind = rng.choice(kinds)
+        command = _latency_command(rng, world, kind)
+        if command is None:
+            continue
+        start = timer()
+        take_action(command)
+        times[kind].append(timer() - start)
+
+    return {kind: (sum(ns) / len(ns), max(ns))
+            for kind, ns in times.items() if ns}
+
+
+def _latency_command(rng, world, kind):
+    '''
+    A command of the given kind that makes sense in the current room (None
+    if there is none e.g. drop with an empty inventory).
+    '''
+    room = world.current_room
+    if kind == 'move':
+        if not room.exits:
+            return None
+        return rng.choice(list(room.exits))
+    if kind == 'look':
+        return 'look'
+
+    holder = world if kind == 'drop' else room
+    items = holder.inventory
+    if not items:
+        return None
+    return f'{kind} {rng.choice(items).aliases[0]}'
+
+
+def measure_scale(sizes, exit_density=DEFAULT_EXIT_DENSITY,
+                  items_per_room=DEFAULT_ITEMS_PER_ROOM,
+                  aliases_per_item=DEFAULT_ALIASES_PER_ITEM,
+                  action_depth=DEFAULT_ACTION_DEPTH, seed=0,
+                  n_commands=DEFAULT_LATENCY_COMMANDS, memory=True):
+    '''
+    Build a world of each size and measure its build time, memory and
+    command latency.
+
+    Params:
+    ------
+    sizes: Iterable[int]
+        Room counts.
+
+    n_commands: int, optional (default=DEFAULT_LATENCY_COMMANDS)
+        Commands played by measure_latency.
+
+    memory: bool, optional (default=True)
+        Measure memory.  The world is built a second time with tracemalloc
+        (which slows the build) so the build time is not affected.
+
+    See iter_rooms for the other parameters.
+
+    Returns:
+    -------
+    list of ScaleResult
+    '''
+    params = (exit_density, items_per_room, aliases_per_item, action_depth,
+              seed)
+    results = []
+    for n_rooms in sizes:
+        memory_bytes = None
+        if memory:
+            tracemalloc.start()
+            try:
+                world = generate_world(n_rooms, *params)
+                memory_bytes = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            del world
+
+        start = time.perf_counter()
+        world = generate_world(n_rooms, *params)
+        build_seconds = time.perf_counter() - start
+
+        n_items = sum(room.inventory_count for room in world.rooms)
+        n_actions = sum(len(item.actions) for room in world.rooms
+                        for item in room.inventory)
+        latency = measure_latency(world, n_commands, seed)
+        results.append(ScaleResult(n_rooms, n_items, n_actions,
+                                   build_seconds, memory_bytes, latency))
+        del world
+    return results
+
+
+def format_scale(results):
+    '''
+    Table of ScaleResults: one row per world size.
+
+    Returns:
+    -------
+    str
+    '''
+    kinds = [kind for kind, _ in LATENCY_MIX]
+    header = f'{"rooms":>9} {"items":>9} {"actions":>9} {"build s":>8} ' \
+        + f'{"MiB":>8} ' + ' '.join(f'{kind + " us":>12}' for kind in kinds)
+    lines = [header, '(latency: mean/max microseconds per command)']
+    for result in results:
+        memory = '-' if result.memory_bytes is None \
+            else f'{result.memory_bytes / 2**20:.1f}'
+        latency = []
+        for kind in kinds:
+            if kind in result.latency:
+                mean, worst = result.latency[kind]
+                latency.append(f'{mean / 1e3:.1f}/{worst / 1e3:.0f}'.rjust(12))
+            else:
+                latency.append(f'{"-":>12}')
+        lines.append(f'{result.n_rooms:>9} {result.n_items:>9} '
+                     + f'{result.n_actions:>9} '
+                     + f'{result.build_seconds:>8.2f} {memory:>8} '
+                     + ' '.join(latency))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    '''
+    Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Measure how build time, memory and command latency '
+        + 'scale with the size of generated worlds.')
+    parser.add_argument('sizes', type=int, nargs='+',
+                        help='room counts e.g. 1000 10000 100000')
+    parser.add_argument('--density', type=float,
+                        default=DEFAULT_EXIT_DENSITY,
+                        help='mean exits per room')
+    parser.add_argument('--items', type=int, default=DEFAULT_ITEMS_PER_ROOM,
+                        help='items per room')
+    parser.add_argument('--aliases', type=int,
+                        default=DEFAULT_ALIASES_PER_ITEM,
+                        help='aliases per item')
+    parser.add_argument('--depth', type=int, default=DEFAULT_ACTION_DEPTH,
+                        help='action chain depth')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--commands', type=int,
+                        default=DEFAULT_LATENCY_COMMANDS,
+                        help='commands played to measure latency')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure memory (saves a second build)')
+    args = parser.parse_args(argv)
+
+    results = measure_scale(args.sizes, args.density, args.items,
+                            args.aliases, args.depth, args.seed,
+                            args.commands, memory=not args.no_memory)
+    print(format_scale(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+'''
+Instrumentation
+
+Opt-in timing of the stages of TextWorld.take_action.  Enable it with
+`TextWorld.enable_instrumentation()`.  When disabled the TextWorld uses its
+normal code path and nothing is recorded.
+
+Stages:
+-------
+parse: splitting the command and creating the Command object.
+resolve: finding an item by its alias (use and examine commands).
+actions: evaluating an item's actions (use commands).
+execute: executing the Command (includes resolve and actions).
+render: render events e.g. clearing the screen.
+total: the whole of take_action.
+
+Times are recorded in nanoseconds in counters and log2 histograms.
+
+Classes:
+--------
+
+TimingStats: count, total, max and histogram of a set of timings.
+
+Instrumentation: timings per stage and counts and timings per command class.
+
+InstrumentedRenderer: wraps a Renderer and times its render events.
+'''
+
+from time import perf_counter_ns
+
+from .render import Renderer
+
+################# CONSTANTS ###################################################
+PARSE = 'parse'
+RESOLVE = 'resolve'
+ACTIONS = 'actions'
+EXECUTE = 'execute'
+RENDER = 'render'
+TOTAL = 'total'
+STAGES = [PARSE, RESOLVE, ACTIONS, EXECUTE, RENDER, TOTAL]
+
+# histogram bucket i holds timings t with t.bit_length() == i
+# i.e. 2**(i-1) <= t < 2**i nanoseconds.  2**63ns is ~290 years.
+N_BUCKETS = 64
+
+
+class TimingStats:
+    '''
+    Count, total, max and a log2 histogram of timings in nanoseconds.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * N_BUCKETS
+
+    def __repr__(self):
+        return f'TimingStats(count={self.count}, ' \
+            + f'mean_ns={self.mean_ns:.0f}, max_ns={self.max_ns})'
+
+    def record(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[ns.bit_length()] += 1
+
+    @property
+    def mean_ns(self):
+        return self.total_ns / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        '''
+        Upper bound (ns) of the histogram bucket holding the q-th percentile.
+
+        Params:
+        ------
+        q: float
+            Percentile in the range 0 to 100.
+
+        Returns:
+        -------
+        int
+        '''
+        if not self.count:
+            return 0
+        target = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(2 ** i, self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        return {'count': self.count,
+                'total_ns': self.total_ns,
+                'mean_ns': self.mean_ns,
+                'p50_ns': self.percentile(50),
+                'p99_ns': self.percentile(99),
+                'max_ns': self.max_ns}
+
+
+class Instrumentation:
+    '''
+    Per stage timings and per command class counts and timings recorded by
+    an instrumented TextWorld.
+
+    Example:
+    -------
+    stats = adventure.enable_instrumentation()
+    adventure.take_action('look')
+    stats.stages['parse'].mean_ns
+    stats.command_counts['LookAtRoom']
+    '''
+    def __init__(self):
+        self.stages = {stage: TimingStats() for stage in STAGES}
+        # command class name -> TimingStats of execute
+        self.commands = {}
+
+    def __repr__(self):
+        return f'Instrumentation(n_commands={self.stages[TOTAL].count})'
+
+    @property
+    def command_counts(self):
+        '''
+        Number of commands executed by class name e.g. {'MoveRoom': 3}
+        '''
+        return {name: stats.count for name, stats in self.commands.items()}
+
+    def record(self, stage, ns):
+        '''
+        Record the time of a stage.
+        '''
+        self.stages[stage].record(ns)
+
+    def record_command(self, command, ns):
+        '''
+        Record the execution time of a Command.
+        '''
+        name = type(command).__name__
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = TimingStats()
+        stats.record(ns)
+        self.stages[EXECUTE].record(ns)
+
+    def reset(self):
+        '''
+        Clear all recorded timings.
+        '''
+        self.__init__()
+
+    def summary(self):
+        '''
+        Returns:
+        -------
+        dict
+            {'stages': {stage: stats}, 'commands': {class name: stats}}
+            where stats is a dict of count, total, mean, p50, p99 and max.
+        '''
+        return {'stages': {stage: stats.summary()
+                           for stage, stats in self.stages.items()},
+                'commands': {name: stats.summary()
+                             for name, stats in self.commands.items()}}
+
+
+class InstrumentedRenderer(Renderer):
+    '''
+    Wraps a Renderer and records the time of each render event.
+    '''
+    def __init__(self, renderer, instrumentation):
+        '''
+        Params:
+        ------
+        renderer: Renderer
+            The renderer that displays events.
+
+        instrumentation: Instrumentation
+            Where to record timings.
+        '''
+        self.renderer = renderer
+        self.instrumentation = instrumentation
+
+    def render_event(self, event) -> None:
+        start = perf_counter_ns()
+        self.renderer.render_event(event)
+        self.instrumentation.record(RENDER, perf_counter_ns() - start)
@@ -0,0 +1,161 @@
+'''
+Undo journal
+
+When undo is enabled (`TextWorld.enable_undo()`) every state changing
+Command records how to reverse (and reapply) each change it makes in a
+Journal.  The changes made by one turn are undone or redone by replaying
+their records, so undo and redo take time proportional to the changes of a
+turn, not the size of the world.
+
+A record is a pair of operations (function, args): one to undo the change
+and one to redo it.  e.g. picking up a lamp records
+(room.add_inventory, (lamp, position)) and (room.remove_inventory, (lamp,)).
+
+The Journal is held by the world (`TextWorld.journal`).  Commands that hold
+a reference to their TextWorld record in `game.journal` while it is
+`recording` a turn.  Other commands are passed the journal by the action
+executing them (see `Command.execute_with_journal`).  Commands skip
+recording when undo is disabled or outside of a turn.
+
+Classes:
+--------
+
+Journal: the undo and redo history of a TextWorld.
+'''
+
+from collections import deque
+
+################# CONSTANTS ###################################################
+# turns that can be undone.  Older turns are forgotten.
+DEFAULT_UNDO_LIMIT = 100
+
+
+class Journal:
+    '''
+    Undo and redo history of a TextWorld.  Holds the changes made by each
+    turn that changed the game.  Turns that change nothing (e.g. look) are
+    not recorded.
+    '''
+    def __init__(self, limit=DEFAULT_UNDO_LIMIT):
+        '''
+        Params:
+        ------
+        limit: int, optional (default=DEFAULT_UNDO_LIMIT)
+            Number of turns that can be undone.  None = no limit.
+        '''
+        self.limit = limit
+        # turns: (command, records)
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+        # records of the turn being executed.
+        self._records = None
+
+    def __repr__(self):
+        return f'Journal(n_undo={len(self._undo)}, n_redo={len(self._redo)})'
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    @property
+    def recording(self):
+        '''
+        True while the changes of a turn are being recorded.
+        '''
+        return self._records is not None
+
+    def begin_turn(self):
+        '''
+        Start recording the changes of a turn.
+        '''
+        self._records = []
+
+    def end_turn(self, command):
+        '''
+        Stop recording.  A turn that changed the game is added to the undo
+        history and clears the redo history.
+
+        Params:
+        ------
+        command: str
+            The command entered by the player.
+        '''
+        records = self._records
+        self._records = None
+        if records:
+            self._undo.append((command, records))
+            self._redo.clear()
+
+    def record(self, undo, undo_args, redo, redo_args):
+        '''
+        Record a change made by the current turn.
+
+        Params:
+        ------
+        undo: callable
+            undo(*undo_args) reverses the change.
+
+        undo_args: tuple
+
+        redo: callable
+            redo(*redo_args) makes the change again.
+
+        redo_args: tuple
+        '''
+        self._records.append((undo, undo_args, redo, redo_args))
+
+    def record_attribute(self, obj, name, old, new):
+        '''
+        Record that an attribute of obj was changed from old to new.
+        '''
+        self._records.append((setattr, (obj, name, old),
+                              setattr, (obj, name, new)))
+
+    def undo(self):
+        '''
+        Reverse the changes of the last recorded turn.
+
+        Returns:
+        -------
+        str or None
+            The command of the undone turn.  None if there is nothing to
+            undo.
+        '''
+        if not self._undo:
+            return None
+        turn = self._undo.pop()
+        command, records = turn
+        for undo, undo_args, _, _ in reversed(records):
+            undo(*undo_args)
+        self._redo.append(turn)
+        return command
+
+    def redo(self):
+        '''
+        Make the changes of the last undone turn again.
+
+        Returns:
+        -------
+        str or None
+            The command of the redone turn.  None if there is nothing to
+            redo.
+        '''
+        if not self._redo:
+            return None
+        turn = self._redo.pop()
+        command, records = turn
+        for _, _, redo, redo_args in records:
+            redo(*redo_args)
+        self._undo.append(turn)
+        return command
+
+    def clear(self):
+        '''
+        Forget the undo and redo history.
+        '''
+        self._undo.clear()
+        self._redo.clear()
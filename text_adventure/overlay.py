@@ -0,0 +1,281 @@
+'''
+Shared worlds with per player overlays
+
+A WorldTemplate clone copies every Room, InventoryItem and action that
+holds game state for every player.  When many players play the same game
+most of that copy is never changed.  A SharedWorld builds the game once
+and shares all of it between players.  Each player's game (an OverlayGame)
+holds only an overlay: the values of its compact game state (see state.py)
+that differ from the initial state.  An overlay is a few bytes per change
+the player has made, however large the game.
+
+The shared world holds the state of one game at a time.  Using another
+game switches the world to that game's state: the values the game that was
+active changed are set back to their initial values and the values in the
+new game's overlay are restored.  A switch takes time proportional to the
+two overlays, not the size of the world.  Consecutive commands of the same
+game do not switch.
+
+The objects each turn changes are found from the records that commands
+make for undo (see journal.py) and only their values are captured into the
+active game's overlay.  The state that is switched is the state captured
+by a StateCodec.  Games must make their changes in commands that record
+them for undo, must not rely on other attributes changing during play and
+cannot use undo (the shared world's journal tracks changes instead).
+
+Usage:
+------
+shared = SharedWorld(mini_knightmare.load_adventure())
+adventure = shared.new_game()
+adventure.take_action('get helmet')
+
+Classes:
+--------
+
+SharedWorld: a TextWorld shared by many games.
+
+OverlayGame: a game played in a SharedWorld.
+'''
+
+from array import array
+
+from .journal import Journal
+from .state import STATE_TYPECODE, StateCodec
+
+
+class _ChangeTracker(Journal):
+    '''
+    A Journal that collects the objects changed by each turn instead of an
+    undo history.
+    '''
+    def __init__(self):
+        super().__init__(limit=0)
+        # id(obj) -> obj changed since the last call of take_changed.
+        self._changed = {}
+
+    def record(self, undo, undo_args, redo, redo_args):
+        changed = self._changed
+        for func in (undo, redo):
+            obj = getattr(func, '__self__', None)
+            if obj is not None:
+                changed[id(obj)] = obj
+        for obj in undo_args + redo_args:
+            changed[id(obj)] = obj
+
+    def record_attribute(self, obj, name, old, new):
+        self._changed[id(obj)] = obj
+
+    def take_changed(self):
+        '''
+        The objects changed since the last call.
+        '''
+        changed = self._changed
+        self._changed = {}
+        return changed.values()
+
+
+class SharedWorld:
+    '''
+    A TextWorld shared by many games.  The world should be in its initial
+    state and is only used through the games it creates.
+    '''
+    def __init__(self, world):
+        '''
+        Params:
+        ------
+        world: TextWorld
+            A newly built game e.g. returned by `load_adventure()`.
+        '''
+        self.world = world
+        self.codec = StateCodec(world)
+        self._initial = array(STATE_TYPECODE)
+        self._initial.frombytes(self.codec.capture())
+        # the game whose state is held by the world and its overlay
+        # ({index: value}).
+        self._active = None
+        self._active_overlay = {}
+
+        world.disable_undo()
+        self._changes = _ChangeTracker()
+        world.journal = self._changes
+        world._select_parse_and_execute()
+
+    def __repr__(self):
+        return f"SharedWorld(world='{self.world.name}', " \
+            + f'state_bytes={self.codec.state_size})'
+
+    @classmethod
+    def from_loader(cls, load_adventure):
+        '''
+        Create a SharedWorld from a game's `load_adventure()`.
+        '''
+        return cls(load_adventure())
+
+    def new_game(self):
+        '''
+        A new game in its initial state.
+
+        Returns:
+        -------
+        OverlayGame
+        '''
+        return OverlayGame(self)
+
+    def _activate(self, game):
+        '''
+        Switch the world to the state of a game.
+
+        Returns:
+        -------
+        TextWorld
+        '''
+        if game is not self._active:
+            outgoing = self._active_overlay
+            if self._active is not None:
+                self._active._overlay = _pack(outgoing)
+            incoming = _unpack(game._overlay)
+            self.codec.restore_changes(_OverlayView(incoming, self._initial),
+                                       outgoing.keys() | incoming.keys())
+            self._active = game
+            self._active_overlay = incoming
+        return self.world
+
+    def _turn_taken(self):
+        '''
+        Capture the values changed by the active game's last turn(s) into
+        its overlay.
+        '''
+        changed = list(self._changes.take_changed())
+        changed.append(self.world)
+        overlay = self._active_overlay
+        initial = self._initial
+        for index, value in self.codec.capture_changes(changed).items():
+            if value == initial[index]:
+                overlay.pop(index, None)
+            else:
+                overlay[index] = value
+
+    def _overlay(self, game):
+        '''
+        The up to date overlay of a game as packed (index, value) pairs.
+        '''
+        if game is self._active:
+            return _pack(self._active_overlay)
+        return game._overlay
+
+
+class _OverlayView:
+    '''
+    The values of a state held as an overlay on the initial state.
+    '''
+    __slots__ = ('overlay', 'initial')
+
+    def __init__(self, overlay, initial):
+        self.overlay = overlay
+        self.initial = initial
+
+    def __getitem__(self, index):
+        return self.overlay.get(index, self.initial[index])
+
+
+def _pack(overlay):
+    '''
+    Pack an overlay ({index: value}) into bytes of (index, value) pairs.
+    '''
+    pairs = array(STATE_TYPECODE)
+    for index, value in overlay.items():
+        pairs.append(index)
+        pairs.append(value)
+    return pairs.tobytes()
+
+
+def _unpack(packed):
+    pairs = array(STATE_TYPECODE)
+    pairs.frombytes(packed)
+    return {pairs[i]: pairs[i + 1] for i in range(0, len(pairs), 2)}
+
+
+class OverlayGame:
+    '''
+    A game played in a SharedWorld.  Holds only the changes the player has
+    made to the initial state.
+
+    Use it like a TextWorld: take_action() and any TextWorld attribute
+    (e.g. current_room, active) first switch the shared world to this
+    game's state.  Objects read from a game (e.g. current_room) belong to
+    the shared world so are only valid until another game of the same
+    SharedWorld is used.  Only changes made by take_action(), run_batch()
+    and describe_current_room() are kept in the game's overlay: changing
+    the objects read from a game (e.g. `current_room.describe()` marking
+    the room visited) would change the other games.
+    '''
+    __slots__ = ('shared', '_overlay')
+
+    def __init__(self, shared):
+        '''
+        Params:
+        ------
+        shared: SharedWorld
+        '''
+        self.shared = shared
+        self._overlay = b''
+
+    def __repr__(self):
+        return f"OverlayGame(world='{self.shared.world.name}', " \
+            + f'overlay_bytes={self.overlay_size})'
+
+    @property
+    def overlay_size(self):
+        '''
+        Size of the game's overlay in bytes.
+        '''
+        return len(self.shared._overlay(self))
+
+    @property
+    def renderer(self):
+        return self.shared.world.renderer
+
+    @renderer.setter
+    def renderer(self, renderer):
+        # render events are displayed by the shared world.
+        self.shared.world.renderer = renderer
+
+    def take_action(self, command):
+        '''
+        Take an action in this game.  See TextWorld.take_action.
+        '''
+        shared = self.shared
+        try:
+            return shared._activate(self).take_action(command)
+        finally:
+            shared._turn_taken()
+
+    def run_batch(self, commands):
+        '''
+        Take a sequence of actions in this game.  See TextWorld.run_batch.
+        '''
+        shared = self.shared
+        try:
+            return shared._activate(self).run_batch(commands)
+        finally:
+            shared._turn_taken()
+
+    def describe_current_room(self):
+        '''
+        Describe the current room.  Marking the room visited is kept in
+        this game's overlay.  See TextWorld.describe_current_room.
+        '''
+        shared = self.shared
+        try:
+            room = shared._activate(self).current_room
+            shared._changes.record_attribute(room, 'visited', room.visited,
+                                             True)
+            return room.describe()
+        finally:
+            shared._turn_taken()
+
+    def __getattr__(self, attr):
+        # any other TextWorld attribute.
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.shared._activate(self), attr)
@@ -0,0 +1,75 @@
+'''
+Renderers
+
+Commands do not write to the terminal directly.  Instead they emit render
+events (for example a request to clear the screen) to the Renderer owned by
+the TextWorld.  The renderer decides how (or if) the event is displayed.
+
+Classes:
+--------
+
+Renderer: abstract base class for all renderers.
+
+HeadlessRenderer: ignores all render events.  Use for batch, server or test
+use where there is no terminal.
+
+TerminalRenderer: renders events to an interactive terminal.
+'''
+
+from abc import ABC, abstractmethod
+import os
+import sys
+
+######################### RENDER EVENTS #######################################
+CLEAR_SCREEN = 'clear_screen'
+
+# ANSI sequence equivalent to the posix 'clear' command.
+ANSI_CLEAR = '\033[H\033[2J\033[3J'
+
+
+class Renderer(ABC):
+    '''
+    Abstract base class for all renderers.
+    '''
+    @abstractmethod
+    def render_event(self, event) -> None:
+        pass
+
+
+class HeadlessRenderer(Renderer):
+    '''
+    A renderer without a display.  All render events are ignored so no
+    subprocesses are spawned and nothing is written to the terminal.
+    '''
+    def render_event(self, event) -> None:
+        pass
+
+
+class TerminalRenderer(Renderer):
+    '''
+    Render events to an interactive terminal or cmd prompt.
+    '''
+    def __init__(self, stream=None):
+        '''
+        Params:
+        ------
+        stream: file-like, optional (default=None)
+            Stream to write to.  If None then sys.stdout.
+        '''
+        self.stream = stream
+
+    def render_event(self, event) -> None:
+        if event == CLEAR_SCREEN:
+            self.clear_screen()
+
+    def clear_screen(self):
+        '''
+        Clear the terminal or cmd prompt.
+        '''
+        if os.name == 'nt':
+            os.system('cls')
+        else:
+            # write the escape sequence rather than forking 'clear'
+            stream = sys.stdout if self.stream is None else self.stream
+            stream.write(ANSI_CLEAR)
+            stream.flush()
@@ -0,0 +1,377 @@
+'''
+Routing index
+
+Finds the shortest route (fewest moves) between the Rooms of a world.  Used
+by the 'go' command (see `TextWorld.enable_routing()`) and by agents that
+need paths between rooms.
+
+The index numbers the rooms and holds the incoming exits of every room in
+compact arrays: an array of source room numbers and per room offsets into
+it.  Exits changed after the index was built are held in a small overlay
+so a change costs O(exits of the room), not a rebuild.
+
+Routes to a target are found by a breadth first search backwards from the
+target.  The distance of each room reached is cached for the most recently
+used targets, so later routes to the same target only walk the path.  A
+search stops once it reaches the source and is resumed by later queries
+that need more of the world.
+
+When an exit changes (e.g. AddLinkToLocation or RemoveLinkToRoom) only the
+cached searches whose distances the change alters are dropped:
+
+* a new exit u -> v if it makes u closer to the target.
+* a removed exit u -> w if it was u's only exit one step closer to the
+target.
+
+Rooms notify the index of changes to their exits.
+
+Classes:
+--------
+
+RoutingIndex: shortest routes between the rooms of a world.
+'''
+
+from array import array
+from collections import OrderedDict
+
+################# CONSTANTS ###################################################
+# targets whose searches are cached.
+DEFAULT_CACHE_SIZE = 64
+
+# distance of a room not (yet) reached by a search.
+UNREACHED = 2 ** 31 - 1
+
+# typecode of the arrays of room numbers and distances.
+ROOM_TYPECODE = 'i'
+
+
+class _Search:
+    '''
+    A breadth first search backwards from a target room.  Rooms at a
+    distance < level have been expanded.  frontier holds the rooms at
+    distance level waiting to be expanded.
+    '''
+    __slots__ = ('dist', 'frontier', 'level')
+
+    def __init__(self, n_rooms, target):
+        self.dist = array(ROOM_TYPECODE, [UNREACHED]) * n_rooms
+        self.dist[target] = 0
+        self.frontier = [target]
+        self.level = 0
+
+
+class RoutingIndex:
+    '''
+    Shortest routes between the rooms of a world.  Built on first use from
+    the world's rooms and any rooms reachable through their exits.  Other
+    rooms are added when they are linked to or routed from.
+
+    Keep exits up to date with Room.add_exit, Room.remove_exit or by
+    assigning Room.exits: changes made directly to an exits dict are not
+    seen by the index.
+    '''
+    def __init__(self, world, cache_size=DEFAULT_CACHE_SIZE):
+        '''
+        Params:
+        ------
+        world: TextWorld
+
+        cache_size: int, optional (default=DEFAULT_CACHE_SIZE)
+            Number of targets whose searches are cached.
+        '''
+        self.world = world
+        self.cache_size = cache_size
+        # None until built (see _build).
+        self._rooms = None
+
+    def __repr__(self):
+        n_rooms = None if self._rooms is None else len(self._rooms)
+        return f'RoutingIndex(n_rooms={n_rooms}, ' \
+            + f'cache_size={self.cache_size})'
+
+    def path(self, source, target):
+        '''
+        The shortest sequence of exits from source to target.
+
+        Params:
+        ------
+        source: Room
+
+        target: Room
+
+        Returns:
+        -------
+        list of str or None
+            The direction of each move.  [] if source is target.  None if
+            target cannot be reached.
+        '''
+        search, s = self._search_from(source, target)
+        if search is None:
+            return None
+
+        dist = search.dist
+        numbers = self._numbers
+        directions = []
+        room = source
+        remaining = dist[s]
+        while remaining > 0:
+            # take any exit one step closer (the first in exit order).
+            for direction, next_room in room.exits.items():
+                n = numbers[next_room]
+                if n < len(dist) and dist[n] == remaining - 1:
+                    break
+            directions.append(direction)
+            room = next_room
+            remaining -= 1
+        return directions
+
+    def distance(self, source, target):
+        '''
+        The number of moves needed to reach target from source.
+
+        Returns:
+        -------
+        int or None
+            None if target cannot be reached.
+        '''
+        search, s = self._search_from(source, target)
+        if search is None:
+            return None
+        return search.dist[s]
+
+    def find_rooms(self, name):
+        '''
+        Rooms with a name (ignoring case and extra spaces).
+
+        Returns:
+        -------
+        list of Room
+        '''
+        self._ensure_built()
+        return list(self._names.get(_normalise(name), ()))
+
+    def close(self):
+        '''
+        Stop listening to changes of the rooms' exits and forget the index.
+        '''
+        if self._rooms is None:
+            return
+        for room in self._rooms:
+            if room._routing is self:
+                room._routing = None
+        self._rooms = None
+
+    def _ensure_built(self):
+        if self._rooms is None:
+            self._build()
+
+    def _build(self):
+        '''
+        Number the rooms and build the incoming exit arrays.
+        '''
+        self._rooms = []
+        self._numbers = {}
+        # normalised name -> rooms
+        self._names = {}
+        for room in self.world.rooms:
+            self._number(room)
+        # rooms only reachable through exits.
+        i = 0
+        while i < len(self._rooms):
+            for target in self._rooms[i].exits.values():
+                self._number(target)
+            i += 1
+
+        rooms = self._rooms
+        numbers = self._numbers
+        counts = [0] * (len(rooms) + 1)
+        for room in rooms:
+            for target in room.exits.values():
+                counts[numbers[target] + 1] += 1
+        offsets = array(ROOM_TYPECODE, counts)
+        for v in range(len(rooms)):
+            offsets[v + 1] += offsets[v]
+
+        sources = array(ROOM_TYPECODE, [0]) * offsets[-1]
+        fill = offsets[:-1]
+        for u, room in enumerate(rooms):
+            for target in room.exits.values():
+                v = numbers[target]
+                sources[fill[v]] = u
+                fill[v] += 1
+
+        self._offsets = offsets
+        self._sources = sources
+        self._n_indexed = len(rooms)
+        # room number -> incoming rooms changed since the index was built.
+        self._patched = {}
+        # target room number -> _Search (least recently used first)
+        self._searches = OrderedDict()
+
+    def _number(self, room):
+        '''
+        Give a room a number (if it does not have one) and listen to changes
+        of its exits.
+        '''
+        if room not in self._numbers:
+            self._numbers[room] = len(self._rooms)
+            self._rooms.append(room)
+            self._names.setdefault(_normalise(room.name), []).append(room)
+            room._routing = self
+
+    def _incoming(self, v):
+        '''
+        Numbers of the rooms with an exit to room v (one per exit).
+        '''
+        patched = self._patched.get(v)
+        if patched is not None:
+            return patched
+        if v < self._n_indexed:
+            return self._sources[self._offsets[v]:self._offsets[v + 1]]
+        return ()
+
+    def _search_from(self, source, target):
+        '''
+        The search to target expanded until it reaches source.
+
+        Returns:
+        -------
+        tuple (_Search or None, int)
+            The search (None if source cannot reach target) and the number
+            of source.
+        '''
+        self._ensure_built()
+        # e.g. a room the player reached through an exit since removed.
+        for room in (source, target):
+            if room not in self._numbers:
+                self._add_rooms(room)
+        s = self._numbers[source]
+        t = self._numbers[target]
+
+        search = self._searches.get(t)
+        if search is None:
+            search = self._searches[t] = _Search(len(self._rooms), t)
+            if len(self._searches) > self.cache_size:
+                self._searches.popitem(last=False)
+        else:
+            self._searches.move_to_end(t)
+
+        self._expand(search, s)
+        if search.dist[s] == UNREACHED:
+            return None, s
+        return search, s
+
+    def _expand(self, search, source):
+        '''
+        Expand a search level by level until it reaches source or every
+        room that can reach the target.
+        '''
+        dist = search.dist
+        if len(dist) < len(self._rooms):
+            # rooms added since the search started.
+            dist.extend(array(ROOM_TYPECODE, [UNREACHED])
+                        * (len(self._rooms) - len(dist)))
+
+        frontier = search.frontier
+        level = search.level
+        incoming = self._incoming
+        while dist[source] == UNREACHED and frontier:
+            level += 1
+            next_frontier = []
+            for v in frontier:
+                for u in incoming(v):
+                    if dist[u] == UNREACHED:
+                        dist[u] = level
+                        next_frontier.append(u)
+            frontier = next_frontier
+        search.frontier = frontier
+        search.level = level
+
+    def _exit_changed(self, room, old_target, new_target):
+        '''
+        Called by a Room when one of its exits is added, removed or changes
+        target.  old_target / new_target are None when there was / is no
+        exit.
+        '''
+        if self._rooms is None:
+            return
+        # add first so that any new rooms are numbered.
+        if new_target is not None:
+            self._add_exit(room, new_target)
+        if old_target is not None:
+            self._remove_exit(room, old_target)
+
+    def _exits_replaced(self, room, old_exits, new_exits):
+        '''
+        Called by a Room when its exits are replaced.
+        '''
+        if self._rooms is None:
+            return
+        for direction, target in new_exits.items():
+            if old_exits.get(direction) is not target:
+                self._add_exit(room, target)
+        for direction, target in old_exits.items():
+            if new_exits.get(direction) is not target:
+                self._remove_exit(room, target)
+
+    def _add_exit(self, room, target):
+        if target not in self._numbers:
+            self._add_rooms(target)
+        self._index_exit(self._numbers[room], self._numbers[target])
+
+    def _index_exit(self, u, v):
+        '''
+        Add an exit from room u to room v to the index.
+        '''
+        self._patched[v] = tuple(self._incoming(v)) + (u,)
+
+        for t, search in list(self._searches.items()):
+            dist_u = _distance(search, u)
+            dist_v = _distance(search, v)
+            # v was expanded without seeing u: u may now be closer.
+            if dist_v < search.level and dist_v + 1 < dist_u:
+                del self._searches[t]
+
+    def _remove_exit(self, room, target):
+        u = self._numbers[room]
+        v = self._numbers[target]
+        incoming = list(self._incoming(v))
+        incoming.remove(u)
+        self._patched[v] = tuple(incoming)
+
+        numbers = self._numbers
+        for t, search in list(self._searches.items()):
+            dist_u = _distance(search, u)
+            if dist_u == UNREACHED or dist_u == 0 \
+                    or _distance(search, v) != dist_u - 1:
+                continue
+            # u is still as close if another exit is one step closer.
+            if not any(_distance(search, numbers[other]) == dist_u - 1
+                       for other in room.exits.values()):
+                del self._searches[t]
+
+    def _add_rooms(self, room):
+        '''
+        Number a new room and any new rooms reachable from it and index
+        their exits.
+        '''
+        first = len(self._rooms)
+        self._number(room)
+        i = first
+        while i < len(self._rooms):
+            for target in self._rooms[i].exits.values():
+                self._number(target)
+            i += 1
+
+        for u in range(first, len(self._rooms)):
+            for target in self._rooms[u].exits.values():
+                self._index_exit(u, self._numbers[target])
+
+
+def _distance(search, n):
+    dist = search.dist
+    return dist[n] if n < len(dist) else UNREACHED
+
+
+def _normalise(name):
+    return ' '.join(name.lower().split())
@@ -0,0 +1,374 @@
+'''
+Asyncio multi-session game server.
+
+Hosts many independent TextWorld sessions in a single event loop.  Players
+connect over TCP (e.g. using telnet or netcat) and issue one command per
+line.  Each connection is given its own TextWorld created by a game
+module's `load_adventure()` function.
+
+Usage:
+------
+python -m text_adventure.server mini_knightmare --port 8023
+python -m text_adventure.server my_world.json
+python -m text_adventure.server mini_knightmare --shared
+
+Classes:
+--------
+
+Session: A single player's connection and TextWorld.
+
+GameServer: Accepts connections and manages the lifetime of Sessions.
+'''
+
+import argparse
+import asyncio
+import importlib
+import logging
+import signal
+from itertools import count
+
+from .overlay import SharedWorld
+from .render import HeadlessRenderer
+from .template import WorldTemplate
+from .worldfile import load_world
+
+################# CONSTANTS ###################################################
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8023
+DEFAULT_IDLE_TIMEOUT = 300.0
+# pending connection queue size.  Large to handle bursts of new players.
+DEFAULT_BACKLOG = 1024
+# seconds to wait for a player's connection to accept the shutdown message
+# or to close.  A client that stops reading cannot hold up other sessions.
+SEND_TIMEOUT = 5.0
+EXAMPLE_GAMES_PACKAGE = 'text_adventure.example_games'
+
+PROMPT = '\nWhat do you want to do? >>> '
+SERVER_FULL_MSG = 'The server is full.  Please try again later.'
+IDLE_TIMEOUT_MSG = 'You have been idle for too long.  Goodbye.'
+SHUTDOWN_MSG = 'The server is shutting down.  Goodbye.'
+SESSION_ERROR_MSG = 'Something went wrong.  Your session has ended.'
+
+logger = logging.getLogger(__name__)
+
+
+def load_game_module(name):
+    '''
+    Import a game module by name.  Names that are not found directly are
+    looked up in the bundled example games.
+
+    Params:
+    ------
+    name: str
+        Module name e.g. 'mini_knightmare' or 'my_games.castle'
+
+    Returns:
+    -------
+    module
+        A module with a `load_adventure()` function.
+
+    Raises:
+    ------
+    ImportError
+        If the module is not found or fails to import (e.g. it imports a
+        module that is not installed).
+    '''
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        if e.name != name:
+            # raised while importing the game module.
+            raise
+    return importlib.import_module(f'{EXAMPLE_GAMES_PACKAGE}.{name}')
+
+
+class Session:
+    '''
+    A single player's connection to the server and their TextWorld.
+    '''
+    def __init__(self, session_id, adventure, writer):
+        '''
+        Params:
+        ------
+        session_id: int
+            Unique id of the session
+
+        adventure: TextWorld
+            The session's game.  Not shared with any other session.
+
+        writer: asyncio.StreamWriter
+            Stream used to send text to the player.
+        '''
+        self.session_id = session_id
+        self.adventure = adventure
+        self.writer = writer
+        self.task = None
+        # sends are serialised: a StreamWriter must not be drained by two
+        # tasks at once (e.g. a reply and the shutdown message).
+        self._send_lock = asyncio.Lock()
+
+        # there is no terminal on the server.
+        self.adventure.renderer = HeadlessRenderer()
+
+    def __repr__(self):
+        return f"Session(session_id={self.session_id}, " \
+            + f"game='{self.adventure.name}', " \
+            + f"n_actions={self.adventure.n_actions})"
+
+    def opening(self):
+        '''
+        The game opening and description of the first room.
+        '''
+        msg = getattr(self.adventure, 'opening', '')
+        if msg:
+            msg += '\n\n'
+        return msg + self.adventure.describe_current_room()
+
+    async def send(self, msg, newline=True):
+        '''
+        Send text to the player.
+        '''
+        if newline:
+            msg += '\n'
+        async with self._send_lock:
+            self.writer.write(msg.encode('utf-8'))
+            await self.writer.drain()
+
+
+class GameServer:
+    '''
+    Hosts independent TextWorld sessions over a local TCP line protocol.
+    '''
+    def __init__(self, load_adventure, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, max_sessions=None):
+        '''
+        Params:
+        ------
+        load_adventure: callable
+            Function that returns a new TextWorld e.g. a game module's
+            `load_adventure`, `WorldTemplate.clone` or
+            `SharedWorld.new_game`.  Called once per session.
+
+        host: str, optional (default=DEFAULT_HOST)
+            Interface to listen on.
+
+        port: int, optional (default=DEFAULT_PORT)
+            Port to listen on.  0 = pick a free port.
+
+        idle_timeout: float or None, optional (default=DEFAULT_IDLE_TIMEOUT)
+            Seconds to wait for a command before a session is closed.
+            None = no timeout.
+
+        max_sessions: int or None, optional (default=None)
+            Maximum number of concurrent sessions.  None = unlimited.
+        '''
+        self.load_adventure = load_adventure
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self._session_ids = count(1)
+        self._server = None
+        self._stop = None
+        self._closing = False
+
+    @property
+    def session_count(self):
+        return len(self.sessions)
+
+    @property
+    def sockets(self):
+        '''
+        Listening sockets (useful when port=0).
+        '''
+        if self._server is None:
+            return []
+        return self._server.sockets
+
+    async def start(self):
+        '''
+        Start listening for connections.
+        '''
+        self._server = await asyncio.start_server(self._handle_client,
+                                                  self.host, self.port,
+                                                  backlog=DEFAULT_BACKLOG)
+        for sock in self._server.sockets:
+            logger.info('Serving on %s', sock.getsockname())
+
+    async def serve_forever(self):
+        '''
+        Start the server (if required) and serve until shutdown() is called
+        or SIGINT/SIGTERM is received.
+        '''
+        if self._server is None:
+            await self.start()
+
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # e.g. Windows or not running in the main thread.
+                pass
+
+        self._stop = stop
+        await stop.wait()
+        await self.shutdown()
+
+    async def shutdown(self, msg=SHUTDOWN_MSG):
+        '''
+        Gracefully shutdown.  Stop accepting connections, tell every
+        connected player that the server is closing and end their sessions.
+        '''
+        if self._closing:
+            return
+        self._closing = True
+
+        if self._server is not None:
+            self._server.close()
+
+        sessions = list(self.sessions.values())
+        # notify every player at once: each send is limited by a timeout.
+        await asyncio.gather(*[self._notify(session, msg)
+                               for session in sessions])
+        for session in sessions:
+            if session.task is not None:
+                session.task.cancel()
+
+        tasks = [s.task for s in sessions if s.task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self._server is not None:
+            await self._server.wait_closed()
+
+        if self._stop is not None:
+            self._stop.set()
+
+    async def _handle_client(self, reader, writer):
+        '''
+        Run a single session until the game ends, the player disconnects,
+        the session is idle for too long or the server shuts down.
+        '''
+        if self._closing or (self.max_sessions is not None
+                             and self.session_count >= self.max_sessions):
+            writer.write((SERVER_FULL_MSG + '\n').encode('utf-8'))
+            await self._close_writer(writer)
+            return
+
+        session = None
+        try:
+            session = Session(next(self._session_ids), self.load_adventure(),
+                              writer)
+            session.task = asyncio.current_task()
+            self.sessions[session.session_id] = session
+            logger.debug('Opened %r', session)
+
+            await self._play(session, reader)
+        except asyncio.CancelledError:
+            # server shutdown
+            pass
+        except ConnectionError:
+            logger.debug('Connection lost %r', session)
+        except Exception:
+            # an error in one session (or creating its game) must not
+            # affect any other session.
+            logger.exception('Error in %s', session or 'a new session')
+            if session is None:
+                writer.write((SESSION_ERROR_MSG + '\n').encode('utf-8'))
+                try:
+                    await asyncio.wait_for(writer.drain(), SEND_TIMEOUT)
+                except (ConnectionError, asyncio.TimeoutError):
+                    pass
+            else:
+                await self._notify(session, SESSION_ERROR_MSG)
+        finally:
+            if session is not None:
+                del self.sessions[session.session_id]
+            await self._close_writer(writer)
+            logger.debug('Closed %r', session)
+
+    async def _play(self, session, reader):
+        '''
+        The game loop for a session.
+        '''
+        adventure = session.adventure
+        await session.send(session.opening())
+
+        while adventure.active:
+            await session.send(PROMPT, newline=False)
+            try:
+                line = await asyncio.wait_for(reader.readline(),
+                                              self.idle_timeout)
+            except asyncio.TimeoutError:
+                await session.send('\n' + IDLE_TIMEOUT_MSG)
+                return
+
+            if not line:
+                # player disconnected
+                return
+
+            command = line.decode('utf-8', errors='replace').strip()
+            await session.send(adventure.take_action(command))
+
+        await session.send(adventure.game_over_message)
+
+    async def _notify(self, session, msg):
+        '''
+        Send a message to a player, giving up after SEND_TIMEOUT seconds
+        (including any wait for a send already in progress).
+        '''
+        try:
+            await asyncio.wait_for(session.send(msg), SEND_TIMEOUT)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+
+    async def _close_writer(self, writer):
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            # the player is not reading: drop any unsent output.
+            writer.transport.abort()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+
+def main(argv=None):
+    '''
+    Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Host a text adventure for many players over TCP.')
+    parser.add_argument('game', help='game module e.g. mini_knightmare or '
+                        + 'a world file e.g. my_world.json')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--idle-timeout', type=float,
+                        default=DEFAULT_IDLE_TIMEOUT,
+                        help='seconds before an idle session is closed')
+    parser.add_argument('--max-sessions', type=int, default=None)
+    parser.add_argument('--shared', action='store_true',
+                        help='play every session in one shared world '
+                        + '(less memory per session, slower commands)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    # build the game once and clone (or share) it for each session.
+    if args.game.endswith('.json'):
+        world = load_world(args.game)
+    else:
+        world = load_game_module(args.game).load_adventure()
+    if args.shared:
+        new_game = SharedWorld(world).new_game
+    else:
+        new_game = WorldTemplate(world).clone
+    server = GameServer(new_game, host=args.host, port=args.port,
+                        idle_timeout=args.idle_timeout,
+                        max_sessions=args.max_sessions)
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == '__main__':
+    main()
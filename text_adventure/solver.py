@@ -0,0 +1,588 @@
+'''
+State space solver
+
+Explores the reachable states of a game breadth first to check that it can
+still be won.  From each state the solver tries every admissible command:
+moving through the current room's exits, picking up and dropping portable
+items and every use command of the visible items (with each answer of
+conditional and choice actions).  Read-only commands (look, examine,
+inventory) and quit are never tried.
+
+States are captured with a StateCodec.  A transposition table keyed by the
+parts of the state that change what commands do (e.g. not the text of room
+descriptions) means each state is expanded once.  The search reports the
+shortest winning sequence of commands and the dead-end states from which the
+game can no longer be won.
+
+With `workers` > 1 each level of the search is split across a process pool.
+Workers build their own copy of the game and states are exchanged in the
+portable save format.
+
+Usage:
+------
+python -m text_adventure.solver mini_knightmare
+python -m text_adventure.solver data_day_adventure --workers 4
+
+Classes:
+--------
+
+SolverResult: the outcome of a search.
+
+Functions:
+---------
+
+solve: search a game for the shortest winning sequence of commands.
+
+admissible_commands: the commands tried from the current state of a world.
+
+game_completed: default goal.  The game ended without the player dying.
+'''
+
+import argparse
+import os
+import sys
+import time
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .actions import ChoiceInventoryItemAction, ConditionalInventoryItemAction
+from .commands import PlayerDeath
+from .state import STATE_TYPECODE, StateCodec
+
+################# CONSTANTS ###################################################
+DEFAULT_MAX_STATES = 1_000_000
+# frontier states sent to a worker in one task.
+DEFAULT_CHUNK_SIZE = 256
+
+# answer given to conditional actions to try the incorrect branch.
+WRONG_ANSWER = '?'
+
+# status of a state reached by a command.
+OPEN = 0
+GOAL = 1
+ENDED = 2
+
+# state index of TextWorld.n_actions (see StateCodec.capture)
+N_ACTIONS_INDEX = 2
+
+# world -> messages of its PlayerDeath commands (see _death_messages)
+_death_messages_cache = weakref.WeakKeyDictionary()
+
+
+class SolverResult:
+    '''
+    The outcome of a search.
+
+    Attributes:
+    ----------
+    solution: tuple of str or None
+        The shortest winning sequence of commands.  None if the game cannot
+        be won within the explored states.
+
+    n_states: int
+        Number of distinct states reached.
+
+    n_transitions: int
+        Number of commands executed.
+
+    depth: int
+        Number of levels searched.
+
+    complete: bool
+        True if every reachable state was explored.
+
+    elapsed: float
+        Search time in seconds.
+    '''
+    def __init__(self, parents, goals, dead_end_keys, depth, complete,
+                 n_transitions, elapsed):
+        self._parents = parents
+        self._goals = goals
+        self._dead_end_keys = dead_end_keys
+        self.n_states = len(parents)
+        self.n_transitions = n_transitions
+        self.depth = depth
+        self.complete = complete
+        self.elapsed = elapsed
+        self.solution = self.path(goals[0]) if goals else None
+
+    def __repr__(self):
+        moves = None if self.solution is None else len(self.solution)
+        return f'SolverResult(solved={self.solved}, moves={moves}, ' \
+            + f'n_states={self.n_states}, ' \
+            + f'n_dead_ends={len(self._dead_end_keys)}, ' \
+            + f'complete={self.complete})'
+
+    @property
+    def solved(self):
+        return self.solution is not None
+
+    @property
+    def dead_ends(self):
+        '''
+        Commands leading to each dead-end state (shortest first).
+
+        If the search was complete a dead end is any state from which the
+        goal cannot be reached, e.g. the player died or used up an item
+        needed later.  If the search stopped early only states where the
+        game ended without reaching the goal are known to be dead ends.
+
+        Returns:
+        -------
+        list of tuple of str
+        '''
+        return [self.path(key) for key in self._dead_end_keys]
+
+    def path(self, key):
+        '''
+        The commands that reach a state from the start.
+        '''
+        commands = []
+        parent = self._parents[key]
+        while parent is not None:
+            key, command = parent
+            commands.append(command)
+            parent = self._parents[key]
+        commands.reverse()
+        return tuple(commands)
+
+
+def game_completed(world, response):
+    '''
+    Default goal.  True if the game ended and the player did not die.
+
+    Params:
+    ------
+    world: TextWorld
+        The world after a command.
+
+    response: str
+        The response to the command.
+    '''
+    if world.active:
+        return False
+    return not any(message in response
+                   for message in _death_messages(world))
+
+
+def _death_messages(world):
+    '''
+    Messages of the PlayerDeath commands of a game.  Cached per world by the
+    solver.
+    '''
+    try:
+        return _death_messages_cache[world]
+    except KeyError:
+        pass
+
+    codec = StateCodec(world)
+    messages = []
+    for action in codec.actions:
+        for command in getattr(action, 'commands', ()):
+            if isinstance(command, PlayerDeath) \
+                    and command.death_msg not in messages:
+                messages.append(command.death_msg)
+    _death_messages_cache[world] = messages
+    return messages
+
+
+def admissible_commands(world, drop=True):
+    '''
+    The commands tried from the current state of a world.
+
+    Params:
+    ------
+    world: TextWorld
+
+    drop: bool, optional (default=True)
+        Include commands that drop the items the player holds.
+
+    Returns:
+    -------
+    list of str
+    '''
+    room = world.current_room
+    commands = [direction for direction in room.exits
+                if direction in world.legal_exits]
+
+    get_verb = _verb(world, '_create_transfer_to_player_command')
+    drop_verb = _verb(world, '_create_transfer_to_room_command') \
+        if drop else None
+    use_verbs = set(world.use_aliases)
+
+    # the player's inventory is searched first by use commands.
+    for holder, transfer_verb in [(world, drop_verb), (room, get_verb)]:
+        for item in holder.inventory:
+            alias = _unique_alias(holder, item)
+            if alias is None:
+                continue
+            if not item.fixed and transfer_verb is not None:
+                commands.append(f'{transfer_verb} {alias}')
+            for action in item.actions:
+                if action.command_text not in use_verbs:
+                    continue
+                command = f'{action.command_text} {alias}'
+                for answer in _answers(action):
+                    commands.append(f'{command} {answer}')
+                if not _needs_answer(action):
+                    commands.append(command)
+
+    # an item with several actions for a verb gives duplicates.
+    return list(dict.fromkeys(commands))
+
+
+def _answers(action):
+    if isinstance(action, ConditionalInventoryItemAction):
+        return [action.correct_answer.lower(), WRONG_ANSWER]
+    if isinstance(action, ChoiceInventoryItemAction):
+        return [choice.lower() for choice in action.choices]
+    return []
+
+
+def _needs_answer(action):
+    return isinstance(action, (ConditionalInventoryItemAction,
+                               ChoiceInventoryItemAction))
+
+
+def _verb(world, creator_name):
+    '''
+    The player verb mapped to one of the TextWorld command creators.
+    '''
+    for verb, creator in world.legal_verbs.items():
+        if getattr(creator, '__name__', None) == creator_name:
+            return verb
+    return None
+
+
+def _unique_alias(holder, item):
+    '''
+    A single word alias that finds item in holder (None if there is none).
+    '''
+    for alias in item.aliases:
+        if alias == alias.lower() and ' ' not in alias:
+            try:
+                if holder.find_inventory(alias) is item:
+                    return alias
+            except KeyError:
+                continue
+    return None
+
+
+class _Expander:
+    '''
+    Executes the admissible commands of states in a world of its own.
+    '''
+    def __init__(self, load_adventure, goal, drop):
+        self.world = load_adventure()
+        self.codec = StateCodec(self.world)
+        self.goal = goal
+        self.drop = drop
+        codec = self.codec
+        # sections of the state ignored by the transposition key.
+        self._text = slice(codec._desc_start, codec._exits_start)
+        self._visited = slice(codec._visited_start, codec._location_start)
+        self._positions = slice(codec._position_start, codec._actions_start)
+        self._actions = slice(codec._actions_start, codec.state_length)
+        self._no_text = array(STATE_TYPECODE, [0] * len(codec.rooms))
+        self._not_visited = array(STATE_TYPECODE, [0] * codec.n_bitmap_words)
+        self._no_positions = array(STATE_TYPECODE, [0] * len(codec.items))
+        # action list id -> id of its sorted unique actions
+        self._action_set_ids = {}
+        # the state of the world (None = unknown)
+        self._current = None
+
+    def start(self):
+        '''
+        Returns:
+        -------
+        tuple (key, state) of the initial state
+        '''
+        key, self._current = self._capture()
+        return self._export(key, self._current)
+
+    def expand(self, state):
+        '''
+        Execute each admissible command in state.
+
+        Returns:
+        -------
+        list of tuple (command, key, state, status)
+        '''
+        world = self.world
+        restore = self.codec.restore
+        goal = self.goal
+
+        # restore only the differences from the last state captured.
+        restore(state, self._current)
+        children = []
+        for command in admissible_commands(world, self.drop):
+            restore(state, self._current)
+            response = world.take_action(command)
+            key, child = self._capture()
+            self._current = child
+            if goal(world, response):
+                status = GOAL
+            elif not world.active:
+                status = ENDED
+            else:
+                status = OPEN
+            children.append((command,) + self._export(key, child)
+                            + (status,))
+        return children
+
+    def _export(self, key, state):
+        '''
+        Convert a key and state to the form returned to the search.
+        '''
+        return key, state
+
+    def _capture(self):
+        '''
+        Capture the world's state ignoring the number of actions taken.
+
+        Returns:
+        -------
+        tuple (key, state)
+            key is the transposition key.  It ignores the parts of the state
+            that do not change what commands do: room descriptions, visited
+            flags, the order of inventory items and repeated actions.  e.g.
+            an action that appends to a room description each time it is
+            used would otherwise give an infinite number of states.
+        '''
+        values = array(STATE_TYPECODE)
+        values.frombytes(self.codec.capture())
+        values[N_ACTIONS_INDEX] = 0
+        state = values.tobytes()
+        values[self._text] = self._no_text
+        values[self._visited] = self._not_visited
+        values[self._positions] = self._no_positions
+        values[self._actions] = array(STATE_TYPECODE,
+                                      map(self._action_set_id,
+                                          values[self._actions]))
+        return values.tobytes(), state
+
+    def _action_set_id(self, action_list_id):
+        try:
+            return self._action_set_ids[action_list_id]
+        except KeyError:
+            tables = self.codec.tables
+            action_set = tuple(sorted(set(
+                tables.action_lists[action_list_id])))
+            set_id = self._action_set_ids[action_list_id] \
+                = tables.action_list_id(action_set)
+            return set_id
+
+
+class _PortableExpander(_Expander):
+    '''
+    An _Expander whose keys and states use the portable save format so that
+    they can be exchanged between processes.
+    '''
+    def expand(self, state):
+        return super().expand(self.codec.loads(state))
+
+    def _export(self, key, state):
+        dumps = self.codec.dumps
+        return dumps(key), dumps(state)
+
+
+# the _PortableExpander of a worker process.
+_worker = None
+
+
+def _init_worker(load_adventure, goal, drop):
+    global _worker
+    _worker = _PortableExpander(load_adventure, goal, drop)
+
+
+def _expand_chunk(states):
+    return [_worker.expand(state) for state in states]
+
+
+def solve(load_adventure, goal=None, drop=True, max_states=DEFAULT_MAX_STATES,
+          max_depth=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Breadth first search for the shortest winning sequence of commands.
+
+    The search continues after the goal is found so that dead-end states
+    can be reported.  Use max_depth or max_states to limit it.
+
+    Params:
+    ------
+    load_adventure: callable
+        Builds the game e.g. `mini_knightmare.load_adventure`.  Must be
+        picklable (e.g. a module level function) when workers > 1.
+
+    goal: callable, optional (default=None)
+        goal(world, response) -> bool called after each command.  States
+        where it returns True are winning states and are not explored
+        further.  If None then `game_completed` is used.
+
+    drop: bool, optional (default=True)
+        Try dropping items.  Items can then be left in any room the player
+        visits which multiplies the number of states.  Set to False to
+        search games where dropping items is never needed much faster.
+
+    max_states: int, optional (default=DEFAULT_MAX_STATES)
+        Stop after reaching this many distinct states.
+
+    max_depth: int, optional (default=None)
+        Stop after this many commands.  None = no limit.
+
+    workers: int, optional (default=1)
+        Number of processes.  If > 1 each level of the search is split
+        across a process pool.
+
+    chunk_size: int, optional (default=DEFAULT_CHUNK_SIZE)
+        Number of states sent to a worker in one task.
+
+    Returns:
+    -------
+    SolverResult
+    '''
+    if goal is None:
+        goal = game_completed
+
+    start_time = time.perf_counter()
+    if workers > 1:
+        expander = _PortableExpander(load_adventure, goal, drop)
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(load_adventure, goal, drop))
+
+        def expand_all(states):
+            chunks = [states[i:i + chunk_size]
+                      for i in range(0, len(states), chunk_size)]
+            return [children for results in pool.map(_expand_chunk, chunks)
+                    for children in results]
+    else:
+        expander = _Expander(load_adventure, goal, drop)
+        pool = None
+
+        def expand_all(states):
+            return [expander.expand(state) for state in states]
+
+    start_key, start_state = expander.start()
+    # transposition table: key -> (parent key, command).  None = start.
+    parents = {start_key: None}
+    # key -> keys of the states reached from it.
+    successors = {}
+    goals = []
+    ended = []
+    frontier_keys = [start_key]
+    frontier_states = [start_state]
+    depth = 0
+    n_transitions = 0
+    complete = True
+
+    try:
+        while frontier_keys:
+            if (max_depth is not None and depth >= max_depth) \
+                    or len(parents) >= max_states:
+                complete = False
+                break
+            depth += 1
+            next_keys = []
+            next_states = []
+            for key, children in zip(frontier_keys,
+                                     expand_all(frontier_states)):
+                n_transitions += len(children)
+                successors[key] = [child_key for _, child_key, _, _
+                                   in children]
+                for command, child_key, child_state, status in children:
+                    if child_key in parents:
+                        continue
+                    parents[child_key] = (key, command)
+                    if status == GOAL:
+                        goals.append(child_key)
+                    elif status == ENDED:
+                        ended.append(child_key)
+                    else:
+                        next_keys.append(child_key)
+                        next_states.append(child_state)
+            frontier_keys = next_keys
+            frontier_states = next_states
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if complete:
+        dead_end_keys = _dead_ends(parents, successors, goals)
+    else:
+        dead_end_keys = ended
+
+    return SolverResult(parents, goals, dead_end_keys, depth, complete,
+                        n_transitions, time.perf_counter() - start_time)
+
+
+def _dead_ends(parents, successors, goals):
+    '''
+    Keys of the states from which no goal state can be reached.  Returned
+    in the order they were reached (shortest path first).
+    '''
+    predecessors = {}
+    for key, children in successors.items():
+        for child in children:
+            predecessors.setdefault(child, []).append(key)
+
+    can_win = set(goals)
+    to_visit = list(goals)
+    while to_visit:
+        for key in predecessors.get(to_visit.pop(), ()):
+            if key not in can_win:
+                can_win.add(key)
+                to_visit.append(key)
+
+    return [key for key in parents if key not in can_win]
+
+
+def main(argv=None):
+    '''
+    Command line entry point.
+    '''
+    # imported here to avoid a circular import (server imports worldfile).
+    from .server import load_game_module
+    from .worldfile import load_world
+
+    parser = argparse.ArgumentParser(
+        description='Search a game for the shortest winning sequence.')
+    parser.add_argument('game', help='game module e.g. mini_knightmare or '
+                        + 'a world file e.g. my_world.json')
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f'processes (this machine has {os.cpu_count()})')
+    parser.add_argument('--no-drop', action='store_true',
+                        help='never try dropping items')
+    parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--show-dead-ends', type=int, default=10,
+                        help='number of dead ends listed')
+    args = parser.parse_args(argv)
+
+    if args.game.endswith('.json'):
+        load_adventure = partial(load_world, args.game)
+    else:
+        load_adventure = load_game_module(args.game).load_adventure
+
+    result = solve(load_adventure, drop=not args.no_drop,
+                   max_states=args.max_states,
+                   max_depth=args.max_depth, workers=args.workers)
+
+    print(f'{result.n_states} states, {result.n_transitions} commands, '
+          + f'depth {result.depth}, {result.elapsed:.2f}s'
+          + ('' if result.complete else ' (search stopped early)'))
+    if result.solved:
+        print(f'\nSolved in {len(result.solution)} commands:')
+        print('\n'.join(result.solution))
+    else:
+        print('\nNo winning sequence found.')
+
+    dead_ends = result.dead_ends
+    print(f'\n{len(dead_ends)} dead-end states.')
+    for commands in dead_ends[:args.show_dead_ends]:
+        print('  ' + ', '.join(commands))
+    return 0 if result.solved else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
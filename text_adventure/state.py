@@ -0,0 +1,904 @@
+'''
+Compact game state
+
+The dynamic state of a TextWorld is spread across its Rooms (description,
+exits, visited), the inventory of every holder, the actions of every
+InventoryItem, the room each Player is in and the TextWorld itself
+(active, n_actions).
+This module provides an opt-in compact representation of that state: a
+few flat integer arrays packed into an immutable bytes object.  A state can
+be hashed, compared and copied cheaply and restored into the world.
+States can also be saved to and loaded from a compact versioned binary
+file with `save_state()` and `load_state()`.
+
+Static content (description strings, exit tables and action lists) is held
+once in StateTables shared by every codec for the same game.  The state
+only holds integer ids into these tables.
+
+Classes:
+--------
+
+StateTables: shared append-only tables of the static content of a game.
+
+StateCodec: captures and restores the state of a TextWorld.
+
+Functions:
+---------
+
+save_state: save the state of a TextWorld to a binary file.
+
+load_state: load a saved state into a TextWorld.
+'''
+
+import hashlib
+import struct
+import sys
+from array import array
+
+from .actions import InventoryItemAction
+from .commands import Command
+from .world import InventoryHolder, InventoryItem, Room, instance_attributes
+
+# array typecode for state values (signed 32 bit)
+STATE_TYPECODE = 'i'
+
+# number of rooms per word of the visited bitmap
+BITMAP_WORD_SIZE = 31
+
+# item location when not held by a player or a room.
+NOT_HELD = -1
+# item location of the first player (rooms are 1..n_rooms, other players
+# n_rooms + 1..)
+PLAYER = 0
+
+# size in bytes of the fingerprint of a game definition (see StateCodec)
+FINGERPRINT_SIZE = 8
+
+# header: current room of the first player, active, n_actions, game over
+# message
+HEADER_SIZE = 4
+
+# saved state file format.
+SAVE_MAGIC = b'TAVS'
+SAVE_FORMAT_VERSION = 2
+# magic, format version, length of game name, n_rooms, n_items, n_actions,
+# number of values in the integer section, fingerprint of the game
+# definition.  Little endian.
+SAVE_HEADER = struct.Struct(f'<4sHHIIII{FINGERPRINT_SIZE}s')
+
+
+class StateTables:
+    '''
+    Append-only tables of the static content referenced by a game state.
+    Values are stored once and referenced by their index.  Shared by all
+    StateCodecs of the same game.
+    '''
+    def __init__(self):
+        self.strings = []
+        self.exits = []
+        self.action_lists = []
+        self._string_ids = {}
+        self._exit_ids = {}
+        self._action_list_ids = {}
+
+    def __repr__(self):
+        return f'StateTables(n_strings={len(self.strings)}, ' \
+            + f'n_exits={len(self.exits)}, ' \
+            + f'n_action_lists={len(self.action_lists)})'
+
+    def string_id(self, value):
+        return _intern(value, self.strings, self._string_ids)
+
+    def exits_id(self, value):
+        return _intern(value, self.exits, self._exit_ids)
+
+    def action_list_id(self, value):
+        return _intern(value, self.action_lists, self._action_list_ids)
+
+
+def _intern(value, table, ids):
+    '''
+    Return the index of value in table, adding it if required.
+    '''
+    try:
+        return ids[value]
+    except KeyError:
+        ids[value] = len(table)
+        table.append(value)
+        return ids[value]
+
+
+class StateCodec:
+    '''
+    Captures and restores the dynamic state of a TextWorld as bytes.
+
+    States are laid out from the world's game definition: its Rooms,
+    InventoryItems and actions as built (see TextWorld.game_definition) so
+    a codec created mid-game matches one created before play.  Use `bind()`
+    to use the same tables with another world built from the same game
+    definition (e.g. a WorldTemplate clone).
+
+    The codec captures the players of the world when it is created.
+    Capturing or restoring after a player is added or removed raises
+    ValueError: create a new codec.
+
+    Example:
+    -------
+    codec = StateCodec(adventure)
+    state = codec.capture()
+    adventure.take_action('get helmet')
+    codec.restore(state)
+    '''
+    def __init__(self, world, tables=None):
+        '''
+        Params:
+        ------
+        world: TextWorld
+            The world to capture and restore.
+
+        tables: StateTables, optional (default=None)
+            Tables shared with other codecs of the same game.  If None then
+            new tables are created.
+        '''
+        self.world = world
+        self.tables = StateTables() if tables is None else tables
+
+        self.rooms, self.items, self.actions = world.game_definition()
+        # codecs with equal fingerprints lay out states the same way.
+        self.fingerprint = _fingerprint(self.rooms, self.items, self.actions)
+        self.players = list(world.players.values())
+        self._roster_changes = world.roster_changes
+        # item locations (see PLAYER)
+        self._holders = self.players[:1] + self.rooms + self.players[1:]
+        self._holder_index = {id(holder): location for location, holder
+                              in enumerate(self._holders)}
+        self._room_index = {id(room): i for i, room in enumerate(self.rooms)}
+        self._item_index = {item.item_id: i
+                            for i, item in enumerate(self.items)}
+        self._action_index = {id(action): i
+                              for i, action in enumerate(self.actions)}
+        # tuple of actions held by an item -> id of its action list
+        self._action_list_ids = {}
+
+        n_rooms = len(self.rooms)
+        n_items = len(self.items)
+        self.n_bitmap_words = -(-n_rooms // BITMAP_WORD_SIZE)
+
+        # offsets of each section of the state array.
+        self._desc_start = HEADER_SIZE
+        self._exits_start = self._desc_start + n_rooms
+        self._visited_start = self._exits_start + n_rooms
+        self._location_start = self._visited_start + self.n_bitmap_words
+        self._position_start = self._location_start + n_items
+        self._actions_start = self._position_start + n_items
+        # current rooms of the players after the first.
+        self._players_start = self._actions_start + n_items
+        self.state_length = self._players_start + len(self.players) - 1
+
+    def __repr__(self):
+        return f"StateCodec(world='{self.world.name}', " \
+            + f'n_rooms={len(self.rooms)}, n_items={len(self.items)}, ' \
+            + f'state_bytes={self.state_size})'
+
+    @property
+    def state_size(self):
+        '''
+        Size of a captured state in bytes.
+        '''
+        return self.state_length * array(STATE_TYPECODE).itemsize
+
+    def bind(self, world):
+        '''
+        Return a codec for another world built from the same game definition
+        that shares this codec's tables.  States captured by either codec
+        can be restored by the other.
+
+        Raises:
+        ------
+        ValueError
+            If the world does not match the structure of this codec's world.
+        '''
+        codec = StateCodec(world, self.tables)
+        if codec.fingerprint != self.fingerprint \
+                or len(codec.players) != len(self.players):
+            raise ValueError('world does not match the codec game definition')
+        return codec
+
+    def _check_players(self):
+        '''
+        Raise ValueError if players were added or removed since the codec
+        was created.
+        '''
+        if self.world.roster_changes != self._roster_changes:
+            raise ValueError('the players of the world have changed since '
+                             + 'the codec was created')
+
+    def capture(self):
+        '''
+        Capture the dynamic state of the world.
+
+        Returns:
+        -------
+        bytes
+            The state.  Hashable and comparable.
+
+        Raises:
+        ------
+        ValueError
+            If players were added or removed since the codec was created.
+        '''
+        self._check_players()
+        world = self.world
+        tables = self.tables
+        string_id = tables.string_id
+        exits_id = tables.exits_id
+        room_index = self._room_index
+        rooms = self.rooms
+        players = self.players
+
+        header = [room_index.get(id(players[0].current_room), -1),
+                  int(world.active),
+                  world.n_actions,
+                  string_id(world.game_over_message)]
+
+        descriptions = [string_id(room.description) for room in rooms]
+        exits = [exits_id(tuple([(direction, room_index[id(target)])
+                                 for direction, target
+                                 in room.exits.items()]))
+                 for room in rooms]
+
+        visited = [0] * self.n_bitmap_words
+        for i, room in enumerate(rooms):
+            if room.visited:
+                visited[i // BITMAP_WORD_SIZE] |= 1 << i % BITMAP_WORD_SIZE
+
+        n_items = len(self.items)
+        locations = [NOT_HELD] * n_items
+        positions = [0] * n_items
+        item_index = self._item_index
+        for location, holder in enumerate(self._holders):
+            for position, item_id in enumerate(holder._items):
+                i = item_index[item_id]
+                # an item held more than once is recorded at its first holder
+                if locations[i] == NOT_HELD:
+                    locations[i] = location
+                    positions[i] = position
+
+        # items usually keep the same actions tuple between captures.
+        action_list_ids = self._action_list_ids
+        actions = []
+        for item in self.items:
+            item_actions = item._actions
+            action_list = action_list_ids.get(item_actions)
+            if action_list is None:
+                action_list = action_list_ids[item_actions] = \
+                    self._action_list_id(item_actions)
+            actions.append(action_list)
+
+        player_rooms = [room_index.get(id(player.current_room), -1)
+                        for player in players[1:]]
+
+        return array(STATE_TYPECODE, header + descriptions + exits + visited
+                     + locations + positions + actions
+                     + player_rooms).tobytes()
+
+    def _action_list_id(self, item_actions):
+        action_index = self._action_index
+        return self.tables.action_list_id(
+            tuple([action_index[id(action)] for action in item_actions]))
+
+    def dumps(self, state=None):
+        '''
+        Serialise a state to the versioned binary save format.
+
+        A captured state holds ids into this codec's tables.  The save format
+        includes the strings, exits and action lists the state references so
+        that it can be loaded by any codec for the same game (e.g. in a new
+        process).
+
+        Params:
+        ------
+        state: bytes, optional (default=None)
+            A state returned by `capture()`.  If None the current state of
+            the world is captured.
+
+        Returns:
+        -------
+        bytes
+        '''
+        if state is None:
+            state = self.capture()
+        values = array(STATE_TYPECODE)
+        values.frombytes(state)
+        tables = self.tables
+
+        # tables local to the save.  Rebuilt and re-interned when loaded.
+        strings, string_ids = [], {}
+        exits, exit_ids = [], {}
+        action_lists, action_list_ids = [], {}
+
+        values[3] = _intern(tables.strings[values[3]], strings, string_ids)
+        for i in range(self._desc_start, self._exits_start):
+            values[i] = _intern(tables.strings[values[i]], strings,
+                                string_ids)
+        for i in range(self._exits_start, self._visited_start):
+            room_exits = tuple([(_intern(direction, strings, string_ids),
+                                 target) for direction, target
+                                in tables.exits[values[i]]])
+            values[i] = _intern(room_exits, exits, exit_ids)
+        for i in range(self._actions_start, self._players_start):
+            values[i] = _intern(tables.action_lists[values[i]], action_lists,
+                                action_list_ids)
+
+        encoded = [string.encode('utf-8') for string in strings]
+        body = array(STATE_TYPECODE, [len(encoded)])
+        body.extend([len(string) for string in encoded])
+        body.append(len(exits))
+        for room_exits in exits:
+            body.append(len(room_exits))
+            for pair in room_exits:
+                body.extend(pair)
+        body.append(len(action_lists))
+        for action_list in action_lists:
+            body.append(len(action_list))
+            body.extend(action_list)
+        body.extend(values)
+        if sys.byteorder == 'big':
+            body.byteswap()
+
+        name = self.world.name.encode('utf-8')
+        header = SAVE_HEADER.pack(SAVE_MAGIC, SAVE_FORMAT_VERSION, len(name),
+                                  len(self.rooms), len(self.items),
+                                  len(self.actions), len(body),
+                                  self.fingerprint)
+        return b''.join([header, name, body.tobytes()] + encoded)
+
+    def loads(self, data):
+        '''
+        Deserialise a state saved by `dumps()`.
+
+        Params:
+        ------
+        data: bytes
+            A saved state.
+
+        Returns:
+        -------
+        bytes
+            A state that can be passed to `restore()`.
+
+        Raises:
+        ------
+        ValueError
+            If data is not a saved state, uses an unsupported format version
+            or was saved from a different game (or game definition).
+        '''
+        if len(data) < SAVE_HEADER.size:
+            raise ValueError('data is not a saved game state')
+        magic, version, name_length, n_rooms, n_items, n_actions, n_values, \
+            fingerprint = SAVE_HEADER.unpack_from(data)
+        if magic != SAVE_MAGIC:
+            raise ValueError('data is not a saved game state')
+        if version != SAVE_FORMAT_VERSION:
+            raise ValueError(f'unsupported save format version {version}')
+
+        start = SAVE_HEADER.size
+        name = data[start:start + name_length].decode('utf-8')
+        if name != self.world.name \
+                or (n_rooms, n_items, n_actions) \
+                != (len(self.rooms), len(self.items), len(self.actions)) \
+                or fingerprint != self.fingerprint:
+            raise ValueError(f"saved state of '{name}' does not match the "
+                             + 'codec game definition')
+
+        start += name_length
+        end = start + n_values * array(STATE_TYPECODE).itemsize
+        body = array(STATE_TYPECODE)
+        body.frombytes(data[start:end])
+        if sys.byteorder == 'big':
+            body.byteswap()
+
+        tables = self.tables
+        strings = []
+        n_strings = body[0]
+        position = end
+        for length in body[1:n_strings + 1]:
+            strings.append(data[position:position + length].decode('utf-8'))
+            position += length
+        string_ids = [tables.string_id(string) for string in strings]
+
+        i = n_strings + 1
+        exit_ids = []
+        for _ in range(body[i]):
+            n_pairs = body[i + 1]
+            pairs = body[i + 2:i + 2 + 2 * n_pairs]
+            exit_ids.append(tables.exits_id(tuple(
+                [(strings[pairs[j]], pairs[j + 1])
+                 for j in range(0, len(pairs), 2)])))
+            i += 1 + 2 * n_pairs
+        i += 1
+
+        action_list_ids = []
+        for _ in range(body[i]):
+            length = body[i + 1]
+            action_list_ids.append(tables.action_list_id(
+                tuple(body[i + 2:i + 2 + length])))
+            i += 1 + length
+        i += 1
+
+        values = body[i:]
+        if len(values) != self.state_length:
+            raise ValueError('saved state is corrupt')
+
+        values[3] = string_ids[values[3]]
+        for i in range(self._desc_start, self._exits_start):
+            values[i] = string_ids[values[i]]
+        for i in range(self._exits_start, self._visited_start):
+            values[i] = exit_ids[values[i]]
+        for i in range(self._actions_start, self._players_start):
+            values[i] = action_list_ids[values[i]]
+        return values.tobytes()
+
+    def save(self, file):
+        '''
+        Save the current state of the world to a binary file.
+
+        Params:
+        ------
+        file: str, path or binary file object
+        '''
+        _write(file, self.dumps())
+
+    def load(self, file):
+        '''
+        Restore the world to a state saved with `save()`.
+
+        Params:
+        ------
+        file: str, path or binary file object
+        '''
+        self.restore(self.loads(_read(file)))
+
+    def restore(self, state, current=None):
+        '''
+        Restore the world to a captured state.  The world's undo history is
+        cleared because its records refer to the state replaced (e.g. the
+        ids of description segments).
+
+        Params:
+        ------
+        state: bytes
+            A state returned by `capture()` of this codec or a codec bound
+            to a world of the same game.
+
+        current: bytes, optional (default=None)
+            The state the world is in now (e.g. just captured).  If given
+            only the rooms, inventories and items that differ from it are
+            restored.  Much faster when moving between similar states.
+
+        Raises:
+        ------
+        ValueError
+            If the state does not match the codec or players were added or
+            removed since the codec was created.
+        '''
+        self._check_players()
+        values = array(STATE_TYPECODE)
+        values.frombytes(state)
+        if len(values) != self.state_length:
+            raise ValueError('state does not match the codec game definition')
+
+        if current is None:
+            old = None
+        else:
+            old = array(STATE_TYPECODE)
+            old.frombytes(current)
+            if len(old) != self.state_length:
+                raise ValueError('state does not match the codec game '
+                                 + 'definition')
+
+        world = self.world
+        tables = self.tables
+
+        players = self.players
+        if values[0] >= 0:
+            players[0].current_room = self.rooms[values[0]]
+        for i, player in enumerate(players[1:], self._players_start):
+            if values[i] >= 0:
+                player.current_room = self.rooms[values[i]]
+        world.active = bool(values[1])
+        world.n_actions = values[2]
+        world.game_over_message = tables.strings[values[3]]
+
+        rooms = self.rooms
+        desc_start = self._desc_start
+        exits_start = self._exits_start
+        visited_start = self._visited_start
+        for i, room in enumerate(rooms):
+            desc = values[desc_start + i]
+            if old is None or old[desc_start + i] != desc:
+                room.description = tables.strings[desc]
+            exits = values[exits_start + i]
+            if old is None or old[exits_start + i] != exits:
+                room.exits = {direction: rooms[target] for direction, target
+                              in tables.exits[exits]}
+            word, bit = divmod(i, BITMAP_WORD_SIZE)
+            room.visited = bool(values[visited_start + word] >> bit & 1)
+
+        holders = self._holders
+        location_start = self._location_start
+        position_start = self._position_start
+        n_items = len(self.items)
+        if old is None:
+            changed = range(len(holders))
+        else:
+            # holders that gained, lost or reordered items.  A state only
+            # records the first holder of an item so every holder of an item
+            # held more than once is also restored.
+            holder_index = self._holder_index
+            changed = set()
+            for i, item in enumerate(self.items):
+                location = values[location_start + i]
+                old_location = old[location_start + i]
+                if location != old_location \
+                        or values[position_start + i] \
+                        != old[position_start + i] \
+                        or len(item._holders) > 1:
+                    changed.add(location)
+                    changed.add(old_location)
+                    for holder in item._holders:
+                        held_at = holder_index.get(id(holder))
+                        if held_at is not None:
+                            changed.add(held_at)
+            changed.discard(NOT_HELD)
+
+        for location in changed:
+            holders[location].clear_inventory()
+
+        held = sorted((values[location_start + i],
+                       values[position_start + i], i)
+                      for i in range(n_items)
+                      if values[location_start + i] in changed)
+        for location, _, i in held:
+            holders[location].add_inventory(self.items[i])
+
+        actions = self.actions
+        actions_start = self._actions_start
+        for i, item in enumerate(self.items):
+            action_list = values[actions_start + i]
+            if old is None or old[actions_start + i] != action_list:
+                item.actions = [actions[a]
+                                for a in tables.action_lists[action_list]]
+
+        if world.journal is not None:
+            world.journal.clear()
+
+    def capture_changes(self, objects):
+        '''
+        Capture the values of the state that depend on some objects, e.g.
+        those changed by a turn.  Takes time proportional to the objects
+        (and the items they hold), not the size of the world.
+
+        Params:
+        ------
+        objects: iterable
+            The world, its Players, Rooms and InventoryItems.  Other
+            objects are ignored.
+
+        Returns:
+        -------
+        dict
+            {index: value} of the values of `capture()` that depend on the
+            objects.
+        '''
+        self._check_players()
+        world = self.world
+        tables = self.tables
+        rooms = self.rooms
+        room_index = self._room_index
+        holder_index = self._holder_index
+        item_index = self._item_index
+        n_rooms = len(rooms)
+
+        values = {}
+        changed_items = set()
+        for obj in objects:
+            if obj is world:
+                values[1] = int(world.active)
+                values[2] = world.n_actions
+                values[3] = tables.string_id(world.game_over_message)
+                continue
+            location = holder_index.get(id(obj))
+            if location is None:
+                if isinstance(obj, InventoryItem):
+                    i = item_index.get(obj.item_id)
+                    if i is not None and self.items[i] is obj:
+                        changed_items.add(i)
+                continue
+
+            if location == PLAYER or location > n_rooms:
+                # a Player
+                index = 0 if location == PLAYER \
+                    else self._players_start + location - n_rooms - 1
+                values[index] = room_index.get(id(obj.current_room), -1)
+            else:
+                i = location - 1
+                values[self._desc_start + i] = \
+                    tables.string_id(obj.description)
+                values[self._exits_start + i] = tables.exits_id(tuple(
+                    [(direction, room_index[id(target)])
+                     for direction, target in obj.exits.items()]))
+                word = i // BITMAP_WORD_SIZE
+                values[self._visited_start + word] = self._visited_word(word)
+            for item_id in obj._items:
+                i = item_index.get(item_id)
+                if i is not None:
+                    changed_items.add(i)
+
+        for i in changed_items:
+            item = self.items[i]
+            location, position = self._item_location(item)
+            values[self._location_start + i] = location
+            values[self._position_start + i] = position
+            item_actions = item._actions
+            action_list = self._action_list_ids.get(item_actions)
+            if action_list is None:
+                action_list = self._action_list_ids[item_actions] = \
+                    self._action_list_id(item_actions)
+            values[self._actions_start + i] = action_list
+        return values
+
+    def restore_changes(self, values, indices):
+        '''
+        Restore some values of a state.  Takes time proportional to the
+        number of indices (and the items of the holders they change).
+
+        Params:
+        ------
+        values: sequence of int
+            The state to restore: values[index] is the value at any index
+            (e.g. an array or a view of an overlay on a state).
+
+        indices: iterable of int
+            The indices whose values differ from the world's current state.
+        '''
+        self._check_players()
+        world = self.world
+        tables = self.tables
+        rooms = self.rooms
+        players = self.players
+        n_items = len(self.items)
+        desc_start = self._desc_start
+        exits_start = self._exits_start
+        visited_start = self._visited_start
+        location_start = self._location_start
+        actions_start = self._actions_start
+        players_start = self._players_start
+
+        moved = set()
+        for index in indices:
+            value = values[index]
+            if index < desc_start:
+                if index == 0:
+                    if value >= 0:
+                        players[0].current_room = rooms[value]
+                elif index == 1:
+                    world.active = bool(value)
+                elif index == 2:
+                    world.n_actions = value
+                else:
+                    world.game_over_message = tables.strings[value]
+            elif index < exits_start:
+                rooms[index - desc_start].description = tables.strings[value]
+            elif index < visited_start:
+                rooms[index - exits_start].exits = {
+                    direction: rooms[target]
+                    for direction, target in tables.exits[value]}
+            elif index < location_start:
+                first = (index - visited_start) * BITMAP_WORD_SIZE
+                for bit, room in enumerate(
+                        rooms[first:first + BITMAP_WORD_SIZE]):
+                    room.visited = bool(value >> bit & 1)
+            elif index < actions_start:
+                # location or position
+                moved.add((index - location_start) % n_items)
+            elif index < players_start:
+                item = self.items[index - actions_start]
+                item.actions = [self.actions[a]
+                                for a in tables.action_lists[value]]
+            elif value >= 0:
+                players[index - players_start + 1].current_room = \
+                    rooms[value]
+
+        # take the moved items out and put them back in position order:
+        # items that did not move hold the other positions.
+        held = []
+        for i in moved:
+            item = self.items[i]
+            target = (values[location_start + i],
+                      values[self._position_start + i])
+            if self._item_location(item) == target:
+                continue
+            for holder in item._holders:
+                holder.remove_inventory(item)
+            if target[0] != NOT_HELD:
+                held.append((target, i))
+        holders = self._holders
+        for (location, position), i in sorted(held):
+            holders[location].add_inventory(self.items[i], position)
+
+    def _visited_word(self, word):
+        '''
+        The value of a word of the visited bitmap.
+        '''
+        value = 0
+        first = word * BITMAP_WORD_SIZE
+        rooms = self.rooms[first:first + BITMAP_WORD_SIZE]
+        for bit, room in enumerate(rooms):
+            if room.visited:
+                value |= 1 << bit
+        return value
+
+    def _item_location(self, item):
+        '''
+        The (location, position) of an item: its first holder (see PLAYER).
+        '''
+        holder_index = self._holder_index
+        locations = [holder_index[id(holder)] for holder in item._holders
+                     if id(holder) in holder_index]
+        if not locations:
+            return NOT_HELD, 0
+        location = min(locations)
+        return location, \
+            list(self._holders[location]._items).index(item.item_id)
+
+
+def save_state(world, file, codec=None):
+    '''
+    Save the dynamic state of a TextWorld to a compact binary file.
+
+    Params:
+    ------
+    world: TextWorld
+        The game to save.
+
+    file: str, path or binary file object
+        Where to save the state.
+
+    codec: StateCodec, optional (default=None)
+        A codec for `world`.  If None a codec is created.  Reuse one when
+        saving repeatedly.
+    '''
+    if codec is None:
+        codec = StateCodec(world)
+    codec.save(file)
+
+
+def load_state(world, file, codec=None):
+    '''
+    Restore a TextWorld to a state saved with `save_state()`.  The world
+    must be built from the same game definition as the saved game: the save
+    holds a fingerprint of the game's rooms, items and actions that must
+    match the world's.
+
+    Params:
+    ------
+    world: TextWorld
+        The game to restore.  Build it with the game's `load_adventure()`
+        (or a WorldTemplate clone) before loading.
+
+    file: str, path or binary file object
+        The saved state.
+
+    codec: StateCodec, optional (default=None)
+        A codec for `world`.  If None a codec is created.
+
+    Raises:
+    ------
+    ValueError
+        If file is not a saved state or was saved from a different game.
+    '''
+    if codec is None:
+        codec = StateCodec(world)
+    codec.load(file)
+
+
+def _write(file, data):
+    if hasattr(file, 'write'):
+        file.write(data)
+    else:
+        with open(file, 'wb') as f:
+            f.write(data)
+
+
+def _read(file):
+    if hasattr(file, 'read'):
+        return file.read()
+    with open(file, 'rb') as f:
+        return f.read()
+
+
+def _enumerate(world, items=None):
+    '''
+    Enumerate the Rooms, InventoryItems and actions reachable from a world.
+    Rooms are listed in the order of world.rooms followed by any other
+    reachable rooms.  Items are listed in item_id (creation) order so their
+    order does not depend on where they are held.  Traversal follows
+    attribute and container order so the same game definition is always
+    enumerated in the same order.
+
+    Items that play has made unreachable (e.g. consumed by an action) are
+    missed: use TextWorld.game_definition(), which enumerates the world
+    before it is played.
+
+    Params:
+    ------
+    world: TextWorld
+
+    items: list of InventoryItem, optional (default=None)
+        Items to list first, in this order (e.g. the items of a world store
+        in world file order).  Other items reached are listed after them.
+
+    Returns:
+    -------
+    tuple (rooms, items, actions)
+    '''
+    rooms = list(world.rooms)
+    first = [] if items is None else list(items)
+    items = []
+    actions = []
+    room_ids = {id(room) for room in rooms}
+    seen = {id(world)} | room_ids | {id(item) for item in first}
+
+    to_visit = [world] + rooms + first
+    to_visit.reverse()
+    while to_visit:
+        obj = to_visit.pop()
+        if isinstance(obj, (InventoryHolder, InventoryItem, Command,
+                            InventoryItemAction)):
+            if isinstance(obj, Room):
+                if id(obj) not in room_ids:
+                    room_ids.add(id(obj))
+                    rooms.append(obj)
+            elif isinstance(obj, InventoryItem):
+                items.append(obj)
+            elif isinstance(obj, InventoryItemAction):
+                actions.append(obj)
+            children = list(instance_attributes(obj).values())
+        elif isinstance(obj, (list, tuple)):
+            children = list(obj)
+        elif isinstance(obj, dict):
+            children = list(obj.values())
+        else:
+            continue
+
+        # push in reverse so children are visited in order.
+        for child in reversed(children):
+            if isinstance(child, (str, int, float, bool, type(None))):
+                continue
+            if id(child) not in seen:
+                if isinstance(child, (InventoryHolder, InventoryItem,
+                                      Command, InventoryItemAction)):
+                    seen.add(id(child))
+                to_visit.append(child)
+
+    listed = {id(item) for item in first}
+    items = first + sorted((item for item in items
+                            if id(item) not in listed),
+                           key=lambda item: item.item_id)
+    return rooms, items, actions
+
+
+def _fingerprint(rooms, items, actions):
+    '''
+    A digest of the names of the rooms and items and the kind and verb of
+    the actions of a game definition (in enumeration order).
+    '''
+    digest = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+    for names in ([room.name for room in rooms],
+                  [item.name for item in items],
+                  [f'{type(action).__name__} {action.command_text}'
+                   for action in actions]):
+        digest.update('\0'.join(names).encode('utf-8'))
+        digest.update(b'\1')
+    return digest.digest()
@@ -0,0 +1,636 @@
+'''
+On disk world stores
+
+A TextWorld built by `load_adventure()` or `load_world()` creates every
+Room, InventoryItem and action up front, so start up time and memory grow
+with the size of the world.  A world store holds a world file (see
+worldfile.py) in an SQLite database with one row per room, item and named
+action.  A world opened from a store starts with no rooms in memory: a room
+is loaded from its row when one of its attributes is first read (e.g. when
+the player enters it) and its items and their actions are loaded with it.
+Rooms and items that are referenced but not yet needed (e.g. the targets of
+the exits of a loaded room) are small placeholders.
+
+At most max_resident loaded rooms are kept.  When more are loaded the least
+recently used rooms are unloaded and loaded again from the store if they
+are needed.  Only rooms that have not changed since they were loaded are
+unloaded: a changed room (e.g. an item was taken or an exit added) stays in
+memory for the rest of the game, so memory grows with what the player has
+changed rather than with the size of the world.
+
+Usage:
+------
+create_store(dump_world(mini_knightmare.load_adventure()), 'knightmare.db')
+adventure = open_world('knightmare.db')
+
+Classes:
+--------
+
+WorldStore: the rooms, items and actions of a world file in SQLite.
+
+StoredWorld: a TextWorld whose rooms are loaded from a WorldStore.
+
+StoredRoom: a Room loaded from a WorldStore when first used.
+
+StoredItem: an InventoryItem loaded from a WorldStore when first used.
+
+Functions:
+---------
+
+create_store: write a world file to a world store.
+
+open_world: open the TextWorld held in a world store.
+'''
+
+import json
+import os
+import sqlite3
+import weakref
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from sys import intern
+
+from .state import _enumerate
+from .world import (
+    InventoryItem,
+    Room,
+    TextWorld,
+    _ITEM_IDS,
+    _slot_names)
+from .worldfile import (
+    FORMAT_VERSION,
+    PLAYER,
+    WORLD_KEYS,
+    WorldFileError,
+    _WorldCompiler,
+    _check_keys,
+    _item_fields,
+    _list,
+    _mapping,
+    _room_fields)
+
+################# CONSTANTS ###################################################
+STORE_VERSION = 1
+
+# loaded rooms kept in memory (see WorldStore)
+DEFAULT_MAX_RESIDENT = 256
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE rooms (n INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE,
+                    spec TEXT NOT NULL);
+CREATE TABLE items (id TEXT PRIMARY KEY, spec TEXT NOT NULL);
+CREATE TABLE actions (name TEXT PRIMARY KEY, spec TEXT NOT NULL);
+'''
+
+# world file keys held in the rows of the rooms, items and actions tables.
+TABLE_KEYS = {'rooms', 'items', 'actions'}
+
+# slots set when a room is loaded and cleared when it is unloaded.
+ROOM_STATE = tuple(name for name in _slot_names(Room) if name != '_routing')
+
+
+def create_store(spec, path):
+    '''
+    Write a world file to a world store.  The world file is checked (as
+    far as possible without building it) and each room, item and named
+    action is written as a row.  Errors in a room or item are reported
+    when the room or item is loaded.
+
+    Convert a game written in Python with
+    `create_store(dump_world(world), path)`.
+
+    Params:
+    ------
+    spec: dict
+        A parsed world file.
+
+    path: str or path
+        The store (an SQLite database).  Replaced if it exists.
+
+    Raises:
+    ------
+    WorldFileError
+        If the world file is invalid.
+    '''
+    _check_keys(spec, WORLD_KEYS, 'world', required={'name', 'rooms'})
+    version = spec.get('format_version', FORMAT_VERSION)
+    if version != FORMAT_VERSION:
+        raise WorldFileError('format_version',
+                             f'unsupported version {version!r}')
+
+    rooms = _mapping(spec['rooms'], 'rooms')
+    if not rooms:
+        raise WorldFileError('rooms', 'at least one room is required')
+    items = _mapping(spec.get('items', {}), 'items')
+    named_actions = _mapping(spec.get('actions', {}), 'actions')
+    start = spec.get('start', next(iter(rooms)))
+    if start not in rooms:
+        raise WorldFileError('start', f'unknown room {start!r}')
+
+    header = {key: value for key, value in spec.items()
+              if key not in TABLE_KEYS}
+    header['start'] = start
+
+    # written to a temporary file so that a failed write does not leave a
+    # partial store.
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    conn = sqlite3.connect(tmp_path)
+    try:
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                'INSERT INTO meta VALUES (?, ?)',
+                [('version', json.dumps(STORE_VERSION)),
+                 ('world', json.dumps(header)),
+                 ('n_rooms', json.dumps(len(rooms)))])
+            conn.executemany(
+                'INSERT INTO rooms VALUES (?, ?, ?)',
+                ((n, room_id, json.dumps(room_spec))
+                 for n, (room_id, room_spec) in enumerate(rooms.items())))
+            conn.executemany(
+                'INSERT INTO items VALUES (?, ?)',
+                ((item_id, json.dumps(item_spec)) for item_id, item_spec
+                 in items.items()))
+            conn.executemany(
+                'INSERT INTO actions VALUES (?, ?)',
+                ((name, json.dumps(action_spec)) for name, action_spec
+                 in named_actions.items()))
+        conn.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+
+
+def open_world(path, max_resident=DEFAULT_MAX_RESIDENT, renderer=None):
+    '''
+    Open the TextWorld held in a world store.  Takes the same time and
+    memory whatever the size of the world.  Each call returns a new game
+    with its own WorldStore (world.store).
+
+    Params:
+    ------
+    path: str or path
+        A store written by create_store.
+
+    max_resident: int, optional (default=DEFAULT_MAX_RESIDENT)
+        Number of unchanged loaded rooms kept in memory.
+
+    renderer: None or Renderer, optional (default=None)
+        See TextWorld.
+
+    Returns:
+    -------
+    StoredWorld
+    '''
+    return StoredWorld(WorldStore(path, max_resident), renderer)
+
+
+class StoredRoom(Room):
+    '''
+    A Room loaded from a WorldStore when one of its attributes is first
+    read.  An unloaded room only holds its id in the store.
+    '''
+    __slots__ = ('store_id', '_store', '__weakref__')
+
+    def __init__(self, store, store_id):
+        # Room.__init__ is called by WorldStore when the room is loaded.
+        self.store_id = store_id
+        self._store = store
+        self._routing = None
+
+    def __repr__(self):
+        if not self._store._is_loaded(self):
+            return f"StoredRoom(store_id='{self.store_id}', loaded=False)"
+        return super().__repr__()
+
+    def __getattr__(self, attr):
+        # only called when attr is not set i.e. the room is not loaded.
+        if attr.startswith('__') or self._store._is_loaded(self):
+            raise AttributeError(attr)
+        self._store._load_room(self)
+        return object.__getattribute__(self, attr)
+
+
+class StoredItem(InventoryItem):
+    '''
+    An InventoryItem loaded from a WorldStore when one of its attributes
+    (other than item_id) is first read.
+    '''
+    __slots__ = ('store_id', '_store', '__weakref__')
+
+    def __init__(self, store, store_id):
+        # InventoryItem.__init__ is called by WorldStore when the item is
+        # loaded.  item_id is set now so the item can be compared and
+        # hashed without loading it.
+        self.item_id = next(_ITEM_IDS)
+        self.store_id = store_id
+        self._store = store
+
+    def __getattr__(self, attr):
+        if attr.startswith('__') or self._store._is_loaded(self):
+            raise AttributeError(attr)
+        self._store._load_item(self)
+        return object.__getattribute__(self, attr)
+
+
+class _SpecTable:
+    '''
+    Read only mapping of the specs held in a table of a store
+    e.g. named actions.
+    '''
+    def __init__(self, conn, table, key):
+        self._conn = conn
+        self._query = f'SELECT spec FROM {table} WHERE {key} = ?'
+
+    def __contains__(self, key):
+        return self._row(key) is not None
+
+    def __getitem__(self, key):
+        row = self._row(key)
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __iter__(self):
+        # named actions are validated when they are used, not up front.
+        return iter(())
+
+    def _row(self, key):
+        if not isinstance(key, str):
+            return None
+        return self._conn.execute(self._query, (key,)).fetchone()
+
+
+class _StoreCompiler(_WorldCompiler):
+    '''
+    Builds the actions and commands of rooms and items loaded from a
+    WorldStore.  Rooms and items they reference are returned unloaded.
+    '''
+    def __init__(self, store, header):
+        super().__init__(header)
+        self.store = store
+        self.action_specs = _SpecTable(store._conn, 'actions', 'name')
+
+    def _room(self, room_id, location):
+        return self.store._room(room_id, location)
+
+    def _item(self, item_id, location):
+        return self.store._item(item_id, location)
+
+    def _holder(self, holder_id, location):
+        if holder_id == PLAYER:
+            return self.world
+        try:
+            return self.store._room(holder_id, location)
+        except WorldFileError:
+            raise WorldFileError(location,
+                                 f"unknown holder {holder_id!r} (expected "
+                                 + "'player' or a room)")
+
+
+class WorldStore:
+    '''
+    The rooms, items and actions of a world file held in SQLite.  Loads
+    rooms and items as the game uses them and unloads the least recently
+    used unchanged rooms to keep at most max_resident loaded.
+
+    A room is loaded once however many objects reference it: the store
+    returns the same StoredRoom (and StoredItem) while any object holds it.
+    '''
+    def __init__(self, path, max_resident=DEFAULT_MAX_RESIDENT):
+        '''
+        Params:
+        ------
+        path: str or path
+            A store written by create_store.
+
+        max_resident: int, optional (default=DEFAULT_MAX_RESIDENT)
+            Number of unchanged loaded rooms kept in memory.
+        '''
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self.max_resident = max_resident
+        # read only: the game state is held in memory.
+        self._conn = sqlite3.connect(
+            f'{Path(path).resolve().as_uri()}?mode=ro', uri=True)
+        meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+        if json.loads(meta.get('version', 'null')) != STORE_VERSION:
+            self._conn.close()
+            raise ValueError(f'{path} is not a world store')
+        self.header = json.loads(meta['world'])
+        self.n_rooms = json.loads(meta['n_rooms'])
+        self.world = None
+        self._compiler = _StoreCompiler(self, self.header)
+
+        # store id -> StoredRoom / StoredItem while any object holds it.
+        self._rooms = weakref.WeakValueDictionary()
+        self._items = weakref.WeakValueDictionary()
+        # store id -> (room, state when loaded).  Least recently used
+        # first.
+        self._resident = OrderedDict()
+        # store id -> room.  Changed rooms that are never unloaded.
+        self._pinned = {}
+        # ids of the unloaded rooms that the player has visited.
+        self._visited = set()
+
+    def __repr__(self):
+        return f"WorldStore(path='{self.path}', n_rooms={self.n_rooms}, " \
+            + f'n_resident={len(self._resident)}, ' \
+            + f'n_pinned={len(self._pinned)})'
+
+    @property
+    def n_loaded(self):
+        '''
+        Number of rooms in memory (unchanged and changed).
+        '''
+        return len(self._resident) + len(self._pinned)
+
+    def close(self):
+        '''
+        Close the database.  Rooms and items that are not loaded can no
+        longer be used.
+        '''
+        self._conn.close()
+
+    def room_at(self, n):
+        '''
+        The nth room of the world file (unloaded if it is not in use).
+        '''
+        row = self._conn.execute('SELECT id FROM rooms WHERE n = ?',
+                                 (n,)).fetchone()
+        if row is None:
+            raise IndexError(n)
+        return self._room(row[0], f'rooms[{n}]')
+
+    def room_ids(self):
+        '''
+        Iterate over the ids of the rooms in world file order.
+        '''
+        for (room_id,) in self._conn.execute(
+                'SELECT id FROM rooms ORDER BY n'):
+            yield room_id
+
+    def item_ids(self):
+        '''
+        Iterate over the ids of the items in world file order.
+        '''
+        for (item_id,) in self._conn.execute(
+                'SELECT id FROM items ORDER BY rowid'):
+            yield item_id
+
+    def _room_number(self, room_id):
+        row = self._conn.execute('SELECT n FROM rooms WHERE id = ?',
+                                 (room_id,)).fetchone()
+        if row is None:
+            raise WorldFileError('start', f'unknown room {room_id!r}')
+        return row[0]
+
+    def _room(self, room_id, location):
+        '''
+        The StoredRoom of a room id.
+        '''
+        room = self._rooms.get(room_id)
+        if room is None:
+            if self._spec('rooms', room_id) is None:
+                raise WorldFileError(location, f'unknown room {room_id!r}')
+            room = self._rooms[room_id] = StoredRoom(self, room_id)
+        return room
+
+    def _item(self, item_id, location):
+        '''
+        The StoredItem of an item id.
+        '''
+        item = self._items.get(item_id)
+        if item is None:
+            if self._spec('items', item_id) is None:
+                raise WorldFileError(location, f'unknown item {item_id!r}')
+            item = self._items[item_id] = StoredItem(self, item_id)
+        return item
+
+    def _spec(self, table, store_id):
+        '''
+        The parsed spec of a room or item.  None if there is no such row.
+        '''
+        if not isinstance(store_id, str):
+            return None
+        row = self._conn.execute(f'SELECT spec FROM {table} WHERE id = ?',
+                                 (store_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _is_loaded(self, obj):
+        # name is the first attribute set when a room or item is loaded.
+        try:
+            object.__getattribute__(obj, 'name')
+        except AttributeError:
+            return False
+        return True
+
+    def _load_room(self, room):
+        '''
+        Load a room, its items and their actions from the store.
+        '''
+        room_id = room.store_id
+        spec = self._spec('rooms', room_id)
+        location = f'rooms.{room_id}'
+        name, first_enter_msg, description = _room_fields(room_id, spec)
+        routing = room._routing
+        try:
+            Room.__init__(room, name, first_enter_msg)
+            room._routing = routing
+            room.description = description
+            room.visited = room_id in self._visited
+            exits = _mapping(spec.get('exits', {}), f'{location}.exits')
+            if exits:
+                # set directly: the exits are not a change to the game.
+                room._exits = {
+                    intern(direction): self._room(
+                        target, f'{location}.exits.{direction}')
+                    for direction, target in exits.items()}
+            self._compiler._add_items(room, spec, location)
+        except BaseException:
+            _clear(room, ROOM_STATE)
+            raise
+
+        self._resident[room_id] = (room, _room_state(room))
+        self._unload_rooms(room)
+
+    def _load_item(self, item):
+        '''
+        Load an item and its actions from the store.
+        '''
+        item_id = item.store_id
+        spec = self._spec('items', item_id)
+        name, fixed, background, long_description, aliases = \
+            _item_fields(item_id, spec)
+        location = f'items.{item_id}.actions'
+        key = item.item_id
+        try:
+            InventoryItem.__init__(item, name, fixed=fixed,
+                                   background=background)
+            item.item_id = key
+            item.long_description = long_description
+            for alias in aliases:
+                item.add_alias(alias)
+            for i, action in enumerate(_list(spec.get('actions', []),
+                                             location)):
+                item.add_action(
+                    self._compiler._action(action, f'{location}[{i}]'))
+        except BaseException:
+            _clear(item, _slot_names(InventoryItem)[1:])
+            raise
+
+    def _touch(self, room):
+        '''
+        Mark a loaded room as the most recently used.
+        '''
+        if getattr(room, '_store', None) is self \
+                and room.store_id in self._resident:
+            self._resident.move_to_end(room.store_id)
+
+    def _unload_rooms(self, loaded):
+        '''
+        Unload least recently used rooms until at most max_resident are
+        loaded.  Rooms that changed since they were loaded are pinned
+        instead.  The rooms players are in and the room just loaded are
+        kept.
+        '''
+        resident = self._resident
+        occupied = set() if self.world is None \
+            else {id(player.current_room)
+                  for player in self.world.players.values()}
+        kept = []
+        while len(resident) > self.max_resident:
+            room_id, (room, state) = resident.popitem(last=False)
+            if id(room) in occupied or room is loaded:
+                kept.append((room_id, (room, state)))
+            elif _room_state(room) == state:
+                self._unload(room)
+            else:
+                self._pinned[room_id] = room
+        for room_id, entry in reversed(kept):
+            resident[room_id] = entry
+            resident.move_to_end(room_id, last=False)
+
+    def _unload(self, room):
+        if room.visited:
+            self._visited.add(room.store_id)
+        for item in room._items.values():
+            item._holders = tuple(holder for holder in item._holders
+                                  if holder is not room)
+        _clear(room, ROOM_STATE)
+
+
+class _StoredRooms(Sequence):
+    '''
+    TextWorld.rooms of a StoredWorld.  Rooms are looked up in the store
+    when indexed so the list is never held in memory.
+    '''
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return self._store.n_rooms
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self._store.room_at(index)
+
+    def __iter__(self):
+        for room_id in self._store.room_ids():
+            yield self._store._room(room_id, 'rooms')
+
+    def __repr__(self):
+        return f'<{len(self)} stored rooms>'
+
+
+class StoredWorld(TextWorld):
+    '''
+    A TextWorld whose rooms, items and actions are loaded from a
+    WorldStore as they are used.  Create with open_world().
+
+    rooms is a read only sequence: iterating over it loads every room.
+    '''
+    def __init__(self, store, renderer=None):
+        '''
+        Params:
+        ------
+        store: WorldStore
+
+        renderer: None or Renderer, optional (default=None)
+            See TextWorld.
+        '''
+        self.store = store
+        compiler = store._compiler
+        super().__init__(
+            rooms=_StoredRooms(store),
+            start_index=store._room_number(store.header['start']),
+            renderer=renderer,
+            **compiler._world_options())
+        compiler._set_messages(self)
+        compiler.world = self
+        store.world = self
+
+        player = _mapping(store.header.get('player', {}), 'player')
+        _check_keys(player, {'items'}, 'player')
+        compiler._add_items(self, player, 'player')
+
+    def game_definition(self):
+        '''
+        The rooms and items of the store (in world file order) and their
+        actions.  Read from the store so play does not change it.  Loads
+        every room and item.
+
+        Returns:
+        -------
+        tuple (rooms, items, actions)
+        '''
+        if not self._definition:
+            store = self.store
+            items = [store._item(item_id, 'items')
+                     for item_id in store.item_ids()]
+            self._definition = _enumerate(self, items)
+        return self._definition
+
+    def _record_definition(self):
+        # the store holds the definition: nothing needs recording before
+        # play (an empty definition is read by game_definition).
+        self._definition = ()
+
+    @property
+    def current_room(self):
+        return self.player.current_room
+
+    @current_room.setter
+    def current_room(self, room):
+        self.player.current_room = room
+        self.store._touch(room)
+
+
+def _room_state(room):
+    '''
+    The parts of a loaded room that the game can change.  A room is
+    unchanged if this is equal to its state when loaded.
+    '''
+    return (room.name, room.first_enter_msg, room.description,
+            tuple(room._exits.items()),
+            tuple((item, item.aliases, item._actions)
+                  for item in room._items.values()))
+
+
+def _clear(obj, names):
+    '''
+    Unset slots of a room or item (so that they are loaded again).
+    '''
+    for name in names:
+        try:
+            object.__delattr__(obj, name)
+        except AttributeError:
+            pass
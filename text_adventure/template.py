@@ -0,0 +1,280 @@
+'''
+World templates
+
+Building a game with `load_adventure()` creates every Room, InventoryItem,
+action and command from scratch.  A WorldTemplate records the object graph
+of a built TextWorld once and compiles it into a function that produces
+independent copies much faster than rebuilding the game or using
+`copy.deepcopy`.
+
+Copies share immutable content (e.g. description strings) with the
+template.  Rooms, items and the TextWorld itself, any actions or commands
+that reference them and the containers that hold them are new objects with
+all cross-references rewired to the copy.  Actions and commands that do not
+reference game state (e.g. a NullCommand) are never modified during play
+and are shared by all copies.
+
+Classes:
+--------
+
+WorldTemplate: a snapshot of a TextWorld that can be cloned.
+'''
+
+from types import MethodType
+
+from .actions import InventoryItemAction
+from .commands import Command
+from .journal import Journal
+from .render import Renderer
+from .routing import RoutingIndex
+from .world import (
+    InventoryHolder,
+    InventoryItem,
+    instance_attributes,
+    slot_attributes)
+
+# engine classes.  Instances (and instances of subclasses) are either copied
+# or shared with the template.
+COPIED_TYPES = (Command, InventoryItemAction, InventoryHolder, InventoryItem,
+                Renderer)
+
+# game state: always copied.  Other engine objects are only copied if they
+# reference game state.
+STATE_TYPES = (InventoryHolder, InventoryItem)
+
+# values of these types can be written into the compiled code as literals.
+LITERAL_TYPES = (str, int, bool, type(None))
+
+
+class WorldTemplate:
+    '''
+    A snapshot of a built TextWorld that can be cloned cheaply.
+
+    Example:
+    -------
+    template = WorldTemplate(mini_knightmare.load_adventure())
+    adventure = template.clone()
+    '''
+    def __init__(self, world):
+        '''
+        Params:
+        ------
+        world: TextWorld
+            The built game to use as a template.  The template is a
+            snapshot: later changes to `world` are not reflected in clones.
+        '''
+        self.name = world.name
+        # recorded now so clones copy it rather than enumerating the game
+        # before their first action.
+        world.game_definition()
+
+        # id(obj) -> node name in the compiled code
+        self._nodes = {}
+        # objects referenced by the compiled code (classes, shared values)
+        self._namespace = {'MethodType': MethodType, 'new': object.__new__}
+        self._classes = {}
+        self._new_lines = []
+        self._attr_lines = []
+
+        self._copied = self._find_copied(world)
+        root = self._expression(world)
+        self.n_objects = len(self._nodes)
+        self._clone = self._compile(root)
+
+        # only needed while compiling.
+        del self._nodes, self._classes, self._new_lines, self._attr_lines
+        del self._copied
+
+    def __repr__(self):
+        return f"WorldTemplate(name='{self.name}', " \
+            + f"n_objects={self.n_objects})"
+
+    @classmethod
+    def from_loader(cls, load_adventure):
+        '''
+        Create a template from a game's `load_adventure` function.
+        '''
+        return cls(load_adventure())
+
+    def clone(self):
+        '''
+        Create a new independent TextWorld from the template.
+
+        Returns:
+        -------
+        TextWorld
+        '''
+        return self._clone()
+
+    def _compile(self, root):
+        '''
+        Generate and compile the straight line function that builds a clone.
+        Shared values are bound as default arguments so that the function
+        only reads local variables.
+        '''
+        body = self._new_lines + self._attr_lines + [f'return {root}']
+        params = ', '.join(f'{name}={name}' for name in self._namespace)
+        source = f'def clone({params}):\n' \
+            + '\n'.join('    ' + line for line in body)
+        exec(compile(source, f'<WorldTemplate {self.name}>', 'exec'),
+             self._namespace)
+        return self._namespace.pop('clone')
+
+    def _find_copied(self, world):
+        '''
+        Return the ids of the engine objects that must be copied: game
+        state plus any object that (directly or indirectly) references it.
+        '''
+        # id(obj) -> ids of the engine objects that reference obj
+        referenced_by = {id(world): []}
+        state = []
+        to_visit = [world]
+        while to_visit:
+            obj = to_visit.pop()
+            if isinstance(obj, STATE_TYPES):
+                state.append(id(obj))
+
+            for ref in _engine_references(
+                    instance_attributes(obj).values()):
+                if id(ref) not in referenced_by:
+                    referenced_by[id(ref)] = []
+                    to_visit.append(ref)
+                referenced_by[id(ref)].append(id(obj))
+
+        copied = set()
+        while state:
+            key = state.pop()
+            if key not in copied:
+                copied.add(key)
+                state.extend(referenced_by[key])
+        return copied
+
+    def _shared(self, value):
+        '''
+        Name of a value shared between the template and all clones.
+        '''
+        name = f'k{len(self._namespace)}'
+        self._namespace[name] = value
+        return name
+
+    def _expression(self, value):
+        '''
+        Return the source code of an expression that builds `value` for a
+        clone.
+        '''
+        if type(value) in LITERAL_TYPES:
+            return repr(value)
+
+        if isinstance(value, COPIED_TYPES):
+            if id(value) in self._copied:
+                return self._node(value)
+            return self._shared(value)
+
+        if type(value) is list:
+            return '[' + ', '.join(self._expression(v) for v in value) + ']'
+
+        if type(value) is dict:
+            items = (f'{self._key(k)}: {self._expression(v)}'
+                     for k, v in value.items())
+            return '{' + ', '.join(items) + '}'
+
+        if type(value) is tuple:
+            items = ''.join(self._expression(v) + ', ' for v in value)
+            return '(' + items + ')'
+
+        if type(value) is set:
+            if not value:
+                return 'set()'
+            return '{' + ', '.join(self._expression(v) for v in value) + '}'
+
+        if type(value) is Journal:
+            # a clone starts with an empty undo history.
+            return f'{self._class(Journal)}({value.limit!r})'
+
+        if type(value) is RoutingIndex:
+            return self._routing_node(value)
+
+        if isinstance(value, MethodType) \
+                and id(value.__self__) in self._copied:
+            # e.g. the TextWorld command creators held in legal_verbs.
+            func = self._shared(value.__func__)
+            return f'MethodType({func}, {self._node(value.__self__)})'
+
+        # anything else (floats, functions, modules, streams...) is shared.
+        return self._shared(value)
+
+    def _class(self, cls):
+        '''
+        Name of a class in the compiled code.
+        '''
+        if cls not in self._classes:
+            self._classes[cls] = self._shared(cls)
+        return self._classes[cls]
+
+    def _key(self, key):
+        if type(key) in LITERAL_TYPES:
+            return repr(key)
+        return self._shared(key)
+
+    def _node(self, obj):
+        '''
+        Name of the variable holding the clone of an engine object.  The
+        object is created at the start of the compiled function and its
+        attributes are set once all objects exist, so cycles (e.g. a Room
+        whose items hold commands that reference the Room) are rewired.
+        '''
+        key = id(obj)
+        if key in self._nodes:
+            return self._nodes[key]
+
+        name = f'n{len(self._nodes)}'
+        self._nodes[key] = name
+        self._new_lines.append(f'{name} = new({self._class(type(obj))})')
+
+        # slotted attributes are set one at a time, any others by replacing
+        # the __dict__.
+        for attr, value in slot_attributes(obj).items():
+            self._attr_lines.append(
+                f'{name}.{attr} = {self._expression(value)}')
+        if hasattr(obj, '__dict__'):
+            attrs = ', '.join(f'{attr!r}: {self._expression(value)}'
+                              for attr, value in vars(obj).items())
+            self._attr_lines.append(f'{name}.__dict__ = {{{attrs}}}')
+        return name
+
+    def _routing_node(self, index):
+        '''
+        Name of the variable holding a clone's RoutingIndex.  The world and
+        its rooms share one new index, built on first use by the clone.
+        '''
+        key = id(index)
+        if key in self._nodes:
+            return self._nodes[key]
+
+        name = f'n{len(self._nodes)}'
+        self._nodes[key] = name
+        self._new_lines.append(f'{name} = new({self._class(RoutingIndex)})')
+        self._attr_lines.append(
+            f'{name}.__init__({self._node(index.world)}, '
+            + f'{index.cache_size!r})')
+        return name
+
+
+def _engine_references(values):
+    '''
+    Return the engine objects referenced by values, looking inside
+    containers and bound methods.
+    '''
+    found = []
+    to_visit = list(values)
+    while to_visit:
+        value = to_visit.pop()
+        if isinstance(value, COPIED_TYPES):
+            found.append(value)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            to_visit.extend(value)
+        elif isinstance(value, dict):
+            to_visit.extend(value.values())
+        elif isinstance(value, MethodType):
+            to_visit.append(value.__self__)
+    return found
@@ -0,0 +1,468 @@
+'''
+Transcript regression testing
+
+A transcript is a recording of a game: the commands a player entered and
+the response to each.  Transcripts are stored as JSON files:
+
+{"format_version": 1,
+ "game": "mini_knightmare",
+ "steps": [{"command": "look", "response": "..."}, ...],
+ "active": true}
+
+`game` is the name of a game module (see `server.load_game_module`) or the
+path of a world file.  `active` records whether the game was still active
+after the last step (optional in older transcripts).
+
+`run_transcripts()` replays every transcript in a directory against a fresh
+world and reports the first step where the response differs from the
+recording or where the game ended in only one of them.  Transcripts are
+spread across a process pool.  Each world is built by the game's loader so
+that a bug in WorldTemplate cloning cannot hide a divergence.  With
+`use_template=True` (`--template`) each worker instead builds each game once
+as a WorldTemplate and replays transcripts on clones, which is faster.
+
+Usage:
+------
+python -m text_adventure.transcript record mini_knightmare walkthrough.txt \
+    -o transcripts/walkthrough.json
+python -m text_adventure.transcript run transcripts/ --workers 8
+python -m text_adventure.transcript run transcripts/ --template
+
+Classes:
+--------
+
+Divergence: the first step where a replay differs from its recording.
+
+TranscriptResult: the outcome of replaying one transcript.
+
+RunReport: the outcome of replaying a directory of transcripts.
+
+Functions:
+---------
+
+record_transcript: play commands in a game and record the responses.
+
+save_transcript: write a transcript to a JSON file.
+
+load_transcript: read a transcript from a JSON file.
+
+replay_transcript: replay a transcript and return the first divergence.
+
+find_transcripts: the transcript files in a directory.
+
+run_transcripts: replay every transcript in a directory.
+'''
+
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .template import WorldTemplate
+
+################# CONSTANTS ###################################################
+TRANSCRIPT_FORMAT_VERSION = 1
+TRANSCRIPT_SUFFIX = '.json'
+# transcripts sent to a worker in one task.
+DEFAULT_CHUNK_SIZE = 16
+
+# response in place of a step after (or instead of) the game ending.
+GAME_ENDED = None
+
+
+class Divergence:
+    '''
+    The first step where a replayed response differs from the recording.
+    '''
+    def __init__(self, step, command, expected, actual):
+        '''
+        Params:
+        ------
+        step: int
+            Index of the step (0 = first command)
+
+        command: str
+            The command entered at the step.
+
+        expected: str or None
+            Recorded response.  None if the recorded game ended at this
+            step and the replayed game did not.
+
+        actual: str or None
+            Replayed response.  None if the replayed game ended before this
+            step (or ended at this step and the recorded game did not).
+        '''
+        self.step = step
+        self.command = command
+        self.expected = expected
+        self.actual = actual
+
+    def __repr__(self):
+        return f'Divergence(step={self.step}, command={self.command!r})'
+
+    def diff(self):
+        '''
+        Unified diff of the expected and actual responses.
+
+        Returns:
+        -------
+        str
+        '''
+        expected = '(game ended)' if self.expected is None else self.expected
+        actual = '(game ended)' if self.actual is None else self.actual
+        return '\n'.join(difflib.unified_diff(
+            expected.splitlines(), actual.splitlines(),
+            'recorded', 'replayed', lineterm=''))
+
+
+class TranscriptResult:
+    '''
+    The outcome of replaying one transcript.
+    '''
+    def __init__(self, path, n_steps, divergence=None, error=None):
+        self.path = path
+        self.n_steps = n_steps
+        self.divergence = divergence
+        self.error = error
+
+    def __repr__(self):
+        return f"TranscriptResult(path='{self.path}', passed={self.passed})"
+
+    @property
+    def passed(self):
+        return self.divergence is None and self.error is None
+
+
+class RunReport:
+    '''
+    The outcome of replaying a directory of transcripts.
+    '''
+    def __init__(self, results, elapsed):
+        '''
+        Params:
+        ------
+        results: list of TranscriptResult
+            In path order.
+
+        elapsed: float
+            Seconds taken to replay the transcripts.
+        '''
+        self.results = results
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f'RunReport(n_transcripts={len(self.results)}, ' \
+            + f'n_failed={len(self.failures)})'
+
+    @property
+    def failures(self):
+        return [result for result in self.results if not result.passed]
+
+    @property
+    def passed(self):
+        return not self.failures
+
+    @property
+    def n_steps(self):
+        return sum(result.n_steps for result in self.results)
+
+    def summary(self):
+        '''
+        Human readable report of the failures and throughput.
+
+        Returns:
+        -------
+        str
+        '''
+        lines = []
+        for result in self.failures:
+            if result.error is not None:
+                lines.append(f'ERROR {result.path}\n{result.error}')
+                continue
+            divergence = result.divergence
+            lines.append(f'DIVERGED {result.path} at step '
+                         + f'{divergence.step + 1}: {divergence.command!r}')
+            lines.append(divergence.diff())
+
+        rate = self.n_steps / self.elapsed if self.elapsed > 0 else 0.0
+        lines.append(f'{len(self.results)} transcripts, '
+                     + f'{len(self.failures)} failed, {self.n_steps} steps '
+                     + f'in {self.elapsed:.2f}s ({rate:.0f} steps/s)')
+        return '\n'.join(lines)
+
+
+def record_transcript(game, commands, world=None, use_template=False):
+    '''
+    Play commands in a new game and record the responses.  Recording stops
+    if the game ends.
+
+    Params:
+    ------
+    game: str
+        Game module name or world file path.
+
+    commands: Iterable[str]
+        Commands to enter.
+
+    world: TextWorld, optional (default=None)
+        The world to play.  If None a new world is built from `game`.
+
+    use_template: bool, optional (default=False)
+        Build the new world by cloning a WorldTemplate of the game kept by
+        this process instead of calling the game's loader.
+
+    Returns:
+    -------
+    dict
+        The transcript.
+    '''
+    if world is None:
+        world = _new_world(game, use_template)
+    commands = list(commands)
+    responses = world.run_batch(commands).responses
+    return {'format_version': TRANSCRIPT_FORMAT_VERSION,
+            'game': game,
+            'steps': [{'command': command, 'response': response}
+                      for command, response in zip(commands, responses)],
+            'active': world.active}
+
+
+def save_transcript(transcript, path):
+    '''
+    Write a transcript to a JSON file.
+    '''
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(transcript, f, indent=1)
+
+
+def load_transcript(path):
+    '''
+    Read a transcript from a JSON file.
+
+    Raises:
+    ------
+    ValueError
+        If the file is not a transcript or uses an unsupported version.
+    '''
+    with open(path, encoding='utf-8') as f:
+        transcript = json.load(f)
+    if not isinstance(transcript, dict) or 'steps' not in transcript \
+            or 'game' not in transcript:
+        raise ValueError(f'{path} is not a transcript')
+    version = transcript.get('format_version')
+    if version != TRANSCRIPT_FORMAT_VERSION:
+        raise ValueError(f'{path}: unsupported transcript format version '
+                         + f'{version}')
+    return transcript
+
+
+def replay_transcript(transcript, world=None, use_template=False):
+    '''
+    Replay a transcript in a fresh world.
+
+    Params:
+    ------
+    transcript: dict
+        A transcript e.g. returned by `load_transcript()`.
+
+    world: TextWorld, optional (default=None)
+        A new world of the transcript's game.  If None one is built.
+
+    use_template: bool, optional (default=False)
+        Build the new world by cloning a WorldTemplate of the game kept by
+        this process instead of calling the game's loader.
+
+    Returns:
+    -------
+    Divergence or None
+        The first step that differs from the recording.  None if the replay
+        matches.
+    '''
+    if world is None:
+        world = _new_world(transcript['game'], use_template)
+    steps = transcript['steps']
+    responses = world.run_batch([step['command'] for step in steps]) \
+        .responses
+
+    for i, (step, response) in enumerate(zip(steps, responses)):
+        if response != step['response']:
+            return Divergence(i, step['command'], step['response'], response)
+
+    # the game ended before the recording did.
+    if len(responses) < len(steps):
+        step = steps[len(responses)]
+        return Divergence(len(responses), step['command'], step['response'],
+                          GAME_ENDED)
+
+    # the game ended at the last step of only one of them.
+    recorded_active = transcript.get('active')
+    if steps and recorded_active is not None \
+            and recorded_active != world.active:
+        step = steps[-1]
+        if world.active:
+            return Divergence(len(steps) - 1, step['command'], GAME_ENDED,
+                              responses[-1])
+        return Divergence(len(steps) - 1, step['command'], step['response'],
+                          GAME_ENDED)
+    return None
+
+
+# game -> WorldTemplate.  Built once per process.
+_templates = {}
+
+
+def _new_world(game, use_template=False):
+    '''
+    A new world of a game module name or world file path.
+    '''
+    if use_template:
+        return _template(game).clone()
+    return _loader(game)()
+
+
+def _loader(game):
+    '''
+    The function that builds a world of a game module name or world file
+    path.
+    '''
+    # imported here to avoid a circular import (server imports worldfile).
+    from .server import load_game_module
+    from .worldfile import load_world
+
+    if game.endswith('.json'):
+        return partial(load_world, game)
+    return load_game_module(game).load_adventure
+
+
+def _template(game):
+    '''
+    The WorldTemplate of a game module name or world file path.
+    '''
+    try:
+        return _templates[game]
+    except KeyError:
+        pass
+
+    template = WorldTemplate.from_loader(_loader(game))
+    _templates[game] = template
+    return template
+
+
+def _run_one(path, use_template=False):
+    '''
+    Replay the transcript at path.  Errors are reported in the result so one
+    bad transcript does not stop the run.
+    '''
+    try:
+        transcript = load_transcript(path)
+    except (OSError, ValueError) as e:
+        return TranscriptResult(path, 0, error=str(e))
+
+    n_steps = len(transcript['steps'])
+    try:
+        return TranscriptResult(path, n_steps, replay_transcript(
+            transcript, use_template=use_template))
+    except Exception:
+        # an error in the engine (or game) while replaying.
+        return TranscriptResult(path, n_steps, error=traceback.format_exc())
+
+
+def find_transcripts(directory):
+    '''
+    Paths of the transcripts in directory (and its subdirectories) in
+    sorted order.
+    '''
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files
+                     if name.endswith(TRANSCRIPT_SUFFIX))
+    return sorted(paths)
+
+
+def run_transcripts(directory, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    use_template=False):
+    '''
+    Replay every transcript in a directory and compare the responses with
+    the recordings.
+
+    Params:
+    ------
+    directory: str
+        Directory of transcript files (searched recursively).
+
+    workers: int, optional (default=None)
+        Number of processes.  None = one per CPU.  1 = replay in this
+        process.
+
+    chunk_size: int, optional (default=DEFAULT_CHUNK_SIZE)
+        Number of transcripts sent to a worker in one task.
+
+    use_template: bool, optional (default=False)
+        Replay on clones of a WorldTemplate of each game built once per
+        process instead of building every world with the game's loader.
+
+    Returns:
+    -------
+    RunReport
+    '''
+    paths = find_transcripts(directory)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    run_one = partial(_run_one, use_template=use_template)
+    start = time.perf_counter()
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(run_one, paths, chunksize=chunk_size))
+    else:
+        results = [run_one(path) for path in paths]
+    return RunReport(results, time.perf_counter() - start)
+
+
+def main(argv=None):
+    '''
+    Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Record and replay game transcripts.')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    run_parser = subparsers.add_parser(
+        'run', help='replay a directory of transcripts')
+    run_parser.add_argument('directory')
+    run_parser.add_argument('--workers', type=int, default=None,
+                            help='processes (default: one per CPU)')
+    run_parser.add_argument('--chunk-size', type=int,
+                            default=DEFAULT_CHUNK_SIZE)
+    run_parser.add_argument('--template', action='store_true',
+                            help='replay on clones of a template of each '
+                            + 'game (faster)')
+
+    record_parser = subparsers.add_parser(
+        'record', help='record a transcript from a file of commands')
+    record_parser.add_argument('game', help='game module e.g. '
+                               + 'mini_knightmare or a world file')
+    record_parser.add_argument('commands',
+                               help='text file with one command per line')
+    record_parser.add_argument('--output', '-o', required=True)
+    args = parser.parse_args(argv)
+
+    if args.action == 'record':
+        with open(args.commands, encoding='utf-8') as f:
+            commands = [line.rstrip('\n') for line in f]
+        save_transcript(record_transcript(args.game, commands), args.output)
+        return 0
+
+    report = run_transcripts(args.directory, args.workers, args.chunk_size,
+                             args.template)
+    print(report.summary())
+    return 0 if report.passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,37 +10,182 @@ InventoryItem: an item that can be pickup and used in a game.
 InventoryItemHolder: encapsualtes functionality for managing and searching
 inventory
 
+AmbiguousAliasError: raised when an alias matches more than one held item
+
 Room: A location within the game that has a description and exits to other
 Rooms
 
-TextWorld: The main game class.  A player can take actions within a game
+Player: a player in a TextWorld.  Holds the player's inventory and the Room
+they are in.
+
+TextWorld: The main game class.  One or more players can take actions
+within a game.  Optionally records undo history and indexes routes between
+rooms.
+
+Functions:
+---------
+
+slot_attributes: the slot attributes set on an object
+
+instance_attributes: the attributes of an object (slots and __dict__)
+
+Memory:
+------
+InventoryItem, InventoryHolder, Room, Player and every Command and action
+class declare __slots__ so instances have no per-object __dict__.  Small per
+item collections (aliases, actions, holders) are tuples and empty
+collections are shared.  Aliases, exit directions and action verbs are
+interned.  TextWorld keeps a __dict__ so games can add their own attributes
+(e.g. opening).
 
 '''
 
+from collections import namedtuple
+from itertools import count, islice
+from sys import intern
+from time import perf_counter_ns
+
 from .constants import (
     CLASSIC_USE_ALIASES,
     DEFAULT_VERBS,
     DEFAULT_LEGAL_MOVES,
+    GO_COMMAND,
+    REDO_COMMAND,
+    UNDO_COMMAND,
     WARFARE_USE_ALIASES)
 
 from .commands import (
     NullCommand,
     QuitGame,
     ExamineInventoryItem,
+    GoToRoom,
     LookAtRoom,
     MoveRoom,
+    RedoTurn,
     TransferInventory,
+    UndoTurn,
     UseInventoryItem,
     ViewPlayerInventory)
 
+from .instrument import (
+    Instrumentation,
+    InstrumentedRenderer,
+    PARSE,
+    TOTAL)
+
+from .journal import DEFAULT_UNDO_LIMIT, Journal
+
+from .render import HeadlessRenderer
+
+from .routing import DEFAULT_CACHE_SIZE, RoutingIndex
+
 COMMAND_ERROR = "You cannot do that."
 
+# name of the player a TextWorld is created with.
+DEFAULT_PLAYER_NAME = 'player'
+
+# source of unique InventoryItem ids
+_ITEM_IDS = count()
+
+# returned by InventoryItem.get_actions when no action matches.  Also the
+# actions, aliases and holders of items that have none.
+_NO_ACTIONS = ()
+
+# class -> names of the __slots__ of the class and its bases
+_SLOT_NAMES = {}
+
+# result of a sequence of commands executed by TextWorld.run_batch
+BatchResult = namedtuple('BatchResult',
+                         ['responses', 'rooms', 'n_actions', 'active'])
+
+
+class _EmptyDict(dict):
+    '''
+    A read only empty dict.  One instance (_EMPTY_DICT) is shared by every
+    holder with no inventory and item with no actions.  Owners replace it
+    with a new dict before adding to it.
+    '''
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('the shared empty dict is read only')
+
+    __setitem__ = setdefault = update = __ior__ = _read_only
+
+    def __reduce__(self):
+        # pickle and copy as a reference to the shared instance.
+        return '_EMPTY_DICT'
+
+
+_EMPTY_DICT = _EmptyDict()
+
+
+def _slot_names(cls):
+    '''
+    Names of the __slots__ of a class and its bases (most derived first).
+    '''
+    names = _SLOT_NAMES.get(cls)
+    if names is None:
+        names = []
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names.extend(name for name in slots
+                         if name not in ('__dict__', '__weakref__'))
+        names = _SLOT_NAMES[cls] = tuple(names)
+    return names
+
+
+def slot_attributes(obj):
+    '''
+    The slot attributes that are set on obj.
+
+    Returns:
+    -------
+    dict
+        {name: value}
+    '''
+    attrs = {}
+    for name in _slot_names(type(obj)):
+        try:
+            attrs[name] = getattr(obj, name)
+        except AttributeError:
+            # slot not set.
+            pass
+    return attrs
+
+
+def instance_attributes(obj):
+    '''
+    The attributes of an object: its slots and its __dict__ (if any).  Use
+    instead of vars() which does not work for slotted engine classes.
+
+    Slots are listed first (most derived class first) then __dict__
+    attributes.  For engine classes this is the order that __init__ sets
+    them.
+
+    Returns:
+    -------
+    dict
+        {name: value}
+    '''
+    attrs = slot_attributes(obj)
+    attrs.update(getattr(obj, '__dict__', ()))
+    return attrs
+
 
 class InventoryItem:
     '''
     An item found in a text adventure world that can be picked up
     or dropped.
+
+    aliases is a tuple: use add_alias to add one.
     '''
+    __slots__ = ('item_id', 'name', 'long_description', 'fixed',
+                 'background', 'aliases', '_actions', '_actions_by_verb',
+                 '_holders')
+
     def __init__(self, short_description, fixed=False, background=False):
         '''
         Construct an InventoryItem
@@ -57,12 +202,21 @@ class InventoryItem:
             Is this a background item that is hidden from the
             "you can also see" section in the game?
         '''
+        # stable identifier used by InventoryHolders for membership tests
+        self.item_id = next(_ITEM_IDS)
         self.name = short_description
         self.long_description = ''
         self.fixed = fixed
         self.background = background
-        self.aliases = []
-        self.actions = []
+        self.aliases = _NO_ACTIONS
+
+        # actions in the order they were added and indexed by command text
+        # (tuples of actions).  Empty items share the same empty containers.
+        self._actions = _NO_ACTIONS
+        self._actions_by_verb = _EMPTY_DICT
+
+        # InventoryHolders that currently hold this item.
+        self._holders = _NO_ACTIONS
 
     def add_alias(self, new_alias):
         '''
@@ -76,7 +230,12 @@ class InventoryItem:
             The alias to add.  For example, 'card'
 
         '''
-        self.aliases.append(new_alias)
+        new_alias = intern(new_alias)
+        self.aliases += (new_alias,)
+
+        # keep the alias index of any holder in sync.
+        for holder in self._holders:
+            holder._index_alias(self, new_alias)
 
     def add_action(self, action):
         '''
@@ -88,27 +247,112 @@ class InventoryItem:
         -------
         action: InventoryItemAction
         '''
-        self.actions.append(action)
+        if self._actions_by_verb is _EMPTY_DICT:
+            self._actions_by_verb = {}
+        self._actions += (action,)
+        verb = action.command_text
+        self._actions_by_verb[verb] = \
+            self._actions_by_verb.get(verb, _NO_ACTIONS) + (action,)
+
+    def _pop_action(self):
+        '''
+        Remove the most recently added action (undo add_action).
+        '''
+        action = self._actions[-1]
+        self._actions = self._actions[:-1]
+        verb = action.command_text
+        verb_actions = self._actions_by_verb[verb][:-1]
+        if verb_actions:
+            self._actions_by_verb[verb] = verb_actions
+        else:
+            del self._actions_by_verb[verb]
 
-    def __eq__(self, other):
-        """
-        Overrides the default implementation
-        Source:
+    def _set_actions(self, actions, actions_by_verb):
+        '''
+        Replace the action list and index (undo clear_actions).
+        '''
+        self._actions = actions
+        self._actions_by_verb = actions_by_verb
+
+    @property
+    def actions(self):
+        '''
+        Tuple of the item's actions (in the order they were added).
+        '''
+        return self._actions
+
+    @actions.setter
+    def actions(self, actions):
+        self.clear_actions()
+        for action in actions:
+            self.add_action(action)
+
+    def clear_actions(self):
+        '''
+        Remove all actions from the item.
+        '''
+        self._actions = _NO_ACTIONS
+        self._actions_by_verb = _EMPTY_DICT
+
+    def get_actions(self, command_text):
+        '''
+        Return the actions triggered by a command text e.g. 'use'
+
+        Params:
+        ------
+        command_text: str
+            The verb used in the command.
+
+        Returns:
         -------
-        https://stackoverflow.com/questions/390250/
-        elegant-ways-to-support-equivalence-equality-in-python-classes
-        """
+        Tuple[InventoryItemAction]
+            Matching actions in the order they were added.
+        '''
+        return self._actions_by_verb.get(command_text, _NO_ACTIONS)
+
+    def __eq__(self, other):
+        '''
+        Two InventoryItems are equal if they share the same item_id.
+
+        Comparing whole __dict__s is expensive as it recurses through
+        actions, their commands and any rooms the commands reference.
+        '''
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.item_id == other.item_id
         else:
             return False
 
+    def __hash__(self):
+        return hash(self.item_id)
+
+
+class AmbiguousAliasError(KeyError):
+    '''
+    Raised when an alias matches more than one InventoryItem held by the
+    same InventoryHolder.
+    '''
+    def __init__(self, alias, items):
+        '''
+        Params:
+        ------
+        alias: str
+            The ambiguous alias
+
+        items: List[InventoryItem]
+            The items that share the alias.
+        '''
+        super().__init__(alias)
+        self.alias = alias
+        self.items = items
+
 
 class InventoryHolder:
     '''
     Encapsulates the logic for adding and removing an InventoryItem
     This simulates "picking up" and "dropping" items in a TextWorld
     '''
+    __slots__ = ('_items', '_alias_index')
+
     def __init__(self):
         '''
         Params:
@@ -117,29 +361,146 @@ class InventoryHolder:
             specify a capacity for the holder.
             'inf'=infinite
         '''
-        # inventory just held in a list interally
-        self.inventory = []
+        # inventory held in an insertion ordered dict keyed by item_id.
+        # The keys double as the set used for membership tests.  Holders
+        # with no inventory share _EMPTY_DICT.
+        self._items = _EMPTY_DICT
+
+        # alias -> tuple of the held items with the alias (in the order
+        # they were added).
+        self._alias_index = _EMPTY_DICT
+
+    @property
+    def inventory(self):
+        '''
+        Tuple of the InventoryItems held (in the order they were added).
+        Read only: use add_inventory and remove_inventory to change it.
+        '''
+        return tuple(self._items.values())
 
     @property
     def inventory_count(self):
-        return len(self.inventory)
+        return len(self._items)
 
     def list_inventory(self):
         '''
         Return a string representation of InventoryItems held.
         '''
         msg = ''
-        for item in self.inventory:
+        for item in self._items.values():
             if item.background is False:
                 msg += f'{item.name}\n'
 
         return msg
 
-    def add_inventory(self, item):
+    def add_inventory(self, item, position=None):
         '''
-        Add an InventoryItem
+        Add an InventoryItem.  Adding an item that is already held
+        has no effect: a holder holds an item at most once.
+
+        Params:
+        ------
+        item: InventoryItem
+            The item to add
+
+        position: int, optional (default=None)
+            Position of the item in the inventory.  None = last.  Adding
+            at a position takes time proportional to the number of items
+            after it (e.g. undoing the removal of a recently added item is
+            cheap).
+        '''
+        items = self._items
+        if item.item_id in items:
+            return
+
+        if items is _EMPTY_DICT:
+            items = self._items = {}
+        if position is None or position >= len(items):
+            items[item.item_id] = item
+        else:
+            # take out the items after position and add them back after
+            # the new item.
+            tail = [items.pop(item_id) for item_id
+                    in list(islice(reversed(items), len(items) - position))]
+            items[item.item_id] = item
+            for held in reversed(tail):
+                items[held.item_id] = held
+        for alias in item.aliases:
+            self._index_alias(item, alias)
+        item._holders += (self,)
+        self._inventory_changed(item)
+
+    def inventory_position(self, item):
+        '''
+        Position of a held InventoryItem in the inventory.  Takes time
+        proportional to the number of items after it.
+
+        Raises:
+        ------
+        ValueError
+            Raised when the item is not held.
+        '''
+        if item.item_id not in self._items:
+            raise ValueError(f"'{item.name}' is not held")
+        for n_after, item_id in enumerate(reversed(self._items)):
+            if item_id == item.item_id:
+                return len(self._items) - 1 - n_after
+
+    def remove_inventory(self, item):
         '''
-        self.inventory.append(item)
+        Remove a specific InventoryItem from the holder.
+
+        Params:
+        ------
+        item: InventoryItem
+            The item to remove
+
+        Raises:
+        ------
+        KeyError
+            Raised when the item is not held.
+        '''
+        del self._items[item.item_id]
+        alias_index = self._alias_index
+        for alias in item.aliases:
+            matches = alias_index.get(alias)
+            if matches is None:
+                continue
+            if len(matches) == 1:
+                # the usual case: only this item has the alias.
+                if matches[0] is item:
+                    del alias_index[alias]
+            else:
+                alias_index[alias] = tuple([match for match in matches
+                                            if match is not item])
+
+        holders = item._holders
+        if len(holders) == 1:
+            item._holders = _NO_ACTIONS
+        else:
+            item._holders = tuple([holder for holder in holders
+                                   if holder is not self])
+        self._inventory_changed(item)
+
+    def clear_inventory(self):
+        '''
+        Remove all InventoryItems from the holder.
+        '''
+        items = list(self._items.values())
+        for item in items:
+            item._holders = tuple([holder for holder in item._holders
+                                   if holder is not self])
+        self._items = _EMPTY_DICT
+        self._alias_index = _EMPTY_DICT
+        for item in items:
+            self._inventory_changed(item)
+
+    def _inventory_changed(self, item):
+        '''
+        Called after an item is added or removed.  Subclasses may override
+        e.g. to invalidate cached output.
+        '''
+        pass
 
     def get_inventory(self, item_name):
         '''
@@ -159,58 +520,81 @@ class InventoryHolder:
         ------
         KeyError
             Raised when an InventoryItem without a matching alias.
+
+        AmbiguousAliasError
+            Raised when more than one InventoryItem has a matching alias.
         '''
-        selected_item, selected_index = self.find_inventory(item_name)
+        selected_item = self.find_inventory(item_name)
+        if selected_item is None:
+            raise KeyError(item_name)
 
-        # remove at index and return (potential bug to delete -1 if none found)
-        del self.inventory[selected_index]
+        self.remove_inventory(selected_item)
         return selected_item
 
     def find_inventory(self, item_name):
         '''
-        Find an inventory item and return it and its index
-        in the collection.
+        Find an inventory item using one of its aliases.
 
-        This is a bit clumsy.  Needs improving...
+        Params:
+        ------
+        item_name: str
+            Alias identifying item.
+
+        Returns:
+        -------
+        InventoryItem or None if no item has a matching alias.
+
+        Raises:
+        ------
+        AmbiguousAliasError
+            Raised when more than one InventoryItem has a matching alias.
         '''
-        selected_item = None
-        selected_index = -1
-        for index, item in zip(range(len(self.inventory)), self.inventory):
-            if item_name in item.aliases:
-                selected_item = item
-                selected_index = index
-                break
+        matches = self._alias_index.get(item_name)
+        if not matches:
+            return None
 
-        return selected_item, selected_index
+        if len(matches) > 1:
+            raise AmbiguousAliasError(item_name, list(matches))
+
+        return matches[0]
+
+    def _index_alias(self, item, alias):
+        '''
+        Add an item to the alias index.  Called by InventoryItem.add_alias
+        when an alias is added to an item that is already held.
+        '''
+        if self._alias_index is _EMPTY_DICT:
+            self._alias_index = {}
+        matches = self._alias_index.get(alias, _NO_ACTIONS)
+        if item not in matches:
+            self._alias_index[alias] = matches + (item,)
 
     def in_inventory(self, to_find):
         '''
         Returns true of false depending if item or list of items are contained
-        in the inventory.
+        in the inventory.  Membership is tested using InventoryItem.item_id
+        so the cost is O(len(to_find)).  An empty list is never contained.
 
         Params:
         ------
         to_find: InventoryItem or List[InventoryItem]
+            A list or tuple (e.g. another holder's inventory) of items.
 
         Returns:
         --------
         bool
         '''
-        count = 0
-        if isinstance(to_find, list):
-            required_count = len(to_find)
-        else:
-            required_count = 1
-            to_find = [to_find]
+        if not isinstance(to_find, (list, tuple)):
+            return to_find.item_id in self._items
 
-        for item in to_find:
-            if item in self.inventory:
-                count += 1
+        if not to_find:
+            return False
 
-            if required_count == count:
-                return True
+        for item in to_find:
+            if item.item_id not in self._items:
+                return False
 
-        return False
+        return True
 
 
 class Room(InventoryHolder):
@@ -221,8 +605,21 @@ class Room(InventoryHolder):
 
     A `Room` is-a type of `InventoryHolder`
     '''
+    __slots__ = ('name', '_description_cache', '_segments',
+                 '_next_segment_id', '_description', '_exits', 'visited',
+                 'first_enter_msg', '_routing')
+
     def __init__(self, name, first_enter_msg=''):
         self.name = name
+        # RoutingIndex notified of changes to the exits (if any)
+        self._routing = None
+        # rendered description + visible inventory.  None = out of date.
+        self._description_cache = None
+        # the description is held as ordered segments {segment_id: text}
+        # and joined when read.  None = out of date.
+        self._segments = {}
+        self._next_segment_id = 0
+        self._description = None
         self.description = ""
         self.exits = {}
 
@@ -241,7 +638,7 @@ class Room(InventoryHolder):
         desc = f"Room(name='{self.name}'"
         desc += f", description='{self.description[:20]}'"
         desc += f', n_exits={len(self.exits)}'
-        desc += f', n_items={len(self.inventory)})'
+        desc += f', n_items={self.inventory_count})'
         return desc
 
     def add_exit(self, room, direction):
@@ -256,7 +653,11 @@ class Room(InventoryHolder):
         direction: str
             The str command to access the room
         '''
-        self.exits[direction] = room
+        direction = intern(direction)
+        old_room = self._exits.get(direction)
+        self._exits[direction] = room
+        if self._routing is not None:
+            self._routing._exit_changed(self, old_room, room)
 
     def remove_exit(self, direction):
         '''
@@ -266,7 +667,9 @@ class Room(InventoryHolder):
         ------
         direction: str
         '''
-        self.exits.pop(direction, None)
+        old_room = self._exits.pop(direction, None)
+        if old_room is not None and self._routing is not None:
+            self._routing._exit_changed(self, old_room, None)
 
     def exit(self, direction):
         '''
@@ -277,18 +680,135 @@ class Room(InventoryHolder):
         direction: str
             A command string representing the direction.
         '''
-        if direction in self.exits:
-            return self.exits[direction]
+        if direction in self._exits:
+            return self._exits[direction]
         else:
             raise ValueError()
 
+    @property
+    def exits(self):
+        '''
+        dict of direction: Room.  Use add_exit/remove_exit (or assign a new
+        dict) to change the exits.
+        '''
+        return self._exits
+
+    @exits.setter
+    def exits(self, exits):
+        if self._routing is None:
+            self._exits = exits
+            return
+        old_exits = self._exits
+        self._exits = exits
+        self._routing._exits_replaced(self, old_exits, exits)
+
+    @property
+    def description(self):
+        '''
+        The room description: its segments joined in order.
+        '''
+        if self._description is None:
+            self._description = ''.join(self._segments.values())
+        return self._description
+
+    @description.setter
+    def description(self, description):
+        '''
+        Replace the whole description (and all segments) with a single
+        segment.
+        '''
+        self._segments = {}
+        self.append_description(description)
+
+    def append_description(self, text):
+        '''
+        Append a segment of text to the description.  O(1): segments are
+        only joined when the description is next read.
+
+        Params:
+        ------
+        text: str
+
+        Returns:
+        -------
+        int
+            id of the segment.  Use to replace or remove the segment.
+        '''
+        segment_id = self._next_segment_id
+        self._next_segment_id += 1
+        self._segments[segment_id] = text
+        self._description_changed()
+        return segment_id
+
+    def replace_description_segment(self, segment_id, text):
+        '''
+        Replace the text of a segment of the description.
+
+        Raises:
+        ------
+        KeyError
+            If the segment is not part of the description.
+        '''
+        if segment_id not in self._segments:
+            raise KeyError(segment_id)
+        self._segments[segment_id] = text
+        self._description_changed()
+
+    def remove_description_segment(self, segment_id):
+        '''
+        Remove a segment from the description e.g. to undo an append.
+
+        Raises:
+        ------
+        KeyError
+            If the segment is not part of the description.
+        '''
+        del self._segments[segment_id]
+        self._description_changed()
+
+    def _remove_last_segment(self, segment_id):
+        '''
+        Remove the most recently appended segment so that the next append
+        reuses its id (undo append_description).
+        '''
+        del self._segments[segment_id]
+        self._next_segment_id = segment_id
+        self._description_changed()
+
+    def _set_segments(self, segments, next_segment_id):
+        '''
+        Replace all segments (undo setting the description).
+        '''
+        self._segments = segments
+        self._next_segment_id = next_segment_id
+        self._description_changed()
+
+    def _description_changed(self):
+        self._description = None
+        self._description_cache = None
+
     def describe(self):
-        msg = self.description
-        if not self.visited :
+        '''
+        Describe the room and the (non background) items it holds.  The
+        first time a room is described its first_enter_msg is included.
+
+        The description and visible inventory is rendered once and cached
+        until the description or visible inventory changes.
+        '''
+        msg = self._description_cache
+        if msg is None:
+            msg = self._render_description()
+            self._description_cache = msg
+
+        if not self.visited:
             msg = self.first_enter_msg + msg
             self.visited = True
 
-        if len(self.inventory) > 0:
+        return msg
+
+    def _render_description(self):
+        msg = self.description
+        if self.inventory_count > 0:
             inv_msg = "\n"
             inv_msg += self.list_inventory()
             if inv_msg != "\n":
@@ -296,17 +816,54 @@ class Room(InventoryHolder):
 
         return msg
 
+    def _inventory_changed(self, item):
+        # background items are not listed so do not change the output.
+        if not item.background:
+            self._description_cache = None
+
+
+class Player(InventoryHolder):
+    '''
+    A player in a TextWorld: the items they hold and the Room they are in.
+    '''
+    __slots__ = ('name', 'current_room')
+
+    def __init__(self, name, current_room):
+        '''
+        Params:
+        ------
+        name: str
+            Name of the player.  Unique within a TextWorld.
+
+        current_room: Room
+            The room the player is in.
+        '''
+        self.name = name
+        self.current_room = current_room
+        super().__init__()
+
+    def __repr__(self):
+        return f"Player(name='{self.name}', " \
+            + f"current_room='{self.current_room.name}', " \
+            + f'n_items={self.inventory_count})'
+
 
 class TextWorld(InventoryHolder):
     '''
     A TextWorld encapsulate the logic and Room objects that comprise the game.
 
-    A `TextWorld` is-a type of `InventoryHolder` although it might be wise to
-    to seperate out this logic into a `Player` class and set up a World to have
-    one or more players.
+    A TextWorld holds one or more Players (see add_player).  Commands are
+    taken by the acting player (`player`).  A `TextWorld` is-a type of
+    `InventoryHolder` that stands for the acting player: its inventory
+    methods and current_room act on `player`.  Actions that test or change
+    the game's inventory therefore apply to whichever player takes the turn.
+
+    Unlike the other engine classes TextWorld is not slotted so games can
+    set their own attributes (e.g. opening).
     '''
     def __init__(self, name, rooms, start_index=0, legal_exits=None,
-                 command_verb_mapping=None, use_aliases='classic'):
+                 command_verb_mapping=None, use_aliases='classic',
+                 renderer=None):
         '''
         Constructor method for World
 
@@ -335,11 +892,23 @@ class TextWorld(InventoryHolder):
             'classic' = the game provides a standard set of simple verb aliases
             'warfare' = classic use verbs + war specific ones.
 
+        renderer: None or Renderer, optional (default=None)
+            Handles render events (e.g. clear screen) emitted by commands.
+            If None then a HeadlessRenderer is used.  Interactive games
+            should use a TerminalRenderer.
+
         '''
         super().__init__()
+        # Players by name and the player taking actions.
+        self.players = {}
+        self.player = None
+        # counts players added and removed (see StateCodec)
+        self.roster_changes = 0
         self.name = name
         self.rooms = rooms
-        self.current_room = self.rooms[start_index]
+        # where new players begin.
+        self.start_room = self.rooms[start_index]
+        self.player = self.add_player(DEFAULT_PLAYER_NAME)
 
         # if None then get standard list
         if legal_exits is None:
@@ -357,14 +926,15 @@ class TextWorld(InventoryHolder):
             self.legal_verbs = \
                     self.custom_command_word_mapping(command_verb_mapping)
 
-        # aliaises for the use
+        # aliaises for the use.  Presets are copied so that adding an alias
+        # to one TextWorld does not modify other games or the constants.
         if use_aliases is None:
             self.use_aliases = ['use']
         elif use_aliases == 'classic':
             # classic game
-            self.use_aliases = CLASSIC_USE_ALIASES
+            self.use_aliases = list(CLASSIC_USE_ALIASES)
         elif use_aliases == 'warfare':
-            self.use_aliases = WARFARE_USE_ALIASES
+            self.use_aliases = list(WARFARE_USE_ALIASES)
         else:
             # completely custom list
             self.use_aliases = use_aliases
@@ -378,6 +948,28 @@ class TextWorld(InventoryHolder):
         # game over message
         self.game_over_message = 'Game over.'
 
+        # per stage timings.  None = disabled (see enable_instrumentation)
+        self.instrumentation = None
+
+        # display of render events emitted by commands.
+        if renderer is None:
+            self.renderer = HeadlessRenderer()
+        else:
+            self.renderer = renderer
+
+        # undo history.  None = disabled (see enable_undo)
+        self.journal = None
+
+        # shortest routes between rooms.  None = disabled (see
+        # enable_routing)
+        self.routing = None
+
+        # the Rooms, InventoryItems and actions of the game as built.  None
+        # until recorded (see game_definition).
+        self._definition = None
+
+        self.compile_dispatch()
+
     def __repr__(self):
         '''
         String representation of the class
@@ -386,16 +978,206 @@ class TextWorld(InventoryHolder):
         desc += f'n_rooms={len(self.rooms)}, '
         desc += f'legal_exits={self.legal_exits},\n'
         desc += f'\tlegal_commands={self.legal_verbs},\n'
-        desc += f'\tcurrent_room={self.current_room})'
+        desc += f'\tn_players={len(self.players)}, '
+        desc += f'current_room={self.current_room})'
         return desc
 
+    def add_player(self, name, room=None):
+        '''
+        Add a player to the game.  The player takes actions passed to
+        take_action(command, player).
+
+        Params:
+        ------
+        name: str
+            Unique name of the player.
+
+        room: Room, optional (default=None)
+            Where the player begins.  None = start_room.
+
+        Returns:
+        -------
+        Player
+
+        Raises:
+        ------
+        ValueError
+            Raised when a player with the name exists.
+        '''
+        if name in self.players:
+            raise ValueError(f"A player named '{name}' already exists.")
+        player = Player(name, self.start_room if room is None else room)
+        self.players[name] = player
+        self.roster_changes += 1
+        return player
+
+    def remove_player(self, name):
+        '''
+        Remove a player from the game.  Items held by the player are left
+        in the room they are in.  If the player was acting the first
+        remaining player acts.  The undo history is forgotten.
+
+        Params:
+        ------
+        name: str
+
+        Raises:
+        ------
+        KeyError
+            Raised when there is no player with the name.
+
+        ValueError
+            Raised when the player is the last player.
+        '''
+        player = self.players[name]
+        if len(self.players) == 1:
+            raise ValueError('Cannot remove the last player.')
+        del self.players[name]
+        self.roster_changes += 1
+        if self.journal is not None:
+            self.journal.clear()
+        for item in player.inventory:
+            player.remove_inventory(item)
+            player.current_room.add_inventory(item)
+        if self.player is player:
+            self.player = next(iter(self.players.values()))
+
+    def _act_as(self, player):
+        '''
+        Make a player (or the player with a name) the acting player.
+        '''
+        if isinstance(player, str):
+            player = self.players[player]
+        self.player = player
+
+    @property
+    def renderer(self):
+        '''
+        The Renderer that displays render events emitted by commands.  While
+        instrumentation is enabled a renderer assigned is wrapped so that
+        its render time is still recorded.
+        '''
+        return self._renderer
+
+    @renderer.setter
+    def renderer(self, renderer):
+        if self.instrumentation is not None \
+                and not isinstance(renderer, InstrumentedRenderer):
+            renderer = InstrumentedRenderer(renderer, self.instrumentation)
+        self._renderer = renderer
+
+    ############ the acting player ############################################
+    # TextWorld stands for the acting player: commands and actions that use
+    # the game's room or inventory use the acting player's.
+
+    @property
+    def current_room(self):
+        '''
+        The Room the acting player is in.
+        '''
+        return self.player.current_room
+
+    @current_room.setter
+    def current_room(self, room):
+        self.player.current_room = room
+
+    def describe_current_room(self):
+        '''
+        Describe the acting player's current room (see Room.describe) e.g.
+        when a game starts.
+
+        Returns:
+        -------
+        str
+        '''
+        return self.current_room.describe()
+
+    @property
+    def inventory(self):
+        return self.player.inventory
+
+    @property
+    def inventory_count(self):
+        return self.player.inventory_count
+
+    def list_inventory(self):
+        return self.player.list_inventory()
+
+    def add_inventory(self, item, position=None):
+        self.player.add_inventory(item, position)
+
+    def inventory_position(self, item):
+        return self.player.inventory_position(item)
+
+    def remove_inventory(self, item):
+        self.player.remove_inventory(item)
+
+    def clear_inventory(self):
+        self.player.clear_inventory()
+
+    def get_inventory(self, item_name):
+        return self.player.get_inventory(item_name)
+
+    def find_inventory(self, item_name):
+        return self.player.find_inventory(item_name)
+
+    def in_inventory(self, to_find):
+        return self.player.in_inventory(to_find)
+
+    ###########################################################################
+
     def add_use_command_alias(self, alias):
         '''
         Add use alias to the existing set.
         '''
         self.use_aliases.append(alias)
+        self.compile_dispatch()
+
+    def compile_dispatch(self):
+        '''
+        Compile the vocabulary (legal_exits, legal_verbs and use_aliases)
+        into the dispatch tables used by take_action.
+
+        Called automatically on construction and by add_use_command_alias.
+        Call again after modifying legal_exits, legal_verbs or use_aliases
+        directly.
+
+        _exit_dispatch maps a complete command (e.g. 'n') to a MoveRoom
+        command.  _verb_dispatch maps the first word of
+        a command to the function that creates its Command.  Use aliases
+        take priority over other verbs.
+        '''
+        self._exit_dispatch = {
+            direction: self._create_move_room_command(direction)
+            for direction in self.legal_exits}
+
+        verb_dispatch = dict(self.legal_verbs)
+        for alias in self.use_aliases:
+            verb_dispatch[alias] = self._create_use_command
+        self._verb_dispatch = verb_dispatch
 
-    def take_action(self, command):
+    def game_definition(self):
+        '''
+        The Rooms, InventoryItems and actions of the game as it was built.
+        Recorded before the first action (or when first requested) so it
+        does not depend on play: e.g. items consumed by an action are still
+        listed.  Compact states (see state.py) are laid out from it.
+
+        Returns:
+        -------
+        tuple (rooms, items, actions)
+            Lists.  Do not modify.
+        '''
+        if self._definition is None:
+            self._record_definition()
+        return self._definition
+
+    def _record_definition(self):
+        # imported here: state.py imports this module.
+        from .state import _enumerate
+        self._definition = _enumerate(self)
+
+    def take_action(self, command, player=None):
         '''
         Take an action in the TextWorld.
 
@@ -404,17 +1186,102 @@ class TextWorld(InventoryHolder):
         command: str
             A command to parse and execute as a game action
 
+        player: Player or str, optional (default=None)
+            The player (or name of the player) taking the action.  The
+            acting player is restored after the action.  None = the acting
+            player.
+
         Returns:
         --------
         str: a string message to display to the player.
         '''
-        # no. of actions taken
-        self.n_actions += 1
+        if self._definition is None:
+            self._record_definition()
+        if player is None:
+            # no. of actions taken
+            self.n_actions += 1
+            return self._parse_and_execute(command)
+        acting = self.player
+        self._act_as(player)
+        try:
+            self.n_actions += 1
+            return self._parse_and_execute(command)
+        finally:
+            self.player = acting
+
+    def run_batch(self, commands, player=None):
+        '''
+        Take a sequence of actions in the TextWorld in a single call.
+
+        Execution stops early if the game ends (i.e. `active` is False).
+        Each command costs the same as a call to take_action (see the
+        run_batch benchmark): the batch collects the results of each step.
+
+        Parameters:
+        -----------
+        commands: Iterable[str]
+            Commands to parse and execute in order.
+
+        player: Player or str, optional (default=None)
+            The player taking the actions.  See take_action.
+
+        Returns:
+        --------
+        BatchResult
+            namedtuple of lists (responses, rooms, n_actions, active) with
+            one entry per command executed. rooms, n_actions and active
+            record the state of the game after each command.
+        '''
+        responses = []
+        rooms = []
+        start = self.n_actions
+        if self._definition is None:
+            self._record_definition()
+        acting = self.player
+        if player is not None:
+            self._act_as(player)
+        try:
+            if self.active:
+                parse_and_execute = self._parse_and_execute
+                add_response = responses.append
+                add_room = rooms.append
+
+                for command in commands:
+                    self.n_actions += 1
+                    add_response(parse_and_execute(command))
+                    add_room(self.current_room)
+                    if not self.active:
+                        break
+        finally:
+            self.player = acting
+
+        # the game is active after every step except (possibly) the last.
+        n_steps = len(responses)
+        active = [True] * n_steps
+        if n_steps > 0:
+            active[-1] = self.active
+
+        return BatchResult(responses, rooms,
+                           list(range(start + 1, start + n_steps + 1)),
+                           active)
+
+    def _parse_and_execute(self, command):
+        '''
+        Parse a command and execute it as a game action.
+
+        Parameters:
+        -----------
+        command: str
+            A command to parse and execute as a game action
 
+        Returns:
+        --------
+        str: a string message to display to the player.
+        '''
         # handle action to move room
-        if command in self.legal_exits:
-            cmd = self._create_move_room_command(command)
-            return cmd.execute()
+        move = self._exit_dispatch.get(command)
+        if move is not None:
+            return move.execute()
 
         # split user input into list
         parsed_command = command.lower().split()
@@ -424,26 +1291,252 @@ class TextWorld(InventoryHolder):
         if not parsed_command:
             return NullCommand("Please enter a command.").execute()
 
-        # if attempting to use an item.
-        if parsed_command[0] in self.use_aliases:
-            try:
-                cmd = UseInventoryItem(self, item_alias=parsed_command[1],
-                                       command_text=parsed_command[0],
-                                       parsed_command=parsed_command)
-            except IndexError:
-                cmd = NullCommand(f"{parsed_command[0]} what?")
-            finally:
-                return cmd.execute()
-
-        # else lookup the function that will create the command.
-        try:
-            command_creator = self.legal_verbs[parsed_command[0]]
-        except KeyError:
+        # lookup the function that will create the command.
+        command_creator = self._verb_dispatch.get(parsed_command[0])
+        if command_creator is None:
             # handle command error
             return f"I don't know how to {command}"
 
-        cmd = command_creator(parsed_command)
-        return cmd.execute()
+        return command_creator(parsed_command).execute()
+
+    def _parse(self, command):
+        '''
+        Parse a command into a Command object.  Used when instrumentation
+        is enabled.  _parse_and_execute inlines the same logic.
+
+        Returns:
+        --------
+        Command
+        '''
+        move = self._exit_dispatch.get(command)
+        if move is not None:
+            return move
+
+        parsed_command = command.lower().split()
+        if not parsed_command:
+            return NullCommand("Please enter a command.")
+
+        command_creator = self._verb_dispatch.get(parsed_command[0])
+        if command_creator is None:
+            return NullCommand(f"I don't know how to {command}")
+
+        return command_creator(parsed_command)
+
+    def _instrumented_parse_and_execute(self, command):
+        '''
+        _parse_and_execute that records stage timings.
+        '''
+        instrumentation = self.instrumentation
+        start = perf_counter_ns()
+        cmd = self._parse(command)
+        parsed = perf_counter_ns()
+        msg = cmd.execute()
+        end = perf_counter_ns()
+
+        instrumentation.record(PARSE, parsed - start)
+        instrumentation.record_command(cmd, end - parsed)
+        instrumentation.record(TOTAL, end - start)
+        return msg
+
+    def enable_instrumentation(self, instrumentation=None):
+        '''
+        Record per stage timings and per command class counts of every
+        action taken.  Adds a small overhead to each action.
+
+        Params:
+        ------
+        instrumentation: Instrumentation, optional (default=None)
+            Where to record timings.  Pass the same object to several
+            TextWorlds to aggregate them.  If None a new one is created.
+
+        Returns:
+        -------
+        Instrumentation
+        '''
+        if self.instrumentation is not None:
+            self.disable_instrumentation()
+
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        self.instrumentation = instrumentation
+        # wrapped by the renderer setter.
+        self.renderer = self._renderer
+        self._select_parse_and_execute()
+        return instrumentation
+
+    def disable_instrumentation(self):
+        '''
+        Stop recording timings.
+
+        Returns:
+        -------
+        Instrumentation or None
+            The recorded timings (None if instrumentation was not enabled)
+        '''
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return None
+
+        self.instrumentation = None
+        if isinstance(self._renderer, InstrumentedRenderer):
+            self._renderer = self._renderer.renderer
+        self._select_parse_and_execute()
+        return instrumentation
+
+    def _select_parse_and_execute(self):
+        '''
+        Shadow _parse_and_execute with the journaled and/or instrumented
+        version when undo or instrumentation are enabled.  When both are
+        disabled the instance attribute is removed so the normal code path
+        has no overhead.
+        '''
+        self.__dict__.pop('_parse_and_execute', None)
+        if self.journal is not None:
+            self._parse_and_execute = self._journaled_parse_and_execute
+        elif self.instrumentation is not None:
+            self._parse_and_execute = self._instrumented_parse_and_execute
+
+    def _journaled_parse_and_execute(self, command):
+        '''
+        _parse_and_execute that records the changes made in the journal.
+        '''
+        journal = self.journal
+        journal.begin_turn()
+        try:
+            if self.instrumentation is not None:
+                return self._instrumented_parse_and_execute(command)
+            return TextWorld._parse_and_execute(self, command)
+        finally:
+            journal.end_turn(command)
+
+    def enable_undo(self, limit=DEFAULT_UNDO_LIMIT):
+        '''
+        Record the changes made by each turn so that they can be undone.
+        Adds the 'undo' and 'redo' verbs.
+
+        The history is cleared by `StateCodec.restore()` and clones made by
+        a WorldTemplate start with an empty history.
+
+        Params:
+        ------
+        limit: int, optional (default=DEFAULT_UNDO_LIMIT)
+            Number of turns that can be undone.  None = no limit.
+
+        Returns:
+        -------
+        Journal
+        '''
+        self.journal = Journal(limit)
+        self.legal_verbs[UNDO_COMMAND] = self._create_undo_command
+        self.legal_verbs[REDO_COMMAND] = self._create_redo_command
+        self.compile_dispatch()
+        self._select_parse_and_execute()
+        return self.journal
+
+    def disable_undo(self):
+        '''
+        Stop recording changes and forget the undo history.
+        '''
+        self.journal = None
+        self.legal_verbs.pop(UNDO_COMMAND, None)
+        self.legal_verbs.pop(REDO_COMMAND, None)
+        self.compile_dispatch()
+        self._select_parse_and_execute()
+
+    def undo(self):
+        '''
+        Undo the changes made by the last turn that changed the game.
+        Takes time proportional to the changes of the turn.
+
+        Returns:
+        -------
+        str or None
+            The command undone.  None if there is nothing to undo (or undo
+            is not enabled).
+
+        Raises:
+        ------
+        RuntimeError
+            Raised when the game has more than one player.  Players share
+            the undo history.
+        '''
+        if self.journal is None:
+            return None
+        self._check_single_player()
+        return self.journal.undo()
+
+    def redo(self):
+        '''
+        Make the changes of the last undone turn again.
+
+        Returns:
+        -------
+        str or None
+            The command redone.  None if there is nothing to redo (or undo
+            is not enabled).
+
+        Raises:
+        ------
+        RuntimeError
+            Raised when the game has more than one player.
+        '''
+        if self.journal is None:
+            return None
+        self._check_single_player()
+        return self.journal.redo()
+
+    def _check_single_player(self):
+        '''
+        Raise RuntimeError if the game has more than one player.
+        '''
+        if len(self.players) > 1:
+            raise RuntimeError(
+                'Undo is not available with more than one player.')
+
+    def enable_routing(self, cache_size=DEFAULT_CACHE_SIZE):
+        '''
+        Index the exits between rooms to find shortest routes.  Adds the
+        'go' verb e.g. 'go to kitchen' moves the player to a room they
+        have visited.  The index is built on first use and kept up to date
+        as exits are added and removed.
+
+        Params:
+        ------
+        cache_size: int, optional (default=DEFAULT_CACHE_SIZE)
+            Number of target rooms whose searches are cached.
+
+        Returns:
+        -------
+        RoutingIndex
+        '''
+        if self.routing is not None:
+            self.routing.close()
+        self.routing = RoutingIndex(self, cache_size)
+        self.legal_verbs[GO_COMMAND] = self._create_go_command
+        self.compile_dispatch()
+        return self.routing
+
+    def disable_routing(self):
+        '''
+        Forget the routing index and remove the 'go' verb.
+        '''
+        if self.routing is not None:
+            self.routing.close()
+        self.routing = None
+        self.legal_verbs.pop(GO_COMMAND, None)
+        self.compile_dispatch()
+
+    def _create_use_command(self, *args):
+        '''
+        Use an item e.g. 'use lamp' or any use alias e.g. 'light lamp'
+        '''
+        parsed_command = args[0]
+        try:
+            return UseInventoryItem(self, item_alias=parsed_command[1],
+                                    command_text=parsed_command[0],
+                                    parsed_command=parsed_command)
+        except IndexError:
+            return NullCommand(f"{parsed_command[0]} what?")
 
     def _create_examine_command(self, *args):
         try:
@@ -462,7 +1555,8 @@ class TextWorld(InventoryHolder):
         '''
         try:
             item_name = args[0][1]
-            return TransferInventory(self.current_room, self, item_name)
+            return TransferInventory(self.current_room, self, item_name,
+                                     self)
         except IndexError:
             return NullCommand("What would you like to pickup?")
 
@@ -472,7 +1566,8 @@ class TextWorld(InventoryHolder):
         '''
         try:
             item_name = args[0][1]
-            return TransferInventory(self, self.current_room, item_name)
+            return TransferInventory(self, self.current_room, item_name,
+                                     self)
         except IndexError:
             return NullCommand("What would you like to drop?")
 
@@ -483,11 +1578,28 @@ class TextWorld(InventoryHolder):
         '''
         Refresh display of current room.
         '''
-        return LookAtRoom(self.current_room)
+        return LookAtRoom(self.current_room, self)
 
     def _create_end_game_command(self, *args):
         return QuitGame(self)
 
+    def _create_undo_command(self, *args):
+        return UndoTurn(self)
+
+    def _create_redo_command(self, *args):
+        return RedoTurn(self)
+
+    def _create_go_command(self, *args):
+        '''
+        Go to a room e.g. 'go to kitchen' or 'go kitchen'
+        '''
+        words = args[0][1:]
+        if words and words[0] == 'to':
+            words = words[1:]
+        if not words:
+            return NullCommand("Where would you like to go?")
+        return GoToRoom(self, ' '.join(words))
+
     def get_vanilla_command_verb_mapping(self):
         '''
         Returns a dictionary of vanilla (default) command words
@@ -496,7 +1608,7 @@ class TextWorld(InventoryHolder):
         return self.custom_command_word_mapping(DEFAULT_VERBS)
 
     def get_vanilla_legal_moves(self):
-        return DEFAULT_LEGAL_MOVES
+        return list(DEFAULT_LEGAL_MOVES)
 
     def custom_command_word_mapping(self, command_words):
         '''
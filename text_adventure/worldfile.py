@@ -0,0 +1,923 @@
+'''
+Declarative world files
+
+A world file describes a game as data instead of imperative Python.  It is
+a JSON document holding the rooms, exits, items, aliases and the actions
+and commands (using the existing action and command classes) of a game.
+
+Loading a world file validates it and builds a TextWorld.  The built world
+is cached on disk keyed by a hash of the file content (and the engine
+source) so a warm start skips parsing and validation and simply unpickles
+the world.
+
+Format:
+-------
+{
+    "format_version": 1,
+    "name": "My Adventure",
+    "opening": "Welcome...",                    (optional)
+    "game_over_message": "Game over.",          (optional)
+    "start": "hall",                            (optional, default=first)
+    "legal_exits": ["n", "s", "e", "w"],        (optional)
+    "verbs": ["look", "inv", "get", "drop", "ex", "quit"],  (optional)
+    "use_aliases": "classic",                   (optional)
+    "rooms": {
+        "hall": {"name": "Hall", "description": "...",
+                 "first_enter_msg": "", "exits": {"n": "kitchen"},
+                 "items": ["key"]}
+    },
+    "player": {"items": []},                    (optional)
+    "items": {
+        "key": {"name": "key", "long_description": "...", "fixed": false,
+                "background": false, "aliases": ["key"],
+                "actions": [<action>]}
+    },
+    "actions": {"open_door": <action>}          (optional, named actions)
+}
+
+An action or command is an object with a "type" (the class name) and the
+class constructor parameters e.g.
+
+{"type": "BasicInventoryItemAction", "command_text": "read",
+ "command": [{"type": "NullCommand", "message": "It says..."}]}
+
+Rooms and items are referenced by id, the player by "player" and named
+actions by name.  The game is passed to any parameter named "game".
+
+Classes:
+--------
+
+WorldFileError: raised when a world file is invalid.
+
+Functions:
+---------
+
+load_world: load a world file (using the compiled cache).
+
+compile_world: validate a parsed world file and build a TextWorld.
+
+dump_world: describe a built TextWorld in the world file format.
+
+save_world: write a built TextWorld to a world file.
+'''
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+
+from . import __version__
+from . import actions, commands, render
+from . import world as world_module
+from .world import TextWorld, Room, InventoryItem, _ITEM_IDS
+
+################# CONSTANTS ###################################################
+FORMAT_VERSION = 1
+PLAYER = 'player'
+CACHE_DIR_NAME = '__pycache__'
+
+# kinds of constructor parameter
+VALUE = 'value'
+GAME = 'game'
+ROOM = 'room'
+HOLDER = 'holder'
+ITEM = 'item'
+ITEMS = 'items'
+COMMAND = 'command'
+COMMANDS = 'commands'
+ACTION = 'action'
+ACTION_CHOICES = 'action_choices'
+
+# type name -> (class, [(parameter, attribute, kind)]).  The attribute is
+# used by dump_world to read the parameter back from an instance.
+COMMAND_TYPES = {
+    'MoveRoom': (commands.MoveRoom, [
+        ('game', 'game', GAME),
+        ('direction', 'direction', VALUE),
+        ('invalid_msg', 'invalid_msg', VALUE)]),
+    'SetCurrentRoom': (commands.SetCurrentRoom, [
+        ('game', 'game', GAME),
+        ('new_room', 'new_room', ROOM)]),
+    'TransferInventory': (commands.TransferInventory, [
+        ('holder', 'holder', HOLDER),
+        ('reciever', 'reciever', HOLDER),
+        ('alias', 'alias', VALUE)]),
+    'ViewPlayerInventory': (commands.ViewPlayerInventory, [
+        ('player', 'player', HOLDER)]),
+    'LookAtRoom': (commands.LookAtRoom, [
+        ('room', 'room', ROOM),
+        ('game', 'game', GAME)]),
+    'QuitGame': (commands.QuitGame, [
+        ('game', 'game', GAME),
+        ('quit_msg', 'quit_msg', VALUE),
+        ('game_over_msg', 'game_over_msg', VALUE)]),
+    'RemoveInventoryItem': (commands.RemoveInventoryItem, [
+        ('holder', 'holder', HOLDER),
+        ('to_remove', 'to_remove', ITEM)]),
+    'RemoveInventoryItemFromPlayerOrRoom': (
+        commands.RemoveInventoryItemFromPlayerOrRoom, [
+            ('game', 'game', GAME),
+            ('to_remove', 'to_remove', ITEM)]),
+    'NullCommand': (commands.NullCommand, [
+        ('message', 'message', VALUE)]),
+    'AppendToCurrentRoomDescription': (
+        commands.AppendToCurrentRoomDescription, [
+            ('game', 'game', GAME),
+            ('to_append', 'to_append', VALUE),
+            ('action_text', 'action_text', VALUE)]),
+    'AddActionToInventoryItem': (commands.AddActionToInventoryItem, [
+        ('action', 'action', ACTION),
+        ('item', 'item', ITEM),
+        ('execute_msg', 'execute_msg', VALUE)]),
+    'ClearInventoryItemActions': (commands.ClearInventoryItemActions, [
+        ('item', 'item', ITEM),
+        ('execute_msg', 'execute_msg', VALUE)]),
+    'AppendToRoomDescription': (commands.AppendToRoomDescription, [
+        ('room', 'room', ROOM),
+        ('to_append', 'to_append', VALUE),
+        ('action_text', 'action_text', VALUE)]),
+    'AddLinkToLocation': (commands.AddLinkToLocation, [
+        ('context', 'context', ROOM),
+        ('to_add', 'to_add', ROOM),
+        ('direction', 'direction', VALUE)]),
+    'AddInventoryItemtoHolder': (commands.AddInventoryItemtoHolder, [
+        ('items', 'items', ITEMS),
+        ('target', 'target', HOLDER)]),
+    'ChangeLocationDescription': (commands.ChangeLocationDescription, [
+        ('room', 'room', ROOM),
+        ('new_description', 'new_description', VALUE),
+        ('action_text', 'action_text', VALUE)]),
+    'PlayerDeath': (commands.PlayerDeath, [
+        ('death_msg', 'death_msg', VALUE),
+        ('end_game_command', 'end_game_command', COMMAND)]),
+    'RemoveLinkToRoom': (commands.RemoveLinkToRoom, [
+        ('context', 'context', ROOM),
+        ('direction_to_remove', 'direction_to_remove', VALUE)]),
+}
+
+ACTION_TYPES = {
+    'BasicInventoryItemAction': (actions.BasicInventoryItemAction, [
+        ('command', 'commands', COMMANDS),
+        ('command_text', 'command_text', VALUE),
+        ('invalid_msg', 'invalid_msg', VALUE)]),
+    'RestrictedInventoryItemAction': (
+        actions.RestrictedInventoryItemAction, [
+            ('holder', 'holder', HOLDER),
+            ('command', 'commands', COMMANDS),
+            ('requirements', 'requirements', ITEMS),
+            ('not_holding_msg', 'fail_message', VALUE),
+            ('command_txt', 'command_text', VALUE)]),
+    'ChoiceInventoryItemAction': (actions.ChoiceInventoryItemAction, [
+        ('choices', 'choices', ACTION_CHOICES),
+        ('command_text', 'command_text', VALUE),
+        ('invalid_choice', 'invalid_choice', VALUE)]),
+    'ConditionalInventoryItemAction': (
+        actions.ConditionalInventoryItemAction, [
+            ('correct_answer', 'correct_answer', VALUE),
+            ('action_correct', 'action_correct', ACTION),
+            ('action_incorrect', 'action_incorrect', ACTION),
+            ('command_text', 'command_text', VALUE)]),
+    'RoomSpecificInventoryItemAction': (
+        actions.RoomSpecificInventoryItemAction, [
+            ('game', 'game', GAME),
+            ('context', 'context', ROOM),
+            ('action', 'action', ACTION),
+            ('command_text', 'command_text', VALUE)]),
+}
+
+WORLD_KEYS = {'format_version', 'name', 'opening', 'game_over_message',
+              'start', 'legal_exits', 'verbs', 'use_aliases', 'rooms',
+              'player', 'items', 'actions'}
+ROOM_KEYS = {'name', 'description', 'first_enter_msg', 'exits', 'items'}
+ITEM_KEYS = {'name', 'long_description', 'fixed', 'background', 'aliases',
+             'actions'}
+
+# class -> {parameter: default}.  See _defaults()
+_DEFAULTS = {}
+
+# modules defining the classes held in a compiled cache.
+ENGINE_MODULES = [actions, commands, render, world_module]
+_ENGINE_FINGERPRINT = None
+
+
+class WorldFileError(ValueError):
+    '''
+    Raised when a world file is invalid.
+    '''
+    def __init__(self, location, msg):
+        '''
+        Params:
+        ------
+        location: str
+            Where the error is e.g. "items.key.actions[0]"
+
+        msg: str
+            Description of the error.
+        '''
+        super().__init__(f'{location}: {msg}')
+        self.location = location
+
+
+def load_world(path, use_cache=True, cache_dir=None):
+    '''
+    Load a world file.
+
+    The first load validates the file, builds the TextWorld and saves it to
+    the cache.  Later loads of an unchanged file unpickle the cached world.
+
+    Params:
+    ------
+    path: str or path
+        The world file (JSON).
+
+    use_cache: bool, optional (default=True)
+        Read and write the compiled cache.
+
+    cache_dir: str or path, optional (default=None)
+        Directory of the compiled cache.  If None then a __pycache__
+        directory next to the world file is used.  Only use a cache
+        directory that you trust: the cache is unpickled.
+
+    Returns:
+    -------
+    TextWorld
+    '''
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    if not use_cache:
+        return compile_world(json.loads(content))
+
+    cache_path = _cache_path(path, content, cache_dir)
+    try:
+        with open(cache_path, 'rb') as f:
+            world, items = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    else:
+        _renumber_items(world, items)
+        return world
+
+    compiler = _WorldCompiler(json.loads(content))
+    world = compiler.compile()
+    _write_cache(cache_path, world, list(compiler.items.values()))
+    return world
+
+
+def compile_world(spec):
+    '''
+    Validate a parsed world file and build the TextWorld it describes.
+
+    Params:
+    ------
+    spec: dict
+        A parsed world file.
+
+    Returns:
+    -------
+    TextWorld
+
+    Raises:
+    ------
+    WorldFileError
+        If the world file is invalid.
+    '''
+    return _WorldCompiler(spec).compile()
+
+
+def dump_world(world):
+    '''
+    Describe a built TextWorld in the world file format.  Use this to
+    convert a game defined in Python to a world file.  The world should be
+    in its initial state.
+
+    Params:
+    ------
+    world: TextWorld
+
+    Returns:
+    -------
+    dict
+        Can be saved with json.dump or passed to compile_world.
+
+    Raises:
+    ------
+    ValueError
+        If the world uses a command or action type that the world file
+        format does not support or an action (indirectly) adds itself.
+    '''
+    return _WorldDumper(world).dump()
+
+
+def save_world(world, path):
+    '''
+    Write a built TextWorld to a world file.
+
+    Params:
+    ------
+    world: TextWorld
+
+    path: str or path
+    '''
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dump_world(world), f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def _cache_path(path, content, cache_dir):
+    '''
+    Path of the compiled cache of a world file.  The name includes a hash of
+    the content, format and engine source so any change is a cache miss.
+    '''
+    digest = hashlib.sha256(content)
+    digest.update(f'{FORMAT_VERSION}:{_engine_fingerprint()}'.encode('utf-8'))
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)),
+                                 CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir,
+                        f'{stem}.{digest.hexdigest()[:16]}.world.pickle')
+
+
+def _engine_fingerprint():
+    '''
+    Hash of the engine version and the source of the modules whose classes
+    are pickled in the cache.  A cached world from a different engine may
+    not unpickle correctly (e.g. renamed attributes).
+    '''
+    global _ENGINE_FINGERPRINT
+    if _ENGINE_FINGERPRINT is None:
+        digest = hashlib.sha256(__version__.encode('utf-8'))
+        for module in ENGINE_MODULES:
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+        _ENGINE_FINGERPRINT = digest.hexdigest()
+    return _ENGINE_FINGERPRINT
+
+
+def _write_cache(cache_path, world, items):
+    '''
+    Save a compiled world and its items to the cache.  The cache is an
+    optimisation so failing to write it (e.g. a read only directory) is not
+    an error.
+    '''
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((world, items), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _renumber_items(world, items):
+    '''
+    Give unpickled items new item_ids so they cannot clash with items
+    created in this process.  Inventories are keyed by item_id so are
+    rebuilt.
+    '''
+    for item in items:
+        item.item_id = next(_ITEM_IDS)
+
+    for holder in list(world.players.values()) + world.rooms:
+        # empty holders keep sharing the empty inventory.
+        if holder._items:
+            holder._items = {item.item_id: item
+                             for item in holder._items.values()}
+
+
+class _WorldCompiler:
+    '''
+    Validates a parsed world file and builds the TextWorld.
+    '''
+    def __init__(self, spec):
+        self.spec = spec
+        self.rooms = {}
+        self.items = {}
+        self.named_actions = {}
+        self.world = None
+        # names of the named actions being built (cycle detection)
+        self._building = set()
+
+    def compile(self):
+        spec = self.spec
+        _check_keys(spec, WORLD_KEYS, 'world', required={'name', 'rooms'})
+        version = spec.get('format_version', FORMAT_VERSION)
+        if version != FORMAT_VERSION:
+            raise WorldFileError('format_version',
+                                 f'unsupported version {version!r}')
+
+        rooms = _mapping(spec['rooms'], 'rooms')
+        if not rooms:
+            raise WorldFileError('rooms', 'at least one room is required')
+        item_specs = _mapping(spec.get('items', {}), 'items')
+        self.action_specs = _mapping(spec.get('actions', {}), 'actions')
+
+        # create rooms and items first so they can be referenced anywhere.
+        for room_id, room_spec in rooms.items():
+            name, first_enter_msg, description = \
+                _room_fields(room_id, room_spec)
+            room = Room(name, first_enter_msg)
+            room.description = description
+            self.rooms[room_id] = room
+
+        for item_id, item_spec in item_specs.items():
+            name, fixed, background, long_description, aliases = \
+                _item_fields(item_id, item_spec)
+            item = InventoryItem(name, fixed=fixed, background=background)
+            item.long_description = long_description
+            for alias in aliases:
+                item.add_alias(alias)
+            self.items[item_id] = item
+
+        self.world = self._create_world()
+
+        for room_id, room_spec in rooms.items():
+            location = f'rooms.{room_id}'
+            room = self.rooms[room_id]
+            exits = _mapping(room_spec.get('exits', {}), f'{location}.exits')
+            for direction, target in exits.items():
+                room.add_exit(self._room(target,
+                                         f'{location}.exits.{direction}'),
+                              direction)
+            self._add_items(room, room_spec, location)
+
+        player = _mapping(spec.get('player', {}), 'player')
+        _check_keys(player, {'items'}, 'player')
+        self._add_items(self.world, player, 'player')
+
+        for item_id, item_spec in item_specs.items():
+            location = f'items.{item_id}.actions'
+            for i, action in enumerate(_list(item_spec.get('actions', []),
+                                             location)):
+                self.items[item_id].add_action(
+                    self._action(action, f'{location}[{i}]'))
+
+        # named actions that are not referenced are still validated.
+        for name in self.action_specs:
+            self._named_action(name, f'actions.{name}')
+
+        return self.world
+
+    def _create_world(self):
+        start = self.spec.get('start')
+        room_ids = list(self.rooms)
+        if start is None:
+            start_index = 0
+        elif start in self.rooms:
+            start_index = room_ids.index(start)
+        else:
+            raise WorldFileError('start', f'unknown room {start!r}')
+
+        world = TextWorld(rooms=list(self.rooms.values()),
+                          start_index=start_index,
+                          **self._world_options())
+        self._set_messages(world)
+        return world
+
+    def _world_options(self):
+        '''
+        TextWorld constructor parameters (other than the rooms) from the
+        world file.
+        '''
+        spec = self.spec
+        legal_exits = spec.get('legal_exits')
+        if legal_exits is not None:
+            legal_exits = [_string(e, f'legal_exits[{i}]') for i, e
+                           in enumerate(_list(legal_exits, 'legal_exits'))]
+
+        verbs = spec.get('verbs')
+        if verbs is not None:
+            verbs = [_string(v, f'verbs[{i}]')
+                     for i, v in enumerate(_list(verbs, 'verbs'))]
+
+        use_aliases = spec.get('use_aliases', 'classic')
+        if isinstance(use_aliases, list):
+            use_aliases = [_string(a, f'use_aliases[{i}]')
+                           for i, a in enumerate(use_aliases)]
+        elif use_aliases not in (None, 'classic', 'warfare'):
+            raise WorldFileError('use_aliases',
+                                 "expected 'classic', 'warfare', null or a "
+                                 + 'list of aliases')
+
+        return {'name': _string(spec['name'], 'name'),
+                'legal_exits': legal_exits,
+                'command_verb_mapping': verbs,
+                'use_aliases': use_aliases}
+
+    def _set_messages(self, world):
+        spec = self.spec
+        if 'game_over_message' in spec:
+            world.game_over_message = _string(spec['game_over_message'],
+                                              'game_over_message')
+        if 'opening' in spec:
+            world.opening = _string(spec['opening'], 'opening')
+
+    def _add_items(self, holder, spec, location):
+        for i, item_id in enumerate(_list(spec.get('items', []),
+                                          f'{location}.items')):
+            holder.add_inventory(self._item(item_id,
+                                            f'{location}.items[{i}]'))
+
+    def _room(self, room_id, location):
+        try:
+            return self.rooms[room_id]
+        except (KeyError, TypeError):
+            raise WorldFileError(location, f'unknown room {room_id!r}')
+
+    def _item(self, item_id, location):
+        try:
+            return self.items[item_id]
+        except (KeyError, TypeError):
+            raise WorldFileError(location, f'unknown item {item_id!r}')
+
+    def _holder(self, holder_id, location):
+        if holder_id == PLAYER:
+            return self.world
+        try:
+            return self.rooms[holder_id]
+        except (KeyError, TypeError):
+            raise WorldFileError(location,
+                                 f"unknown holder {holder_id!r} (expected "
+                                 + "'player' or a room)")
+
+    def _command(self, spec, location):
+        return self._create(spec, COMMAND_TYPES, 'command', location)
+
+    def _action(self, spec, location):
+        if isinstance(spec, str):
+            return self._named_action(spec, location)
+        return self._create(spec, ACTION_TYPES, 'action', location)
+
+    def _named_action(self, name, location):
+        if name in self.named_actions:
+            return self.named_actions[name]
+        if name not in self.action_specs:
+            raise WorldFileError(location, f'unknown action {name!r}')
+        if name in self._building:
+            raise WorldFileError(location,
+                                 f'action {name!r} references itself')
+
+        self._building.add(name)
+        action = self._create(self.action_specs[name], ACTION_TYPES,
+                              'action', f'actions.{name}')
+        self._building.discard(name)
+        self.named_actions[name] = action
+        return action
+
+    def _create(self, spec, types, kind, location):
+        '''
+        Create a command or action from its spec.
+        '''
+        spec = _mapping(spec, location)
+        type_name = spec.get('type')
+        if type_name not in types:
+            raise WorldFileError(location,
+                                 f'unknown {kind} type {type_name!r}')
+
+        cls, params = types[type_name]
+        defaults = _defaults(cls)
+        allowed = {param for param, _, param_kind in params
+                   if param_kind != GAME}
+        unknown = set(spec) - allowed - {'type'}
+        if unknown:
+            raise WorldFileError(location,
+                                 f'unknown {type_name} parameter(s) '
+                                 + ', '.join(sorted(unknown)))
+
+        kwargs = {}
+        for param, _, param_kind in params:
+            param_location = f'{location}.{param}'
+            if param_kind == GAME:
+                kwargs[param] = self.world
+            elif param in spec:
+                kwargs[param] = self._value(spec[param], param_kind,
+                                            param_location)
+            elif param not in defaults:
+                raise WorldFileError(location,
+                                     f'{type_name} requires {param!r}')
+        return cls(**kwargs)
+
+    def _value(self, value, kind, location):
+        '''
+        Resolve a parameter value of a command or action.
+        '''
+        if kind == VALUE:
+            if value is not None \
+                    and not isinstance(value, (str, int, float, bool)):
+                raise WorldFileError(location, 'expected a value')
+            return value
+        if kind == ROOM:
+            return self._room(value, location)
+        if kind == HOLDER:
+            return self._holder(value, location)
+        if kind == ITEM:
+            return self._item(value, location)
+        if kind == ITEMS:
+            return [self._item(v, f'{location}[{i}]')
+                    for i, v in enumerate(_list(value, location))]
+        if kind == COMMAND:
+            return self._command(value, location)
+        if kind == COMMANDS:
+            return [self._command(v, f'{location}[{i}]')
+                    for i, v in enumerate(_list(value, location))]
+        if kind == ACTION:
+            return self._action(value, location)
+        if kind == ACTION_CHOICES:
+            return {choice: self._action(v, f'{location}.{choice}')
+                    for choice, v in _mapping(value, location).items()}
+        raise ValueError(f'unknown parameter kind {kind!r}')
+
+
+class _WorldDumper:
+    '''
+    Describes a built TextWorld in the world file format.
+    '''
+    def __init__(self, world):
+        self.world = world
+        self._types = {cls: (name, params) for name, (cls, params)
+                       in list(COMMAND_TYPES.items())
+                       + list(ACTION_TYPES.items())}
+        self.room_ids = {}
+        self.item_ids = {}
+        self.items = []
+        # actions referenced more than once are written as named actions
+        self.action_names = {}
+        self.named_actions = {}
+        # shared actions being described (cycle detection)
+        self._describing = set()
+        self._used_ids = set()
+
+    def dump(self):
+        world = self.world
+        rooms = list(world.rooms)
+        for room in rooms:
+            self.room_ids[id(room)] = self._new_id(room.name)
+
+        # find every room, item and shared action
+        action_counts = {}
+        to_visit = [world] + rooms
+        seen = {id(obj) for obj in to_visit}
+        while to_visit:
+            obj = to_visit.pop(0)
+            for child in self._children(obj):
+                if isinstance(child, actions.InventoryItemAction):
+                    action_counts[id(child)] = \
+                        action_counts.get(id(child), 0) + 1
+                if id(child) in seen:
+                    continue
+                seen.add(id(child))
+                if isinstance(child, Room) and id(child) not in self.room_ids:
+                    rooms.append(child)
+                    self.room_ids[id(child)] = self._new_id(child.name)
+                elif isinstance(child, InventoryItem):
+                    self.items.append(child)
+                    self.item_ids[id(child)] = self._new_id(child.name)
+                to_visit.append(child)
+
+        self.shared_actions = {key for key, n in action_counts.items()
+                               if n > 1}
+
+        spec = {'format_version': FORMAT_VERSION,
+                'name': world.name}
+        if hasattr(world, 'opening'):
+            spec['opening'] = world.opening
+        spec['game_over_message'] = world.game_over_message
+        spec['start'] = self.room_ids[id(world.current_room)]
+        spec['legal_exits'] = list(world.legal_exits)
+        spec['verbs'] = list(world.legal_verbs)
+        spec['use_aliases'] = list(world.use_aliases)
+
+        spec['rooms'] = {self.room_ids[id(room)]: self._room(room)
+                         for room in rooms}
+        spec['player'] = {'items': self._item_refs(world.inventory)}
+        spec['items'] = {self.item_ids[id(item)]: self._item(item)
+                         for item in self.items}
+        if self.named_actions:
+            spec['actions'] = self.named_actions
+        return spec
+
+    def _new_id(self, name):
+        '''
+        A unique readable id for a room or item derived from its name.
+        '''
+        base = re.sub(r'[^a-z0-9]+', '_', str(name).lower()).strip('_') \
+            or 'id'
+        new_id = base
+        n = 2
+        while new_id in self._used_ids or new_id == PLAYER:
+            new_id = f'{base}_{n}'
+            n += 1
+        self._used_ids.add(new_id)
+        return new_id
+
+    def _children(self, obj):
+        '''
+        Rooms, items, commands and actions referenced by obj.
+        '''
+        if isinstance(obj, (Room, TextWorld)):
+            children = list(obj.inventory)
+            if isinstance(obj, Room):
+                children = list(obj.exits.values()) + children
+            return children
+        if isinstance(obj, InventoryItem):
+            return list(obj.actions)
+
+        _, params = self._spec_of(obj)
+        children = []
+        for _, attr, kind in params:
+            value = getattr(obj, attr)
+            if kind == ITEMS:
+                children.extend(_as_list(value))
+            elif kind == COMMANDS:
+                children.extend(value)
+            elif kind == ACTION_CHOICES:
+                children.extend(value.values())
+            elif kind in (ROOM, HOLDER, ITEM, COMMAND, ACTION):
+                children.append(value)
+        return children
+
+    def _spec_of(self, obj):
+        try:
+            return self._types[type(obj)]
+        except KeyError:
+            raise ValueError(f'{type(obj).__name__} is not supported by the '
+                             + 'world file format')
+
+    def _room(self, room):
+        spec = {'name': room.name, 'description': room.description}
+        if room.first_enter_msg:
+            spec['first_enter_msg'] = room.first_enter_msg
+        spec['exits'] = {direction: self.room_ids[id(target)]
+                         for direction, target in room.exits.items()}
+        spec['items'] = self._item_refs(room.inventory)
+        return spec
+
+    def _item(self, item):
+        spec = {'name': item.name,
+                'long_description': item.long_description,
+                'fixed': item.fixed,
+                'background': item.background,
+                'aliases': list(item.aliases)}
+        spec['actions'] = [self._action(action) for action in item.actions]
+        return spec
+
+    def _item_refs(self, items):
+        return [self.item_ids[id(item)] for item in items]
+
+    def _holder_ref(self, holder):
+        if holder is self.world:
+            return PLAYER
+        return self.room_ids[id(holder)]
+
+    def _action(self, action):
+        key = id(action)
+        if key not in self.shared_actions:
+            return self._describe(action)
+
+        if key in self._describing:
+            raise ValueError('an action cannot (indirectly) add itself')
+
+        if key not in self.action_names:
+            name = self._new_id('action ' + action.command_text)
+            self.action_names[key] = name
+            self._describing.add(key)
+            self.named_actions[name] = self._describe(action)
+            self._describing.discard(key)
+        return self.action_names[key]
+
+    def _describe(self, obj):
+        '''
+        Describe a command or action as type + constructor parameters.
+        Parameters equal to the constructor default are omitted.
+        '''
+        type_name, params = self._spec_of(obj)
+        defaults = _defaults(type(obj))
+        spec = {'type': type_name}
+        for param, attr, kind in params:
+            if kind == GAME:
+                continue
+            value = getattr(obj, attr)
+            if kind == VALUE and param in defaults \
+                    and value == defaults[param]:
+                continue
+            spec[param] = self._dump_value(value, kind)
+        return spec
+
+    def _dump_value(self, value, kind):
+        if kind == VALUE:
+            return value
+        if kind == ROOM:
+            return self.room_ids[id(value)]
+        if kind == HOLDER:
+            return self._holder_ref(value)
+        if kind == ITEM:
+            return self.item_ids[id(value)]
+        if kind == ITEMS:
+            return self._item_refs(_as_list(value))
+        if kind == COMMAND:
+            return self._describe(value)
+        if kind == COMMANDS:
+            return [self._describe(v) for v in value]
+        if kind == ACTION:
+            return self._action(value)
+        if kind == ACTION_CHOICES:
+            return {choice: self._action(v)
+                    for choice, v in value.items()}
+        raise ValueError(f'unknown parameter kind {kind!r}')
+
+
+def _defaults(cls):
+    '''
+    Default values of the constructor parameters of a command or action
+    class.  Memoised as inspect.signature is slow.
+    '''
+    try:
+        return _DEFAULTS[cls]
+    except KeyError:
+        parameters = inspect.signature(cls).parameters.values()
+        _DEFAULTS[cls] = {p.name: p.default for p in parameters
+                          if p.default is not inspect.Parameter.empty}
+        return _DEFAULTS[cls]
+
+
+def _as_list(value):
+    '''
+    Requirements may be a single InventoryItem or a list.
+    '''
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _room_fields(room_id, room_spec):
+    '''
+    Validate a room and return its (name, first_enter_msg, description).
+    '''
+    location = f'rooms.{room_id}'
+    room_spec = _mapping(room_spec, location)
+    _check_keys(room_spec, ROOM_KEYS, location)
+    return (_string(room_spec.get('name', room_id), f'{location}.name'),
+            _string(room_spec.get('first_enter_msg', ''),
+                    f'{location}.first_enter_msg'),
+            _string(room_spec.get('description', ''),
+                    f'{location}.description'))
+
+
+def _item_fields(item_id, item_spec):
+    '''
+    Validate an item and return its (name, fixed, background,
+    long_description, aliases).  The actions are built separately.
+    '''
+    location = f'items.{item_id}'
+    item_spec = _mapping(item_spec, location)
+    _check_keys(item_spec, ITEM_KEYS, location)
+    return (_string(item_spec.get('name', item_id), f'{location}.name'),
+            _bool(item_spec.get('fixed', False), f'{location}.fixed'),
+            _bool(item_spec.get('background', False),
+                  f'{location}.background'),
+            _string(item_spec.get('long_description', ''),
+                    f'{location}.long_description'),
+            [_string(alias, f'{location}.aliases[{i}]') for i, alias
+             in enumerate(_list(item_spec.get('aliases', []),
+                                f'{location}.aliases'))])
+
+
+def _check_keys(spec, allowed, location, required=()):
+    unknown = set(spec) - allowed
+    if unknown:
+        raise WorldFileError(location,
+                             'unknown key(s) ' + ', '.join(sorted(unknown)))
+    for key in required:
+        if key not in spec:
+            raise WorldFileError(location, f'{key!r} is required')
+
+
+def _mapping(value, location):
+    if not isinstance(value, dict):
+        raise WorldFileError(location, 'expected an object')
+    return value
+
+
+def _list(value, location):
+    if not isinstance(value, list):
+        raise WorldFileError(location, 'expected a list')
+    return value
+
+
+def _string(value, location):
+    if not isinstance(value, str):
+        raise WorldFileError(location, 'expected a string')
+    return value
+
+
+def _bool(value, location):
+    if not isinstance(value, bool):
+        raise WorldFileError(location, 'expected true or false')
+    return value